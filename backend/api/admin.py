@@ -0,0 +1,148 @@
+import asyncio
+import os
+import secrets
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+
+from schemas.customer import ModelReloadRequest, ModelVersionResponse
+from services import model_registry, model_service
+from services.model_registry import RegistryError
+
+router = APIRouter()
+
+# --- 1. SETTINGS ---
+# The admin endpoints are disabled (403) unless a token is configured;
+# requests must send it in the X-Admin-Token header.
+ADMIN_TOKEN = os.getenv("CHURN_ADMIN_TOKEN")
+# How often the registry's CURRENT file is checked (seconds, 0 = off).
+# Pointing CURRENT at another version (e.g. from a deploy script) makes
+# every worker hot-reload it, without an API call per worker.
+MODEL_WATCH_INTERVAL_S = float(os.getenv("CHURN_MODEL_WATCH_INTERVAL_S", "5"))
+# A version that failed to load is retried right away when CURRENT or
+# its manifest changes, otherwise with a delay that doubles up to this.
+MODEL_WATCH_MAX_BACKOFF_S = float(os.getenv("CHURN_MODEL_WATCH_MAX_BACKOFF_S", "300"))
+
+# Only one reload / rollback at a time per worker.
+_reload_lock = asyncio.Lock()
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model administration is disabled (CHURN_ADMIN_TOKEN is not set).")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+def describe_active_models() -> ModelVersionResponse:
+    bundle = model_service.current_bundle()
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="No models are loaded.")
+    previous = model_service._previous
+    return ModelVersionResponse(
+        version=bundle.version,
+        fingerprint=bundle.fingerprint,
+        generation=bundle.generation,
+        created_at=bundle.manifest.get("created_at"),
+        data_hash=bundle.manifest.get("data_hash"),
+        metrics=bundle.manifest.get("metrics", {}),
+        current=model_registry.get_current_version(),
+        available=model_registry.list_versions(),
+        previous=previous.version if previous is not None else None,
+    )
+
+
+# --- 2. RELOAD ---
+async def reload_models(version: Optional[str] = None) -> model_service.ModelBundle:
+    """
+    Loads and warms up 'version' (default: CURRENT) in the background,
+    then swaps it in. Requests keep being served by the active version
+    the whole time; if loading fails, the active version stays.
+    """
+    async with _reload_lock:
+        # On a thread whatever the heavy executor is: a bundle holds locks
+        # and loaders that can't be pickled back from a worker process.
+        bundle = await asyncio.to_thread(model_service.load_model_bundle, version)
+        return model_service.swap_in_bundle(bundle)
+
+
+def registry_state(version: str):
+    """ (version, manifest mtime): changes when CURRENT moves or the version is republished. """
+    try:
+        path = os.path.join(model_registry.version_dir(version), model_registry.MANIFEST_FILE)
+        return version, os.stat(path).st_mtime_ns
+    except (OSError, RegistryError):
+        return version, None
+
+
+async def watch_registry():
+    """
+    Background task (started by main.py): reloads the models whenever
+    the registry's CURRENT file names another version than the active one.
+    A version that fails to load is reported once and then retried with
+    backoff, or as soon as CURRENT or its manifest changes.
+    """
+    failed = None   # {"state", "delay", "retry_at"} of the last failed reload
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL_S)
+        state = None
+        try:
+            current = model_registry.get_current_version()
+            active = model_service.current_bundle()
+            if active is None or current == active.version or _reload_lock.locked():
+                failed = None
+                continue
+            state = registry_state(current)
+            if failed is not None and failed["state"] == state and time.monotonic() < failed["retry_at"]:
+                continue
+            if failed is None or failed["state"] != state:
+                print(f"--- 🔄 Registry points at {current}, reloading (active: {active.version}) ---")
+            bundle = await reload_models(current)
+            print(f"--- ✨ Now serving model version {bundle.version} ---")
+            failed = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if failed is None or failed["state"] != state:
+                print(f"❌ Model reload from registry failed: {e} "
+                      f"(retrying with backoff, or when CURRENT or the version's manifest changes)")
+                delay = MODEL_WATCH_INTERVAL_S
+            else:
+                delay = min(failed["delay"] * 2, MODEL_WATCH_MAX_BACKOFF_S)
+            failed = {"state": state, "delay": delay, "retry_at": time.monotonic() + delay}
+
+
+# --- 3. ENDPOINTS ---
+@router.get("/", response_model=ModelVersionResponse, dependencies=[Depends(require_admin_token)])
+async def get_models():
+    """ The active model version, its manifest metrics and the registry state. """
+    return describe_active_models()
+
+
+@router.post("/reload", response_model=ModelVersionResponse, dependencies=[Depends(require_admin_token)])
+async def reload(request: ModelReloadRequest):
+    """
+    Hot-reloads a model version without downtime and makes it the
+    registry's CURRENT one (so the other workers follow).
+    """
+    try:
+        bundle = await reload_models(request.version)
+        model_registry.set_current_version(bundle.version)
+    except RegistryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"Error during model reload: {e}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
+    return describe_active_models()
+
+
+@router.post("/rollback", response_model=ModelVersionResponse, dependencies=[Depends(require_admin_token)])
+async def rollback():
+    """ Swaps the previously active version back in (it is still in memory). """
+    async with _reload_lock:
+        try:
+            bundle = model_service.rollback_models()
+            model_registry.set_current_version(bundle.version)
+        except RegistryError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    return describe_active_models()
@@ -1,51 +1,175 @@
-from fastapi import APIRouter, HTTPException
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from functools import lru_cache
+from typing import Optional
+
+from services.aggregation_service import AggregationEngine, AggregationError
+from services.data_service import get_dataset, get_memory_footprint
+from services.metrics import stage_timer
+from services.serialization import ARROW_MEDIA_TYPE, JSON_MEDIA_TYPE, arrow_available, columns_to_arrow, dumps
+from services.query_service import (
+    RowQueryEngine,
+    QueryError,
+    parse_query_string,
+    decode_cursor,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    OUTPUT_FORMATS
+)
 
 router = APIRouter()
 
-# --- Helper: Load and cache the cleaned dataset ---
-# We load the data ONCE when this file is imported.
-# This way, we don't read the CSV from disk on every single request.
-@lru_cache()
+# --- Helper: The cleaned dataset ---
+# The data comes from the shared store in services/data_service.py,
+# which reads and cleans the CSV ONCE for every router.
+def get_cleaned_frame():
+    """
+    Returns a read-only view of the cleaned Telco Churn dataset
+    (customerID already dropped), or None if it could not be loaded.
+    """
+    return get_dataset()
+
 def get_cleaned_data():
     """
-    Loads and cleans the Telco Churn dataset.
-    The @router.lru_cache() decorator caches the result, 
-    so the file is only read from disk once.
+    The cleaned dataset as a list of dictionaries (JSON rows).
+    Built per request and NOT cached: a list of dicts costs several
+    times the memory of the shared frame.
     """
-    try:
-        DATA_PATH = "data/telco_customer_churn.csv"
-        df = pd.read_csv(DATA_PATH)
-        
-        # Do the same basic cleaning as the notebook
-        df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-        df.dropna(inplace=True)
-        
-        # Drop customerID, we don't need it in the explorer
-        df.drop(columns=['customerID'], inplace=True, errors='ignore')
-        
-        print("✅ Explorer data loaded and cleaned.")
-        # Convert DataFrame to a list of dictionaries (JSON)
-        return df.to_dict('records')
-
-    except FileNotFoundError:
-        print("❌ ERROR: data/telco_customer_churn.csv not found.")
-        return None
-    except Exception as e:
-        print(f"❌ ERROR cleaning explorer data: {e}")
-        return None
+    df = get_cleaned_frame()
+    return None if df is None else df.to_dict('records')
+
+@lru_cache()
+def get_aggregation_engine():
+    """ The memoizing group-by engine over the cleaned frame. """
+    df = get_cleaned_frame()
+    return None if df is None else AggregationEngine(df)
+
+@lru_cache()
+def get_row_query_engine():
+    """ The filter / paging engine over the cleaned frame. """
+    df = get_cleaned_frame()
+    return None if df is None else RowQueryEngine(df)
 
 # --- Endpoint: Get All Customer Data ---
 @router.get("/")
 async def get_all_customer_data():
     """
     Returns the entire cleaned Telco Churn dataset as a JSON array.
-    Your frontend will use this to build its interactive charts.
+    Prefer /kpis and /aggregate for dashboards: their responses stay a
+    few KB no matter how large the dataset is.
     """
     data = get_cleaned_data()
     
     if data is None:
         raise HTTPException(status_code=404, detail="Dataset not found or could not be loaded.")
     
-    return data
\ No newline at end of file
+    return data
+
+# --- Endpoint: Dataset Info ---
+@router.get("/info")
+async def get_dataset_info():
+    """
+    Returns where the shared in-memory dataset was loaded from (binary
+    cache or CSV) and its size: rows, total bytes and the dtype / bytes
+    of every column.
+    """
+    if get_cleaned_frame() is None:
+        raise HTTPException(status_code=404, detail="Dataset not found or could not be loaded.")
+
+    return get_memory_footprint()
+
+# --- Endpoint: Headline KPIs ---
+@router.get("/kpis")
+async def get_kpis():
+    """
+    Returns dataset-wide KPIs (customer count, churn rate, averages).
+    """
+    engine = get_aggregation_engine()
+    if engine is None:
+        raise HTTPException(status_code=404, detail="Dataset not found or could not be loaded.")
+
+    return engine.kpis()
+
+# --- Endpoint: Group-by Aggregates ---
+@router.get("/aggregate")
+async def get_aggregate(group_by: str, metrics: Optional[str] = None):
+    """
+    Returns per-category aggregates, e.g.
+    /api/explorer/aggregate?group_by=Contract&metrics=churn_rate,count,avg_tenure
+    Available metrics: count, churned, churn_rate, avg_tenure,
+    avg_monthly_charges, avg_total_charges (default: all of them).
+    """
+    engine = get_aggregation_engine()
+    if engine is None:
+        raise HTTPException(status_code=404, detail="Dataset not found or could not be loaded.")
+
+    metric_list = [m.strip() for m in metrics.split(',') if m.strip()] if metrics else None
+    try:
+        return engine.aggregate(group_by, metric_list)
+    except AggregationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# --- Endpoint: Filtered, Paginated Rows ---
+@router.get("/rows")
+async def get_rows(request: Request):
+    """
+    Returns a page of rows, optionally filtered and projected, e.g.
+    /api/explorer/rows?Contract=Month-to-month&tenure<12&fields=tenure,Churn&limit=50
+
+    - Filters: column=value (comma-separated for "any of"), column!=value,
+      and <, <=, >, >= for numeric columns. All filters must match.
+    - Paging: offset + limit (max 10000), or the 'next_cursor' of the
+      previous page passed as cursor=...
+    - format=columns returns the page as one array per field
+      ({"columns": {"tenure": [...], ...}}) instead of a list of rows.
+    - format=ndjson streams every matching row (or 'limit' rows) as
+      newline-delimited JSON instead of returning one page.
+    - format=arrow returns the same rows as an Arrow IPC stream
+      (text columns dictionary-encoded).
+    """
+    engine = get_row_query_engine()
+    if engine is None:
+        raise HTTPException(status_code=404, detail="Dataset not found or could not be loaded.")
+
+    try:
+        params, filters = parse_query_string(request.url.query)
+        fields = engine.resolve_fields(params.get("fields"))
+        offset = decode_cursor(params["cursor"]) if "cursor" in params else int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+        if offset < 0 or (limit is not None and limit < 0):
+            raise QueryError("offset and limit must be >= 0.")
+
+        output_format = params.get("format", "rows")
+        if output_format not in OUTPUT_FORMATS:
+            raise QueryError(f"format must be one of: {', '.join(OUTPUT_FORMATS)}.")
+
+        if output_format == "ndjson":
+            # Filtered here (which also validates the filters before the
+            # response starts streaming); only the serialization streams.
+            positions = engine.matching_positions(filters)
+            return StreamingResponse(
+                engine.iter_ndjson(positions, fields, offset, limit),
+                media_type="application/x-ndjson"
+            )
+
+        if output_format == "arrow":
+            if not arrow_available():
+                raise HTTPException(status_code=400, detail="format=arrow requires pyarrow on the server.")
+            rows = engine.select(filters, fields, offset, limit)
+            with stage_timer("serialize", "explorer-arrow", rows=len(rows)):
+                body = columns_to_arrow({field: rows[field] for field in fields})
+            return Response(content=body, media_type=ARROW_MEDIA_TYPE)
+
+        limit = DEFAULT_PAGE_SIZE if limit is None else min(limit, MAX_PAGE_SIZE)
+        if output_format == "columns":
+            page = engine.page(filters, fields, offset, limit, layout="columns")
+            with stage_timer("serialize", "explorer-columns"):
+                body = dumps(page)
+            return Response(content=body, media_type=JSON_MEDIA_TYPE)
+        return engine.page(filters, fields, offset, limit)
+
+    except QueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="offset and limit must be integers.")
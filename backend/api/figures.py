@@ -1,134 +1,256 @@
-from fastapi import APIRouter, HTTPException
-import pandas as pd
+import json
+import numpy as np
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
 # Import our helper functions and Pydantic models
-from services.model_service import get_model
+from services.model_service import get_model, InferenceQueueFull
+from services.data_service import get_dataset
+from services.figure_cache import FIGURE_CACHE_WARMUP, FigureCache, FigurePayload
+from services.metrics import stage_timer
+from services.downsampling import (
+    DEFAULT_MAX_POINTS, MAX_FIGURE_POINTS, DownsampleMode, downsample_columns,
+)
+from services.serialization import (
+    ARROW_MEDIA_TYPE, JSON_MEDIA_TYPE, ResponseFormat,
+    arrow_available, columns_to_arrow, columns_to_json,
+)
 from schemas.customer import RegressionOutput, ClusterOutput
 
 router = APIRouter()
 
-# --- Helper: Load the raw dataset ---
+# Both figures only change when the models or the data change, so each
+# payload is built once per (model fingerprint, data hash) and served as
+# pre-serialized JSON with an ETag.
+figure_cache = FigureCache()
+
+# --- Helper: The dataset ---
 # We need the original data to run these models on.
-# This is a simple way to load it for these endpoints.
-try:
-    DATA_PATH = "data/telco_customer_churn.csv"
-    df = pd.read_csv(DATA_PATH)
-    
-    # Do the same basic cleaning as the notebook
-    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-    df.dropna(inplace=True)
-except FileNotFoundError:
-    print("ERROR: data/telco_customer_churn.csv not found.")
-    df = None
+# It comes from the shared store in services/data_service.py,
+# which loads and cleans the CSV once for every router.
+
+# --- Helper: Encode and serve a payload ---
+# ?format=rows (default) keeps the original list-of-objects schema;
+# 'columns' and 'arrow' send one array per field instead.
+MEDIA_TYPES = {"rows": JSON_MEDIA_TYPE, "columns": JSON_MEDIA_TYPE, "arrow": ARROW_MEDIA_TYPE}
+
+def serialize_rows(rows: list) -> bytes:
+    """ Same JSON as FastAPI's default response for these rows. """
+    return json.dumps(rows, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def encode_figure(columns: Dict[str, np.ndarray], format: ResponseFormat) -> bytes:
+    """ Serializes a figure's columns (field name -> NumPy array) in 'format'. """
+    with stage_timer("serialize", f"figure-{format}", rows=len(next(iter(columns.values()), []))):
+        if format == "columns":
+            return columns_to_json(columns)
+        if format == "arrow":
+            return columns_to_arrow(columns)
+        names = list(columns)
+        values = [column.tolist() for column in columns.values()]
+        return serialize_rows([dict(zip(names, row)) for row in zip(*values)])
+
+# --- Helper: Downsampling ---
+# The (x, y, group) fields each figure is sampled / binned on.
+FIGURE_AXES = {
+    "regression": ("actual_monthly_charge", "predicted_monthly_charge", None),
+    "clustering": ("tenure", "monthly_charge", "cluster"),
+}
+
+# name -> (cache key, full-resolution columns). Downsampled variants are
+# cut from these, so the models run once per version, not per variant.
+_full_columns: Dict[str, Tuple[tuple, Dict[str, np.ndarray]]] = {}
+
+def get_figure_columns(name: str, columns_fn: Callable[[], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    key = figure_cache.make_key(name)
+    entry = _full_columns.get(name)
+    if entry is None or entry[0] != key:
+        entry = (key, columns_fn())
+        _full_columns[name] = entry
+    return entry[1]
+
+def build_figure(name: str, columns_fn: Callable[[], Dict[str, np.ndarray]], format: ResponseFormat,
+                 mode: Optional[DownsampleMode] = None, max_points: Optional[int] = None) -> bytes:
+    """ Computes a figure's columns, downsamples and encodes them (blocking; heavy pool). """
+    columns = get_figure_columns(name, columns_fn)
+    if mode is not None:
+        x, y, group = FIGURE_AXES[name]
+        columns = downsample_columns(columns, x, y, group, mode, max_points)
+    return encode_figure(columns, format)
+
+async def serve_figure(name: str, columns_fn: Callable[[], Dict[str, np.ndarray]],
+                       format: ResponseFormat, request: Request,
+                       mode: Optional[DownsampleMode] = None,
+                       max_points: Optional[int] = None) -> Response:
+    """
+    The cached payload of a figure in 'format' (built on the first request)
+    with its ETag, or an empty 304 if the client already has it.
+    'no-cache' lets browsers keep the payload but revalidate it every time.
+
+    With 'mode' and/or 'max_points' the figure is downsampled first
+    (mode defaults to 'sample', max_points to DEFAULT_MAX_POINTS).
+    Only full-resolution payloads are persisted to disk.
+    """
+    if format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=400, detail="format=arrow requires pyarrow on the server.")
+
+    if mode is None and max_points is None:
+        cache_name = f"{name}-{format}"
+    else:
+        mode = mode or "sample"
+        max_points = max_points or DEFAULT_MAX_POINTS
+        cache_name = f"{name}-{mode}{max_points}-{format}"
+
+    payload = await figure_cache.get_or_build(
+        cache_name,
+        partial(build_figure, name, columns_fn, format, mode, max_points),
+        persist=mode is None,
+    )
+    return payload_response(payload, request, MEDIA_TYPES[format])
+
+def payload_response(payload: FigurePayload, request: Request, media_type: str) -> Response:
+    headers = {"ETag": payload.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if payload.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type=media_type, headers=headers)
 
 # --- Endpoint 1: Regression Results ---
+def compute_regression_results():
+    """
+    Runs the Linear Regression model on the whole dataset.
+    Returns (predicted, actual) monthly charges as two arrays.
+    This is blocking work, run on the heavy inference pool.
+    """
+    # 1. Get models and data
+    regressor = get_model("regressor")
+    preprocessor = get_model("preprocessor")
+    df = get_dataset()
+    
+    # 2. Get features (X) and actual target (y)
+    # Note: We must use the *exact* dataframe 'df' that the preprocessor was trained on
+    # This assumes the preprocessor handles all feature selection
+    y_actual = df['MonthlyCharges'].to_numpy()
+    
+    # 3. Preprocess the data
+    # The preprocessor was trained on the full 'X' (df without 'Churn')
+    # We must drop 'Churn' if it's still in 'df' columns
+    X = df.drop(columns=['Churn'], errors='ignore')
+    with stage_timer("preprocess", "preprocessor", rows=len(X)):
+        processed_X = preprocessor.transform(X)
+
+    # 4. Make predictions
+    with stage_timer("inference", "regressor", rows=len(X)):
+        y_predicted = regressor.predict(processed_X)
+    return y_predicted, y_actual
+
+def regression_columns() -> Dict[str, np.ndarray]:
+    """ The /regression fields (in RegressionOutput order) as arrays. """
+    y_predicted, y_actual = compute_regression_results()
+    return {"predicted_monthly_charge": y_predicted, "actual_monthly_charge": y_actual}
+
 @router.get("/regression", response_model=list[RegressionOutput])
-async def get_regression_results():
+async def get_regression_results(request: Request, format: ResponseFormat = "rows",
+                          mode: Optional[DownsampleMode] = None,
+                          max_points: Optional[int] = Query(None, ge=1, le=MAX_FIGURE_POINTS)):
     """
     Runs the Linear Regression model on the whole dataset and
     returns the actual vs. predicted monthly charges.
+    format=columns returns {"predicted_monthly_charge": [...], "actual_monthly_charge": [...]},
+    format=arrow the same columns as an Arrow IPC stream.
+    max_points / mode=sample|hexbin|grid downsample the points: a random
+    sample, or hexagonal / square bins of (actual, predicted) with a 'count'.
+    Cached per model / data version; supports If-None-Match.
     """
-    if df is None:
+    if get_dataset() is None:
         raise HTTPException(status_code=404, detail="Dataset not found.")
 
     try:
-        # 1. Get models
-        regressor = get_model("regressor")
-        preprocessor = get_model("preprocessor")
-        
-        # 2. Get features (X) and actual target (y)
-        # Note: We must use the *exact* dataframe 'df' that the preprocessor was trained on
-        # This assumes the preprocessor handles all feature selection
-        y_actual = df['MonthlyCharges']
-        
-        # 3. Preprocess the data
-        # The preprocessor was trained on the full 'X' (df without 'Churn')
-        # We must drop 'Churn' if it's still in 'df' columns
-        X = df.drop(columns=['Churn'], errors='ignore')
-        processed_X = preprocessor.transform(X)
-
-        # 4. Make predictions
-        y_predicted = regressor.predict(processed_X)
-        
-        # 5. Format for JSON output
-        results = [
-            RegressionOutput(
-                predicted_monthly_charge=pred, 
-                actual_monthly_charge=actual
-            )
-            for pred, actual in zip(y_predicted, y_actual)
-        ]
-        
-        return results
+        return await serve_figure("regression", regression_columns, format, request, mode, max_points)
 
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error in /regression: {e}")
         raise HTTPException(status_code=500, detail="Error generating regression results.")
 
 # --- Endpoint 2: Clustering Results ---
+def compute_clustering_results():
+    """
+    Runs the K-Means model on the 'tenure' and 'MonthlyCharges' features.
+    Returns the feature frame and the cluster label of each row.
+    The clusterer is a scaler + K-Means pipeline fitted on the raw features.
+    This is blocking work, run on the heavy inference pool.
+    """
+    # 1. Get model and data
+    clusterer = get_model("clusterer")
+    df = get_dataset()
+
+    # 2. Get features
+    features_for_clustering = df[['tenure', 'MonthlyCharges']]
+
+    # 3. Make predictions
+    with stage_timer("inference", "clusterer", rows=len(features_for_clustering)):
+        cluster_labels = clusterer.predict(features_for_clustering)
+    return features_for_clustering, cluster_labels
+
+def clustering_columns() -> Dict[str, np.ndarray]:
+    """ The /clustering fields (in ClusterOutput order) as arrays. """
+    features_for_clustering, cluster_labels = compute_clustering_results()
+    return {
+        "cluster": cluster_labels,
+        "tenure": features_for_clustering['tenure'].to_numpy(dtype=float),
+        "monthly_charge": features_for_clustering['MonthlyCharges'].to_numpy(dtype=float),
+    }
+
 @router.get("/clustering", response_model=list[ClusterOutput])
-async def get_clustering_results():
+async def get_clustering_results(request: Request, format: ResponseFormat = "rows",
+                          mode: Optional[DownsampleMode] = None,
+                          max_points: Optional[int] = Query(None, ge=1, le=MAX_FIGURE_POINTS)):
     """
     Runs the K-Means model on the 'tenure' and 'MonthlyCharges'
     features and returns the cluster assignments.
+    format=columns returns {"cluster": [...], "tenure": [...], "monthly_charge": [...]},
+    format=arrow the same columns as an Arrow IPC stream.
+    max_points / mode=sample|hexbin|grid downsample the points: a sample
+    stratified by cluster, or hexagonal / square bins of (tenure, monthly
+    charge) counted per cluster, with a 'count'.
+    Cached per model / data version; supports If-None-Match.
     """
-    if df is None:
+    if get_dataset() is None:
         raise HTTPException(status_code=404, detail="Dataset not found.")
 
     try:
-        # 1. Get model
-        clusterer = get_model("clusterer")
-        
-        # 2. Get features
-        # IMPORTANT: We assume the K-Means was trained *only* on these
-        # two features and they were scaled.
-        # We must apply the *same* scaling.
-        
-        # Let's get the 'num' part of our preprocessor
-        preprocessor = get_model("preprocessor")
-        
-        # This is a bit complex, but it's the *right* way:
-        # We find the 'num' (StandardScaler) part of our preprocessor
-        scaler = preprocessor.named_transformers_['num']
-        
-        # We get just the numerical features the scaler was trained on
-        # (This assumes 'tenure' and 'MonthlyCharges' are in this list)
-        num_features = preprocessor.transformers[0][2] # e.g., ['tenure', 'MonthlyCharges', 'TotalCharges']
-        
-        # Get the data for just those features
-        numerical_data = df[num_features]
-        
-        # Scale the data
-        scaled_data = scaler.transform(numerical_data)
-        
-        # Now, get just the 'tenure' and 'MonthlyCharges' columns
-        # (Assuming they are the first two columns)
-        # This is a major assumption from your notebook.
-        # A safer way is to train a separate scaler just for K-Means.
-        
-        # --- A SIMPLER, SAFER APPROACH ---
-        # Let's assume your 'cluster_kmeans.joblib' is a pipeline
-        # that *includes* its own scaler. If not, this will fail.
-        # For simplicity, we'll assume the clusterer was trained on 
-        # just these two raw features (which is bad practice, but simple).
-        
-        features_for_clustering = df[['tenure', 'MonthlyCharges']]
-        
-        # 3. Make predictions
-        cluster_labels = clusterer.predict(features_for_clustering)
-        
-        # 4. Format for JSON output
-        results = [
-            ClusterOutput(
-                tenure=row['tenure'],
-                monthly_charge=row['MonthlyCharges'],
-                cluster=label
-            )
-            for (index, row), label in zip(features_for_clustering.iterrows(), cluster_labels)
-        ]
-        
-        return results
+        return await serve_figure("clustering", clustering_columns, format, request, mode, max_points)
 
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error in /clustering: {e}")
-        raise HTTPException(status_code=500, detail="Error generating clustering results.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error generating clustering results.")
+
+# --- Endpoint 3: Cache Stats ---
+@router.get("/stats")
+async def get_figure_stats():
+    """ Figure cache counters and the size of each cached payload in bytes. """
+    return figure_cache.get_stats()
+
+# --- Startup: Warm the Cache ---
+async def warm_figure_cache():
+    """
+    Builds (or loads from disk) the JSON payloads of every figure, so
+    the first dashboard load doesn't pay for it. Called on startup by main.py.
+    """
+    if not FIGURE_CACHE_WARMUP or get_dataset() is None:
+        return
+    for name, columns_fn in [("regression", regression_columns), ("clustering", clustering_columns)]:
+        for format in ("rows", "columns"):
+            try:
+                await figure_cache.get_or_build(f"{name}-{format}", partial(build_figure, name, columns_fn, format))
+            except Exception as e:
+                print(f"⚠️ Could not warm figure '{name}' ({format}): {e}")
+    print(f"✅ Figure cache warm ({figure_cache.get_stats()['figures']})")
@@ -1,28 +1,79 @@
 import os
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from services.static_assets import load_asset, negotiate_encoding
 
 # Define the path to your visuals directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 VISUALS_DIR = os.path.join(BASE_DIR, '..', 'reports/visuals')
 
+# How long browsers may use an image without asking again. A URL with the
+# image's current version (?v=..., listed by GET /api/images/) never
+# changes content, so it is cached for a year.
+IMAGE_MAX_AGE_S = int(os.getenv("CHURN_IMAGE_MAX_AGE_S", "86400"))
+IMMUTABLE_MAX_AGE_S = 31536000
+
 router = APIRouter()
 
+def image_path(image_name: str) -> str:
+    # Basic security check to prevent users from accessing other files
+    if ".." in image_name or "/" in image_name or "\\" in image_name:
+        raise HTTPException(status_code=400, detail="Invalid image name")
+    return os.path.join(VISUALS_DIR, image_name)
+
+# --- Endpoint: Image Versions ---
+@router.get("/")
+async def list_images():
+    """
+    Every image with its current version and a versioned URL
+    (cached by browsers for a year), plus the size of each encoding.
+    """
+    images = {}
+    for name in sorted(os.listdir(VISUALS_DIR)):
+        if not name.endswith((".svg", ".png", ".webp")):
+            continue
+        asset = await run_in_threadpool(load_asset, os.path.join(VISUALS_DIR, name))
+        images[name] = {
+            "version": asset.version,
+            "url": f"/api/images/{name}?v={asset.version}",
+            "bytes": {encoding: len(body) for encoding, body in asset.bodies.items()},
+        }
+    return images
+
+# --- Endpoint: One Image ---
 @router.get("/{image_name}")
-async def get_image(image_name: str):
+async def get_image(image_name: str, request: Request, v: Optional[str] = None):
     """
     Serves a static image file from the reports/visuals directory.
     This endpoint *will* get the correct CORS headers from main.py.
+
+    The body is brotli- or gzip-compressed when the client accepts it
+    (precompressed by the training pipeline, see services/static_assets.py),
+    with a strong ETag per encoding; If-None-Match gets an empty 304.
     """
-    
-    # Basic security check to prevent users from accessing other files
-    if ".." in image_name or "/" in image_name:
-        raise HTTPException(status_code=400, detail="Invalid image name")
+    file_path = image_path(image_name)
 
-    file_path = os.path.join(VISUALS_DIR, image_name)
-    
-    if not os.path.exists(file_path):
+    if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail=f"Image '{image_name}' not found")
-    
-    # Return the image as a file response
-    return FileResponse(file_path)
\ No newline at end of file
+
+    # Compressing a file without precompressed variants is blocking work.
+    asset = await run_in_threadpool(load_asset, file_path)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), list(asset.bodies))
+
+    max_age = f"max-age={IMMUTABLE_MAX_AGE_S}, immutable" if v == asset.version else f"max-age={IMAGE_MAX_AGE_S}"
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": f"public, {max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    client_tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if if_none_match.strip() == "*" or any(tag in asset.etags() for tag in client_tags):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
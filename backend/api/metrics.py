@@ -0,0 +1,80 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from api import figures, predict
+from services import model_service
+from services.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+# --- Pulled metrics ---
+# Queue depth, cache counters and the model version already live in the
+# services; they are read when /api/metrics is scraped.
+def collect_inference():
+    pools = ("light", "heavy")
+    return [
+        ("churn_inference_queue_depth", "gauge",
+         "Jobs submitted to an inference pool that have not finished (running + queued).",
+         [({"pool": pool}, model_service.get_queue_depth(pool)) for pool in pools]),
+        ("churn_inference_workers", "gauge", "Workers of each inference pool.",
+         [({"pool": pool}, model_service._executor_workers.get(pool, 0)) for pool in pools]),
+    ]
+
+
+def collect_caches():
+    prediction = predict.risk_profile_cache.get_stats()
+    figure = figures.figure_cache.get_stats()
+    return [
+        ("churn_cache_hits_total", "counter", "Cache lookups answered from the cache (figures: memory or disk).",
+         [({"cache": "prediction"}, prediction["hits"]),
+          ({"cache": "figure"}, figure["hits"] + figure["disk_hits"])]),
+        ("churn_cache_misses_total", "counter", "Cache lookups that had to compute the result.",
+         [({"cache": "prediction"}, prediction["misses"]), ({"cache": "figure"}, figure["builds"])]),
+        ("churn_cache_evictions_total", "counter", "Entries dropped to stay within the cache size.",
+         [({"cache": "prediction"}, prediction["evictions"]), ({"cache": "figure"}, figure["evictions"])]),
+        ("churn_cache_entries", "gauge", "Entries held in memory.",
+         [({"cache": "prediction"}, prediction["size"]), ({"cache": "figure"}, len(figure["figures"]))]),
+    ]
+
+
+def collect_micro_batcher():
+    stats = predict.risk_profile_batcher.get_stats()
+    return [
+        ("churn_microbatch_batches_total", "counter", "Micro-batches scored by /api/predict.",
+         [({}, stats["batches"])]),
+        ("churn_microbatch_items_total", "counter", "Predictions scored in micro-batches.",
+         [({}, stats["items"])]),
+        ("churn_microbatch_queued", "gauge", "Predictions waiting to be collected into a batch.",
+         [({}, stats["queued"])]),
+    ]
+
+
+def collect_models():
+    bundle = model_service.current_bundle()
+    if bundle is None:
+        return []
+    return [
+        ("churn_model_info", "gauge", "The model version being served (value is always 1).",
+         [({"version": bundle.version, "fingerprint": bundle.fingerprint[:16]}, 1)]),
+        ("churn_model_generation", "gauge", "Incremented on every model load, reload or rollback.",
+         [({}, bundle.generation)]),
+        ("churn_models_loaded", "gauge", "Models of the active version loaded in this process.",
+         [({}, len(bundle.models))]),
+    ]
+
+
+for collect in (collect_inference, collect_caches, collect_micro_batcher, collect_models):
+    registry.register_collector(collect)
+
+
+# --- Endpoint: Prometheus scrape target ---
+@router.get("")
+async def get_metrics():
+    """
+    Every metric in the Prometheus text format: per-route latency
+    histograms and status counts (churn_http_*), time per model stage
+    (churn_model_stage_*: preprocess / inference / explain / serialize),
+    inference queue depth, cache hit rates and the model version.
+    Metrics are per process: scrape every worker.
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
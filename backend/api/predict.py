@@ -1,69 +1,219 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File
 import pandas as pd
 
 # Import our helper functions and Pydantic models
 from services.model_service import (
-    get_model,
-    preprocess_input
+    get_model_metadata,
+    customers_to_frame,
+    read_customers_csv,
+    transform_features,
+    predict_proba_features,
+    predict_proba_batch,
+    run_sweep,
+    explain_features,
+    explanation_stats,
+    EXPLANATION_MODE,
+    EXPLANATION_BUDGET_MS,
+    run_inference,
+    InferenceQueueFull,
+    MAX_BATCH_SIZE
 )
 from schemas.customer import (
     CustomerInput,
     RiskProfileResponse,
     ClassificationOutput,
-    FeatureImportance
+    BatchPredictionResponse,
+    SweepRequest,
+    SweepResponse,
+    SweepAxisOutput
 )
+from services import model_service
+from services.micro_batcher import MicroBatcher, MICROBATCH_ENABLED
+from services.prediction_cache import PredictionCache, PREDICTION_CACHE_ENABLED
 
 router = APIRouter()
 
-@router.post("/", response_model=RiskProfileResponse)
-async def predict_churn(input_data: CustomerInput):
+def build_risk_profiles(customers: list[CustomerInput]) -> list[RiskProfileResponse]:
     """
-    Receives customer data and returns a full risk profile.
+    Scores a list of customers and builds one risk profile for each.
+    All customers share one preprocess + predict_proba call.
+    This is blocking (sklearn) work, so the routes run it on the
+    inference thread pool instead of the event loop.
     """
-    
-    try:
-        # 1. Get models from cache
-        classifier = get_model("classifier")
-        preprocessor = get_model("preprocessor")
-
-        # 2. Preprocess the raw input data
-        processed_df = preprocess_input(input_data)
-        
-        # 3. Make Prediction
-        prediction_proba = classifier.predict_proba(processed_df)
-        churn_probability = prediction_proba[0][1] # Probability of class 1 (Churn)
-        churn_prediction = 1 if churn_probability > 0.35 else 0
-
-        # 4. Get Feature Importances (The "Why")
-        feature_names = preprocessor.get_feature_names_out()
-        importances = classifier.feature_importances_
-        
-        importance_df = pd.DataFrame({
-            'feature': feature_names,
-            'importance': importances
-        }).sort_values(by='importance', ascending=False)
-        
-        top_3_features = importance_df.head(3)
-
-        top_risk_factors = [
-            FeatureImportance(
-                feature=row['feature'], 
-                importance=row['importance']
-            ) 
-            for _, row in top_3_features.iterrows()
-        ]
-
-        # 5. Return the final JSON object
-        return RiskProfileResponse(
+    # 1. Get the precomputed metadata (threshold, feature names)
+    metadata = get_model_metadata()
+
+    # 2. Preprocess the raw input data and make predictions (one pass)
+    features = transform_features(customers_to_frame(customers))
+    churn_probabilities = predict_proba_features(features)
+
+    # 3. The "Why": each customer's own top risk factors
+    risk_factors = explain_features(features)
+
+    # 4. Return one JSON object per customer
+    return [
+        RiskProfileResponse(
             classification=ClassificationOutput(
-                prediction=churn_prediction,
+                prediction=1 if churn_probability > metadata.threshold else 0,
                 probability=churn_probability
             ),
             top_risk_factors=top_risk_factors
         )
+        for churn_probability, top_risk_factors in zip(churn_probabilities, risk_factors)
+    ]
 
+
+def build_risk_profile(input_data: CustomerInput) -> RiskProfileResponse:
+    """ Scores one customer (used when micro-batching is disabled). """
+    return build_risk_profiles([input_data])[0]
+
+
+# Concurrent /api/predict calls are grouped and scored together.
+risk_profile_batcher = MicroBatcher(build_risk_profiles)
+
+# Repeated /api/predict calls (slider back-and-forth, default profile on
+# page load) are answered from memory.
+risk_profile_cache = PredictionCache()
+
+
+@router.post("/", response_model=RiskProfileResponse)
+async def predict_churn(input_data: CustomerInput):
+    """
+    Receives customer data and returns a full risk profile.
+    """
+    
+    try:
+        if PREDICTION_CACHE_ENABLED:
+            cache_key = risk_profile_cache.make_key(input_data)
+            cached = risk_profile_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            generation = model_service.model_generation
+
+        if MICROBATCH_ENABLED:
+            profile = await risk_profile_batcher.submit(input_data)
+        else:
+            profile = await run_inference(build_risk_profile, input_data)
+
+        if PREDICTION_CACHE_ENABLED:
+            risk_profile_cache.put(cache_key, profile, generation)
+        return profile
+
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         print(f"Error during prediction: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+
+# --- Batch Scoring ---
+
+async def _score_frame(input_df: pd.DataFrame) -> BatchPredictionResponse:
+    """
+    Scores a whole frame of customers in vectorized chunks and packs the
+    results into compact, index-aligned arrays.
+    """
+    if len(input_df) == 0:
+        raise HTTPException(status_code=422, detail="At least one customer is required.")
+    if len(input_df) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(input_df)} customers (max {MAX_BATCH_SIZE})."
+        )
+
+    try:
+        probabilities = await run_inference(predict_proba_batch, input_df, heavy=True)
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        print(f"Error during batch prediction: {e}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+    threshold = get_model_metadata().threshold
+    predictions = (probabilities > threshold).astype(int)
+    return BatchPredictionResponse(
+        count=len(probabilities),
+        threshold=threshold,
+        probabilities=probabilities.tolist(),
+        predictions=predictions.tolist()
+    )
+
+
+@router.post("/batch", response_model=BatchPredictionResponse)
+async def predict_churn_batch(customers: list[CustomerInput]):
+    """
+    Scores a JSON array of customers in one go.
+    Results are returned in the same order as the input.
+    """
+    return await _score_frame(customers_to_frame(customers))
+
+
+@router.post("/batch/csv", response_model=BatchPredictionResponse)
+async def predict_churn_batch_csv(file: UploadFile = File(...)):
+    """
+    Scores every row of an uploaded CSV file (same columns as the
+    training data; customerID and Churn are ignored if present).
+    """
+    raw = await file.read()
+    try:
+        input_df = read_customers_csv(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"Error reading batch CSV: {e}")
+        raise HTTPException(status_code=400, detail="Could not parse the uploaded CSV file.")
+
+    return await _score_frame(input_df)
+
+
+# --- What-If Sweeps ---
+@router.post("/sweep", response_model=SweepResponse)
+async def predict_churn_sweep(request: SweepRequest):
+    """
+    Varies one or two features of a base customer over a range (or a
+    list of categories) and returns the churn probability at every
+    grid point, scored in a single vectorized pass.
+    """
+    try:
+        axes, shape, probabilities = await run_inference(
+            run_sweep, request.base, request.axes, request.derive_total_charges, heavy=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        print(f"Error during sweep: {e}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+    return SweepResponse(
+        axes=[SweepAxisOutput(feature=feature, values=values) for feature, values in axes],
+        shape=shape,
+        threshold=get_model_metadata().threshold,
+        probabilities=probabilities.tolist()
+    )
+
+
+# --- Scoring Stats ---
+@router.get("/stats")
+async def get_prediction_stats():
+    """
+    Returns the micro-batcher's batch-size distribution (useful for tuning
+    CHURN_MICROBATCH_MAX_WAIT_MS / _MAX_SIZE), the prediction cache's
+    hit/miss/eviction counters and explanation timings.
+    """
+    return {
+        "micro_batcher": risk_profile_batcher.get_stats(),
+        "cache": risk_profile_cache.get_stats(),
+        "explanations": {
+            "mode": EXPLANATION_MODE,
+            "budget_ms_per_customer": EXPLANATION_BUDGET_MS,
+            **explanation_stats,
+        },
+    }
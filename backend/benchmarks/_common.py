@@ -0,0 +1,129 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Every benchmark is a plain script that is run from the 'backend/' folder:
+
+    python benchmarks/bench_batch_predict.py
+
+Importing this module puts 'backend/' on sys.path and makes it the working
+directory, so the scripts can use the same imports (and the same relative
+data paths) as the API itself.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import statistics
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_PATH = os.path.join(BACKEND_DIR, 'data/telco_customer_churn.csv')
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+
+def load_sample_customers(n_rows=None):
+    """
+    Returns the cleaned dataset as model inputs (no customerID / Churn).
+    If 'n_rows' is larger than the dataset, the rows are repeated.
+    """
+    import pandas as pd
+    from services import data_service
+
+    df = data_service.clean_dataframe(pd.read_csv(DATA_PATH))
+    df = df.drop(columns=data_service.DROPPED_COLUMNS + ['Churn'])
+
+    if n_rows is None:
+        return df
+    if n_rows > len(df):
+        repeats = int(np.ceil(n_rows / len(df)))
+        df = pd.concat([df] * repeats, ignore_index=True)
+    return df.iloc[:n_rows].reset_index(drop=True)
+
+
+def time_calls(fn, repeat=20, warmup=2):
+    """
+    Calls 'fn' repeatedly and returns the wall time of each call in seconds.
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings):
+    """ Returns min/mean/p50/p95/p99 (in milliseconds) for a list of timings. """
+    ms = np.asarray(timings) * 1000.0
+    return {
+        "min_ms": float(ms.min()),
+        "mean_ms": float(statistics.fmean(ms)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def print_table(title, rows):
+    """ Prints a list of (label, dict-of-numbers) rows as an aligned table. """
+    print("\n" + "=" * 80)
+    print(title)
+    print("=" * 80)
+    if not rows:
+        return
+    keys = list(rows[0][1].keys())
+    widths = [max(14, len(k) + 2) for k in keys]
+    label_width = max(len(label) for label, _ in rows) + 2
+    print("".ljust(label_width) + "".join(k.rjust(w) for k, w in zip(keys, widths)))
+    for label, values in rows:
+        cells = "".join(
+            f"{values[k]:{w}.3f}" if isinstance(values[k], float) else str(values[k]).rjust(w)
+            for k, w in zip(keys, widths)
+        )
+        print(label.ljust(label_width) + cells)
+
+
+# --- Results files (compare runs across commits) ---
+def git_revision():
+    """ Short hash of the checked-out commit, with '-dirty' for uncommitted changes. """
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return revision + ("-dirty" if dirty else "")
+
+
+def save_results(path, suite, rows, **settings):
+    """
+    Writes a table's rows as JSON, with the commit, the machine and the
+    run's settings, for benchmarks/compare_results.py.
+    """
+    document = {
+        "suite": suite,
+        "commit": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": settings,
+        "results": {label: values for label, values in rows},
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    print(f"Results written to {path} (commit {document['commit']})")
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,63 @@
+"""
+Batch vs. single-row scoring throughput.
+
+Compares N calls of the single-customer path used by POST /api/predict
+(one-row DataFrame -> preprocess_input -> predict_proba) against one call
+of predict_proba_batch, which runs one transform and one predict_proba per
+chunk.
+
+Usage (from backend/):
+    python benchmarks/bench_batch_predict.py [--sizes 100 1000 10000]
+"""
+import argparse
+import time
+
+from _common import load_sample_customers, print_table
+
+from schemas.customer import CustomerInput
+from services import model_service
+
+
+def run_single_calls(customers, classifier):
+    for customer in customers:
+        processed_df = model_service.preprocess_input(customer)
+        classifier.predict_proba(processed_df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--single-limit", type=int, default=1000,
+                        help="Max single calls to time; larger sizes are extrapolated.")
+    args = parser.parse_args()
+
+    model_service.load_all_models()
+    classifier = model_service.get_model("classifier")
+
+    rows = []
+    for size in args.sizes:
+        df = load_sample_customers(size)
+
+        n_single = min(size, args.single_limit)
+        customers = [CustomerInput(**record) for record in df.iloc[:n_single].to_dict('records')]
+        start = time.perf_counter()
+        run_single_calls(customers, classifier)
+        single_s = (time.perf_counter() - start) * size / n_single
+
+        start = time.perf_counter()
+        model_service.predict_proba_batch(df)
+        batch_s = time.perf_counter() - start
+
+        rows.append((f"{size} customers", {
+            "single_s": single_s,
+            "batch_s": batch_s,
+            "single_rows/s": size / single_s,
+            "batch_rows/s": size / batch_s,
+            "speedup": single_s / batch_s,
+        }))
+
+    print_table("POST /api/predict x N  vs.  POST /api/predict/batch (service layer)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Dataset memory: duplicate per-router copies vs. the shared columnar store.
+
+Scales the CSV to each requested size, then measures (in a fresh process
+per case, so the numbers don't leak into each other) how much resident
+memory the dataset adds:
+
+  legacy  - what the routers used to hold: figures.py's own cleaned frame,
+            explorer.py's cleaned frame, and its list-of-dicts copy.
+  shared  - one compact frame from services/data_service.py, handed out
+            to every router as views.
+
+Usage (from backend/):
+    python benchmarks/bench_dataset_memory.py [--sizes 7032 100000 500000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from _common import BACKEND_DIR, DATA_PATH, print_table
+
+CHILD_SCRIPT = r"""
+import json, sys
+import pandas as pd
+sys.path.insert(0, {backend_dir!r})
+from services import data_service
+
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+
+def legacy(path):
+    figures_df = pd.read_csv(path)
+    figures_df['TotalCharges'] = pd.to_numeric(figures_df['TotalCharges'], errors='coerce')
+    figures_df.dropna(inplace=True)
+
+    explorer_df = pd.read_csv(path)
+    explorer_df['TotalCharges'] = pd.to_numeric(explorer_df['TotalCharges'], errors='coerce')
+    explorer_df.dropna(inplace=True)
+    explorer_df = explorer_df.drop('customerID', axis=1)
+    records = explorer_df.to_dict('records')
+    return figures_df, explorer_df, records
+
+
+def shared(path):
+    store = data_service.load_dataset(path)
+    return store, data_service.get_dataset(), data_service.get_dataset()
+
+
+before = rss_kb()
+held = {{'legacy': legacy, 'shared': shared}}[sys.argv[1]](sys.argv[2])
+print(json.dumps({{'rss_mb': (rss_kb() - before) / 1024}}))
+"""
+
+
+def write_scaled_csv(n_rows, directory):
+    raw = pd.read_csv(DATA_PATH)
+    repeats = -(-n_rows // len(raw))
+    scaled = pd.concat([raw] * repeats, ignore_index=True).iloc[:n_rows]
+    path = os.path.join(directory, f"telco_{n_rows}.csv")
+    scaled.to_csv(path, index=False)
+    return path
+
+
+def measure(case, csv_path):
+    script = CHILD_SCRIPT.format(backend_dir=BACKEND_DIR)
+    output = subprocess.run([sys.executable, "-c", script, case, csv_path],
+                            capture_output=True, text=True, check=True).stdout
+    # load_dataset prints a status line; the measurement is the last line.
+    return json.loads(output.strip().splitlines()[-1])["rss_mb"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7032, 100000, 500000])
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            csv_path = write_scaled_csv(size, directory)
+            legacy_mb = measure("legacy", csv_path)
+            shared_mb = measure("shared", csv_path)
+            rows.append((f"{size} rows", {
+                "legacy_rss_mb": legacy_mb,
+                "shared_rss_mb": shared_mb,
+                "reduction_x": legacy_mb / max(shared_mb, 1e-9),
+            }))
+
+    print_table("Dataset memory: per-router copies vs. shared store (RSS added)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Dataset startup time: parsing the CSV vs. memory-mapping the binary cache.
+
+Scales the CSV to each requested size and, in a fresh process per case
+(like a new uvicorn worker), times services/data_service.load_dataset():
+
+  csv         - cache disabled: parse, coerce and clean the CSV text.
+  csv+write   - first start after the CSV changed: parse, then write the cache.
+  cache       - cache up to date: hash the CSV and memory-map the cache.
+
+Usage (from backend/):
+    python benchmarks/bench_dataset_startup.py [--sizes 7032 100000 1000000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from _common import BACKEND_DIR, DATA_PATH, print_table
+
+CHILD_SCRIPT = r"""
+import json, sys, time
+sys.path.insert(0, {backend_dir!r})
+from services import data_service
+
+start = time.perf_counter()
+data_service.load_dataset(sys.argv[1])
+total_ms = (time.perf_counter() - start) * 1000.0
+print(json.dumps({{'source': data_service.dataset_info['source'], 'load_ms': total_ms}}))
+"""
+
+
+def write_scaled_csv(n_rows, directory):
+    raw = pd.read_csv(DATA_PATH)
+    repeats = -(-n_rows // len(raw))
+    scaled = pd.concat([raw] * repeats, ignore_index=True).iloc[:n_rows]
+    path = os.path.join(directory, f"telco_{n_rows}.csv")
+    scaled.to_csv(path, index=False)
+    return path
+
+
+def start_worker(csv_path, cache_dir, cache_enabled):
+    env = dict(os.environ,
+               CHURN_DATASET_CACHE_DIR=cache_dir,
+               CHURN_DATASET_CACHE_ENABLED="1" if cache_enabled else "0")
+    script = CHILD_SCRIPT.format(backend_dir=BACKEND_DIR)
+    output = subprocess.run([sys.executable, "-c", script, csv_path],
+                            capture_output=True, text=True, check=True, env=env).stdout
+    # load_dataset prints a status line; the measurement is the last line.
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7032, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3, help="Warm-cache starts to average.")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            csv_path = write_scaled_csv(size, directory)
+            cache_dir = os.path.join(directory, f"cache_{size}")
+
+            csv_ms = start_worker(csv_path, cache_dir, cache_enabled=False)["load_ms"]
+            first = start_worker(csv_path, cache_dir, cache_enabled=True)
+            warm = [start_worker(csv_path, cache_dir, cache_enabled=True) for _ in range(args.repeat)]
+            assert first["source"] == "csv" and all(run["source"] == "cache" for run in warm)
+            cache_ms = sum(run["load_ms"] for run in warm) / len(warm)
+
+            rows.append((f"{size} rows", {
+                "csv_ms": csv_ms,
+                "csv+write_ms": first["load_ms"],
+                "cache_ms": cache_ms,
+                "speedup_x": csv_ms / cache_ms,
+            }))
+
+    print_table("Dataset startup: CSV parse vs. binary cache (per worker)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Latency of per-customer tree-path explanations.
+
+Checks that the compiled forest's contributions add up to sklearn's
+predict_proba (bias + sum(contributions) == probability), then times
+explain_features for single customers (the playground slider loop) and
+for batches, and compares the per-customer p99 with the configured
+budget (CHURN_EXPLANATION_BUDGET_MS).
+
+Usage (from backend/):
+    python benchmarks/bench_explanations.py [--repeat 500] [--batch-sizes 1 16 64 1000]
+"""
+import argparse
+
+import numpy as np
+
+from _common import load_sample_customers, time_calls, summarize, print_table
+
+from services import model_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64, 1000])
+    args = parser.parse_args()
+
+    model_service.load_all_models()
+    forest = model_service.get_model("classifier_compiled")
+    features = model_service.transform_features(load_sample_customers())
+
+    bias, contributions = forest.contributions(features)
+    error = np.abs(bias + contributions.sum(axis=1) - model_service.predict_proba_features(features)).max()
+    print(f"Additivity check over {len(features)} customers: max |bias + sum(contrib) - p| = {error:.2e}")
+
+    rows = []
+    budget = model_service.EXPLANATION_BUDGET_MS
+    for size in args.batch_sizes:
+        batch = features[:size]
+        repeat = max(5, args.repeat // max(1, size // 16))
+        stats = summarize(time_calls(lambda: model_service.explain_features(batch), repeat=repeat))
+        per_customer = {k: v / size for k, v in stats.items() if k in ("p50_ms", "p95_ms", "p99_ms")}
+        per_customer["within_budget"] = "yes" if per_customer["p99_ms"] <= budget else "NO"
+        rows.append((f"batch of {size} (per customer)", per_customer))
+
+    print_table(f"explain_features latency (budget {budget:.1f} ms per customer)", rows)
+
+
+if __name__ == "__main__":
+    main()
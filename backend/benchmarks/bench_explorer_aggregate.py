@@ -0,0 +1,73 @@
+"""
+Explorer payloads: full row dump vs. server-side aggregates.
+
+For a dataset scaled to each requested size, compares the JSON size and
+time of the full records dump (GET /api/explorer/) with the KPI and
+group-by responses (GET /api/explorer/kpis, /aggregate), cold (first
+query, builds group codes) and warm (memoized).
+
+Usage (from backend/):
+    python benchmarks/bench_explorer_aggregate.py [--sizes 7032 100000 1000000]
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from _common import DATA_PATH, print_table
+
+from services.aggregation_service import AggregationEngine
+
+
+def load_scaled(n_rows):
+    df = pd.read_csv(DATA_PATH)
+    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
+    df = df.dropna().drop(columns=['customerID'])
+    repeats = -(-n_rows // len(df))
+    return pd.concat([df] * repeats, ignore_index=True).iloc[:n_rows]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7032, 100000, 1000000])
+    parser.add_argument("--skip-dump-above", type=int, default=200000,
+                        help="Don't build the full JSON dump for datasets larger than this.")
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        df = load_scaled(size)
+
+        if size <= args.skip_dump_above:
+            dump, dump_ms = timed(lambda: json.dumps(df.to_dict('records')))
+            dump_kb = len(dump) / 1024
+        else:
+            dump_ms, dump_kb = float("nan"), float("nan")
+
+        engine = AggregationEngine(df)
+        _, cold_ms = timed(lambda: engine.aggregate("Contract", ["count", "churned", "churn_rate", "avg_tenure"]))
+        aggregate, warm_ms = timed(lambda: engine.aggregate("Contract", ["count", "churned", "churn_rate", "avg_tenure"]))
+        kpis, kpi_ms = timed(engine.kpis)
+
+        rows.append((f"{size} rows", {
+            "dump_kb": dump_kb,
+            "dump_ms": dump_ms,
+            "aggregate_kb": len(json.dumps(aggregate)) / 1024,
+            "agg_cold_ms": cold_ms,
+            "agg_warm_ms": warm_ms,
+            "kpis_kb": len(json.dumps(kpis)) / 1024,
+            "kpis_ms": kpi_ms,
+        }))
+
+    print_table("Explorer: full dump vs. aggregates", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Figure downsampling: payload size and build time as the data grows.
+
+For clustering-shaped data (cluster, tenure, monthly_charge) scaled to
+each requested size, builds the format=columns payload of the full
+figure and of every downsampling mode (?mode=...&max_points=N).
+
+Usage (from backend/):
+    python benchmarks/bench_figure_downsampling.py [--sizes 7032 100000 1000000] [--max-points 2000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from _common import print_table
+
+from services.downsampling import downsample_columns
+from api.figures import encode_figure
+
+
+def make_columns(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    cluster = rng.choice(3, n_rows, p=[0.5, 0.3, 0.2]).astype(np.int32)
+    return {
+        "cluster": cluster,
+        "tenure": np.clip(rng.normal(12 + 24 * cluster, 10), 0, 72).round(),
+        "monthly_charge": np.round(rng.uniform(18.25, 118.75, n_rows), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7032, 100000, 1000000])
+    parser.add_argument("--max-points", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        columns = make_columns(size)
+        for mode in [None, "sample", "hexbin", "grid"]:
+            start = time.perf_counter()
+            figure = columns if mode is None else downsample_columns(
+                columns, "tenure", "monthly_charge", "cluster", mode, args.max_points
+            )
+            body = encode_figure(figure, "columns")
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            rows.append((f"{size} rows {mode or 'full'}", {
+                "points": len(figure["cluster"]),
+                "build_ms": elapsed_ms,
+                "size_kb": len(body) / 1024,
+            }))
+
+    print_table(f"Clustering figure: full vs. downsampled (max_points={args.max_points})", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Figure endpoints: rebuilding per request vs. the cached payloads.
+
+Times GET /api/figures/regression and /clustering through the ASGI app:
+
+  build   - payload rebuilt on every request (cache disabled): transform,
+            predict and serialize the whole dataset.
+  cached  - pre-serialized payload served from memory (200 + body).
+  304     - client sends If-None-Match with the current ETag (no body).
+
+Usage (from backend/):
+    python benchmarks/bench_figures.py [--repeat 50]
+"""
+import argparse
+
+from _common import print_table, summarize, time_calls
+
+from fastapi.testclient import TestClient
+
+from main import app
+from api import figures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = []
+    with TestClient(app) as client:
+        for name in ["regression", "clustering"]:
+            url = f"/api/figures/{name}"
+
+            figures.figure_cache.enabled = False
+            build = time_calls(lambda: client.get(url), repeat=max(3, args.repeat // 10), warmup=1)
+            figures.figure_cache.enabled = True
+
+            response = client.get(url)
+            etag = response.headers["etag"]
+            cached = time_calls(lambda: client.get(url), repeat=args.repeat)
+            not_modified = time_calls(lambda: client.get(url, headers={"If-None-Match": etag}), repeat=args.repeat)
+
+            for label, timings in [("build", build), ("cached", cached), ("304", not_modified)]:
+                stats = summarize(timings)
+                rows.append((f"{name} {label}", {
+                    "p50_ms": stats["p50_ms"],
+                    "p99_ms": stats["p99_ms"],
+                    "body_kb": len(response.content) / 1024 if label != "304" else 0.0,
+                }))
+
+    print_table("Figure endpoints: per-request build vs. cached payload vs. 304", rows)
+
+
+if __name__ == "__main__":
+    main()
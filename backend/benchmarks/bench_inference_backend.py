@@ -0,0 +1,64 @@
+"""
+sklearn vs. compiled RandomForest inference.
+
+First checks that the compiled engine (services/tree_engine.py) matches
+RandomForestClassifier.predict_proba to within 1e-9 on the whole dataset
+(and exits non-zero if it does not), then compares single-row and batch
+latency of both backends on already-transformed features.
+
+Usage (from backend/):
+    python benchmarks/bench_inference_backend.py [--batch-sizes 1 64 1000 10000]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from _common import load_sample_customers, time_calls, summarize, print_table
+
+from services import model_service
+
+PARITY_TOLERANCE = 1e-9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    model_service.load_all_models()
+    classifier = model_service.get_model("classifier")
+    compiled = model_service.get_model("classifier_compiled")
+    churn_column = model_service.get_model_metadata().churn_class_index
+
+    features = model_service.transform_features(load_sample_customers(max(args.batch_sizes)))
+
+    expected = classifier.predict_proba(features)[:, churn_column]
+    actual = compiled.predict_proba(features)
+    max_error = float(np.abs(expected - actual).max())
+    print(f"Parity over {len(features)} rows: max |sklearn - compiled| = {max_error:.2e} "
+          f"(tolerance {PARITY_TOLERANCE:.0e})")
+    if max_error > PARITY_TOLERANCE:
+        print("❌ Compiled engine does not match sklearn.")
+        sys.exit(1)
+
+    rows = []
+    for size in args.batch_sizes:
+        batch = features[:size]
+        repeat = max(5, args.repeat // max(1, size // 1000))
+        sk = summarize(time_calls(lambda: classifier.predict_proba(batch), repeat=repeat))
+        cp = summarize(time_calls(lambda: compiled.predict_proba(batch), repeat=repeat))
+        rows.append((f"{size} rows", {
+            "sklearn_p50_ms": sk["p50_ms"],
+            "compiled_p50_ms": cp["p50_ms"],
+            "sklearn_p99_ms": sk["p99_ms"],
+            "compiled_p99_ms": cp["p99_ms"],
+            "speedup_p50": sk["p50_ms"] / cp["p50_ms"],
+        }))
+
+    print_table("predict_proba latency by backend", rows)
+
+
+if __name__ == "__main__":
+    main()
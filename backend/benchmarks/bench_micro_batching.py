@@ -0,0 +1,79 @@
+"""
+Throughput of POST /api/predict with and without the micro-batcher.
+
+Drives the FastAPI app in-process (httpx + ASGI transport) with a fixed
+number of concurrent clients, each sending single-customer requests.
+
+Usage (from backend/):
+    python benchmarks/bench_micro_batching.py [--requests 2000] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import time
+
+from _common import load_sample_customers, summarize, print_table
+
+import httpx
+
+import main
+from api import predict
+
+
+async def drive(app, payloads, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/api/predict/", json=payload)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies
+
+
+async def run(args):
+    payloads = load_sample_customers(args.requests).to_dict('records')
+
+    rows = []
+    async with main.app.router.lifespan_context(main.app):
+        for enabled in (False, True):
+            predict.MICROBATCH_ENABLED = enabled
+            predict.risk_profile_batcher.batch_sizes.clear()
+            predict.risk_profile_batcher.items_scored = 0
+
+            elapsed, latencies = await drive(main.app, payloads, args.concurrency)
+            stats = summarize(latencies)
+            row = {
+                "req/s": len(payloads) / elapsed,
+                "p50_ms": stats["p50_ms"],
+                "p99_ms": stats["p99_ms"],
+            }
+            if enabled:
+                row["mean_batch"] = predict.risk_profile_batcher.get_stats()["mean_batch_size"]
+            else:
+                row["mean_batch"] = 1.0
+            rows.append(("micro-batching " + ("on" if enabled else "off"), row))
+
+        print_table(f"POST /api/predict, {args.requests} requests, concurrency {args.concurrency}", rows)
+        print("\nBatch-size histogram:", predict.risk_profile_batcher.get_stats()["batch_size_histogram"])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
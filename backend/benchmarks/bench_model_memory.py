@@ -0,0 +1,144 @@
+"""
+Model memory across workers: unpickled per process vs. memory-mapped.
+
+Publishes the models in models/ into a temporary registry (which exports
+the forest as .npy node arrays), then starts N worker processes at once,
+like `uvicorn main:app --workers N`. Each one loads the models through
+model_service.load_all_models and scores one customer; once all of them
+are up, each reports what the models added to its memory:
+
+  rss_mb      - resident memory (shared pages are counted in every worker)
+  pss_mb      - proportional share: shared pages divided among the workers
+                that map them; the sum over workers is the real total
+  private_mb  - pages only this worker has
+
+Cases:
+  joblib            - CHURN_MODEL_MMAP=0: every worker unpickles all models
+                      and compiles its own copy of the forest (the old path).
+  mmap_sklearn      - node arrays mapped, but the sklearn inference backend
+                      still unpickles the forest in each worker.
+  mmap_compiled     - node arrays mapped and CHURN_INFERENCE_BACKEND=compiled:
+                      the sklearn forest is never unpickled.
+
+Usage (from backend/):
+    python benchmarks/bench_model_memory.py [--workers 8]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from _common import BACKEND_DIR, print_table
+
+CHILD_SCRIPT = r"""
+import json, sys, time
+sys.path.insert(0, {backend_dir!r})
+import numpy, pandas, sklearn.ensemble, joblib
+
+
+def memory_kb():
+    values = {{}}
+    with open('/proc/self/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {{
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'private': values['Private_Clean'] + values['Private_Dirty'],
+    }}
+
+
+from services import model_service
+from schemas.customer import CustomerInput
+from api.predict import build_risk_profile
+
+before = memory_kb()
+start = time.perf_counter()
+model_service.load_all_models()
+load_ms = (time.perf_counter() - start) * 1000.0
+build_risk_profile(CustomerInput(**{customer!r}))
+
+print('ready', flush=True)
+sys.stdin.readline()  # wait until every worker is up, so shared pages are counted once
+after = memory_kb()
+print(json.dumps({{'load_ms': load_ms, **{{k: (after[k] - before[k]) / 1024 for k in after}}}}), flush=True)
+"""
+
+CUSTOMER = {
+    "gender": "Female", "SeniorCitizen": 0, "Partner": "Yes", "Dependents": "No", "tenure": 5,
+    "PhoneService": "Yes", "MultipleLines": "No", "InternetService": "Fiber optic",
+    "OnlineSecurity": "No", "OnlineBackup": "No", "DeviceProtection": "No", "TechSupport": "No",
+    "StreamingTV": "No", "StreamingMovies": "No", "Contract": "Month-to-month",
+    "PaperlessBilling": "Yes", "PaymentMethod": "Electronic check",
+    "MonthlyCharges": 80.0, "TotalCharges": 400.0,
+}
+
+CASES = {
+    "joblib": {"CHURN_MODEL_MMAP": "0"},
+    "mmap_sklearn": {"CHURN_MODEL_MMAP": "1", "CHURN_INFERENCE_BACKEND": "sklearn"},
+    "mmap_compiled": {"CHURN_MODEL_MMAP": "1", "CHURN_INFERENCE_BACKEND": "compiled"},
+}
+
+
+def publish_registry(registry_dir):
+    """ Publishes models/ as version v0001 of a registry in 'registry_dir'. """
+    script = (
+        "import sys, joblib; sys.path.insert(0, {backend_dir!r})\n"
+        "from services import model_registry as r\n"
+        "r.publish_version({{name: joblib.load(r.MODEL_DIR + '/' + f) for name, f in r.MODEL_FILES.items()}})\n"
+    ).format(backend_dir=BACKEND_DIR)
+    subprocess.run([sys.executable, "-c", script], check=True,
+                   env=dict(os.environ, CHURN_MODEL_REGISTRY_DIR=registry_dir))
+
+
+def run_workers(n_workers, env):
+    script = CHILD_SCRIPT.format(backend_dir=BACKEND_DIR, customer=CUSTOMER)
+    workers = [
+        subprocess.Popen([sys.executable, "-c", script], env=env, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        for _ in range(n_workers)
+    ]
+    # load_all_models prints status lines; wait for every worker's 'ready'.
+    for worker in workers:
+        for line in worker.stdout:
+            if line.strip() == "ready":
+                break
+    results = []
+    for worker in workers:
+        worker.stdin.write("\n")
+        worker.stdin.flush()
+    for worker in workers:
+        results.append(json.loads(worker.stdout.readline()))
+        worker.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as registry_dir:
+        publish_registry(registry_dir)
+        for case, settings in CASES.items():
+            env = dict(os.environ, CHURN_MODEL_REGISTRY_DIR=registry_dir, **settings)
+            results = run_workers(args.workers, env)
+            mean = lambda key: sum(r[key] for r in results) / len(results)
+            rows.append((case, {
+                "load_ms": mean("load_ms"),
+                "rss_mb": mean("rss"),
+                "pss_mb": mean("pss"),
+                "private_mb": mean("private"),
+                "total_pss_mb": sum(r["pss"] for r in results),
+            }))
+
+    print_table(f"Model memory per worker ({args.workers} workers, averages; total = all workers)", rows)
+
+
+if __name__ == "__main__":
+    main()
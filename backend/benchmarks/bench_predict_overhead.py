@@ -0,0 +1,70 @@
+"""
+Where does a single /api/predict request spend its time?
+
+Breaks one build_risk_profiles([customer]) call into frame building,
+preprocessing, predict_proba and everything else, and shows what the
+old per-request work cost before it moved into ModelMetadata: the
+importance ranking (get_feature_names_out + DataFrame sort + iterrows)
+and ColumnTransformer.transform (now a NumPy pass over FeatureLayout).
+
+Usage (from backend/):
+    python benchmarks/bench_predict_overhead.py [--repeat 200]
+"""
+import argparse
+
+import pandas as pd
+
+from _common import load_sample_customers, time_calls, summarize, print_table
+
+from schemas.customer import CustomerInput, FeatureImportance
+from services import model_service
+from api.predict import build_risk_profiles
+
+
+def legacy_importances():
+    """ The importance ranking /api/predict used to redo on every request. """
+    classifier = model_service.get_model("classifier")
+    preprocessor = model_service.get_model("preprocessor")
+    importance_df = pd.DataFrame({
+        'feature': preprocessor.get_feature_names_out(),
+        'importance': classifier.feature_importances_
+    }).sort_values(by='importance', ascending=False)
+    return [
+        FeatureImportance(feature=row['feature'], importance=row['importance'])
+        for _, row in importance_df.head(3).iterrows()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    model_service.load_all_models()
+    classifier = model_service.get_model("classifier")
+    preprocessor = model_service.get_model("preprocessor")
+
+    customer = CustomerInput(**load_sample_customers(1).to_dict('records')[0])
+    frame = model_service.customers_to_frame([customer])
+    features = model_service.transform_features(frame)
+
+    stages = {
+        "total (build_risk_profiles)": lambda: build_risk_profiles([customer]),
+        "customers_to_frame": lambda: model_service.customers_to_frame([customer]),
+        "transform_features (layout)": lambda: model_service.transform_features(frame),
+        "preprocessor.transform (sklearn)": lambda: preprocessor.transform(frame),
+        "predict_proba": lambda: classifier.predict_proba(features),
+        "metadata lookup (now)": lambda: model_service.get_model_metadata().top_risk_factors,
+        "importance ranking (before)": legacy_importances,
+    }
+
+    results = {name: summarize(time_calls(fn, repeat=args.repeat)) for name, fn in stages.items()}
+    rows = [(name, {k: stats[k] for k in ("p50_ms", "p95_ms", "p99_ms")}) for name, stats in results.items()]
+
+    outside = results["total (build_risk_profiles)"]["p50_ms"] - results["predict_proba"]["p50_ms"]
+    rows.append(("total - predict_proba", {"p50_ms": outside, "p95_ms": float("nan"), "p99_ms": float("nan")}))
+    print_table("Single-customer risk profile, per-stage latency", rows)
+
+
+if __name__ == "__main__":
+    main()
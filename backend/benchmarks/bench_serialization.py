@@ -0,0 +1,93 @@
+"""
+Figure payload encoding: list of Pydantic objects vs. columnar formats.
+
+Encodes clustering-shaped data (cluster, tenure, monthly_charge) scaled to
+each requested size in every layout the figure endpoints can return:
+
+  pydantic      - the original path: one ClusterOutput per point, then
+                  FastAPI's jsonable_encoder + json.dumps.
+  rows          - the same JSON built from column lists (format=rows).
+  columns       - {"field": [...]} via orjson from NumPy arrays (format=columns).
+  columns_std   - the same with the standard-library json fallback.
+  arrow         - Arrow IPC stream (format=arrow).
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [--sizes 7032 100000 1000000]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from _common import print_table
+
+from fastapi.encoders import jsonable_encoder
+
+from schemas.customer import ClusterOutput
+from services import serialization
+from api.figures import encode_figure
+
+
+def make_columns(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "cluster": rng.integers(0, 3, n_rows).astype(np.int32),
+        "tenure": rng.integers(0, 73, n_rows).astype(float),
+        "monthly_charge": np.round(rng.uniform(18.25, 118.75, n_rows), 2),
+    }
+
+
+def encode_pydantic(columns):
+    results = [
+        ClusterOutput(tenure=t, monthly_charge=m, cluster=c)
+        for c, t, m in zip(columns["cluster"], columns["tenure"], columns["monthly_charge"])
+    ]
+    return json.dumps(jsonable_encoder(results), separators=(",", ":")).encode("utf-8")
+
+
+def encode_columns_std(columns):
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        return serialization.columns_to_json(columns)
+    finally:
+        serialization.orjson = orjson
+
+
+def timed(fn, repeat):
+    best, body = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return body, best * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7032, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs.")
+    args = parser.parse_args()
+
+    encoders = [
+        ("pydantic", encode_pydantic),
+        ("rows", lambda c: encode_figure(c, "rows")),
+        ("columns", lambda c: encode_figure(c, "columns")),
+        ("columns_std", encode_columns_std),
+    ]
+    if serialization.arrow_available():
+        encoders.append(("arrow", lambda c: encode_figure(c, "arrow")))
+
+    for size in args.sizes:
+        columns = make_columns(size)
+        rows = []
+        baseline_ms = None
+        for label, encode in encoders:
+            body, ms = timed(lambda: encode(columns), args.repeat)
+            baseline_ms = baseline_ms or ms
+            rows.append((label, {"encode_ms": ms, "size_kb": len(body) / 1024, "speedup_x": baseline_ms / ms}))
+        print_table(f"Clustering payload, {size} points", rows)
+
+
+if __name__ == "__main__":
+    main()
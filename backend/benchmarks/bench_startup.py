@@ -0,0 +1,142 @@
+"""
+Time to first request: eager model loading vs. lazy, per-model loading.
+
+Publishes the models in models/ into a temporary registry, then starts
+`uvicorn main:app` with each configuration and polls POST /api/predict
+until it answers. Reported per configuration (median of --repeat runs):
+
+  ready_ms          - from process start to the first successful prediction
+  first_predict_ms  - latency of that first prediction
+  second_predict_ms - latency of the next one (everything warm)
+
+Configurations:
+  eager         - the old startup: every model unpickled and warmed up,
+                  no memory-mapping (CHURN_MODEL_MMAP=0, sklearn backend).
+  auto          - the default: every model but the sklearn forest is
+                  preloaded; the forest's node arrays are mapped.
+  predict_only  - CHURN_PRELOAD_MODELS=classifier_compiled with the
+                  compiled backend and no figure warm-up: what a worker
+                  that only serves /api/predict needs (sklearn is never
+                  imported).
+  lazy          - nothing preloaded or warmed up; every model loads on
+                  first use.
+
+A throwaway run first fills the on-disk figure and dataset caches, so
+every configuration starts from the same warm disk state.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from _common import BACKEND_DIR, print_table
+
+CUSTOMER = {
+    "gender": "Female", "SeniorCitizen": 0, "Partner": "Yes", "Dependents": "No", "tenure": 5,
+    "PhoneService": "Yes", "MultipleLines": "No", "InternetService": "Fiber optic",
+    "OnlineSecurity": "No", "OnlineBackup": "No", "DeviceProtection": "No", "TechSupport": "No",
+    "StreamingTV": "No", "StreamingMovies": "No", "Contract": "Month-to-month",
+    "PaperlessBilling": "Yes", "PaymentMethod": "Electronic check",
+    "MonthlyCharges": 80.0, "TotalCharges": 400.0,
+}
+
+CASES = {
+    "eager": {"CHURN_MODEL_MMAP": "0", "CHURN_PRELOAD_MODELS": "all", "CHURN_INFERENCE_BACKEND": "sklearn"},
+    "auto": {},
+    "predict_only": {
+        "CHURN_PRELOAD_MODELS": "classifier_compiled",
+        "CHURN_INFERENCE_BACKEND": "compiled",
+        "CHURN_FIGURE_CACHE_WARMUP": "0",
+    },
+    "lazy": {
+        "CHURN_PRELOAD_MODELS": "none",
+        "CHURN_MODEL_WARMUP": "0",
+        "CHURN_INFERENCE_BACKEND": "compiled",
+        "CHURN_FIGURE_CACHE_WARMUP": "0",
+    },
+}
+
+
+def publish_registry(registry_dir):
+    """ Publishes models/ as version v0001 of a registry in 'registry_dir'. """
+    script = (
+        "import sys, joblib; sys.path.insert(0, {backend_dir!r})\n"
+        "from services import model_registry as r\n"
+        "r.publish_version({{name: joblib.load(r.MODEL_DIR + '/' + f) for name, f in r.MODEL_FILES.items()}})\n"
+    ).format(backend_dir=BACKEND_DIR)
+    subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.DEVNULL,
+                   env=dict(os.environ, CHURN_MODEL_REGISTRY_DIR=registry_dir))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def predict(port):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/predict/", data=json.dumps(CUSTOMER).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def measure(env, timeout_s=120.0):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if time.perf_counter() - start > timeout_s or server.poll() is not None:
+                raise RuntimeError("The server did not come up.")
+            try:
+                first_ms = predict(port)
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        ready_ms = (time.perf_counter() - start) * 1000.0
+        return {"ready_ms": ready_ms, "first_predict_ms": first_ms, "second_predict_ms": predict(port)}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        registry_dir = os.path.join(directory, "registry")
+        publish_registry(registry_dir)
+        base_env = dict(os.environ, CHURN_MODEL_REGISTRY_DIR=registry_dir,
+                        CHURN_FIGURE_CACHE_DIR=os.path.join(directory, "figures"))
+        measure(base_env)  # fills the disk caches
+
+        rows = []
+        for case, settings in CASES.items():
+            runs = [measure(dict(base_env, **settings)) for _ in range(args.repeat)]
+            rows.append((case, {key: statistics.median(run[key] for run in runs) for key in runs[0]}))
+
+    print_table(f"Time to first /api/predict (median of {args.repeat} server starts)", rows)
+
+
+if __name__ == "__main__":
+    main()
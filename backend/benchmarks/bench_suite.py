@@ -0,0 +1,141 @@
+"""
+The micro-benchmark suite: one fixed set of cases over the hot paths,
+meant to be rerun on every commit and compared (benchmarks/compare_results.py).
+
+  predict     preprocess_input (the old per-request sklearn transform),
+              transform_features, predict_proba for 1 row and for batches,
+              and a full single-customer risk profile
+  figures     the regression / clustering computations over the whole
+              dataset, downsampling, and encoding the payloads
+  explorer    KPIs and a group-by on a fresh engine, a page of rows, and
+              the serialization of rows / columns / Arrow responses
+
+The dataset-wide cases run on --data, e.g. a file grown to 1M rows by
+benchmarks/scale_dataset.py, so regressions that only show at production
+size are caught. Each row reports the rows handled per call, p50/p95/p99
+latency and rows per second.
+
+Usage (from backend/):
+    python benchmarks/scale_dataset.py --rows 1000000
+    python benchmarks/bench_suite.py --data data/scaled/telco_customer_churn_1000000.csv \\
+        [--repeat 50] [--only predict figures explorer] [--json results.json]
+"""
+import argparse
+import functools
+
+from _common import DATA_PATH, load_sample_customers, print_table, save_results, summarize, time_calls
+
+from schemas.customer import CustomerInput
+from services import data_service, model_service
+from services.aggregation_service import AggregationEngine
+from services.downsampling import downsample_columns
+from services.query_service import RowQueryEngine
+from services.serialization import arrow_available, columns_to_arrow, dumps
+from api import figures
+from api.predict import build_risk_profile
+
+
+def predict_cases(batch_sizes):
+    customers = load_sample_customers(max(batch_sizes))
+    customer = CustomerInput(**customers.iloc[0].to_dict())
+    one_row = model_service.transform_features(customers.iloc[:1])
+
+    cases = [
+        ("preprocess_input (sklearn, 1 row)", 1, lambda: model_service.preprocess_input(customer)),
+        ("transform_features (1 row)", 1, lambda: model_service.transform_features(customers.iloc[:1])),
+        ("predict_proba (1 row)", 1, lambda: model_service.predict_proba_features(one_row)),
+        ("build_risk_profile (1 customer)", 1, lambda: build_risk_profile(customer)),
+    ]
+    for size in batch_sizes:
+        batch = customers.iloc[:size]
+        features = model_service.transform_features(batch)
+        cases += [
+            (f"transform_features ({size} rows)", size, functools.partial(model_service.transform_features, batch)),
+            (f"predict_proba ({size} rows)", size, functools.partial(model_service.predict_proba_features, features)),
+            (f"predict_proba_batch ({size} rows)", size, functools.partial(model_service.predict_proba_batch, batch)),
+        ]
+    return cases
+
+
+def figure_cases(n_rows):
+    regression = figures.regression_columns()
+    clustering = figures.clustering_columns()
+    x, y, group = figures.FIGURE_AXES["clustering"]
+    cases = [
+        ("regression compute", n_rows, figures.regression_columns),
+        ("clustering compute", n_rows, figures.clustering_columns),
+        ("clustering sample 2000", n_rows, lambda: downsample_columns(clustering, x, y, group, "sample", 2000)),
+        ("clustering hexbin 2000", n_rows, lambda: downsample_columns(clustering, x, y, group, "hexbin", 2000)),
+        ("regression encode rows", n_rows, lambda: figures.encode_figure(regression, "rows")),
+        ("regression encode columns", n_rows, lambda: figures.encode_figure(regression, "columns")),
+    ]
+    if arrow_available():
+        cases.append(("regression encode arrow", n_rows, lambda: figures.encode_figure(regression, "arrow")))
+    return cases
+
+
+def explorer_cases(df, page_size):
+    rows = RowQueryEngine(df)
+    fields = rows.resolve_fields(None)
+    cases = [
+        ("kpis (fresh engine)", len(df), lambda: AggregationEngine(df).kpis()),
+        ("aggregate Contract (fresh engine)", len(df), lambda: AggregationEngine(df).aggregate("Contract")),
+        (f"rows page ({page_size}) + json", page_size, lambda: dumps(rows.page((), fields, 0, page_size))),
+        (f"columns page ({page_size}) + json", page_size,
+         lambda: dumps(rows.page((), fields, 0, page_size, layout="columns"))),
+    ]
+    if arrow_available():
+        def select_arrow():
+            selected = rows.select((), fields)
+            return columns_to_arrow({field: selected[field] for field in fields})
+        cases.append(("all rows + arrow", len(df), select_arrow))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH, help="CSV for the dataset-wide cases.")
+    parser.add_argument("--repeat", type=int, default=50,
+                        help="Timed calls per per-row case; dataset-wide cases run repeat / 10 (at least 3).")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--only", nargs="+", choices=["predict", "figures", "explorer"],
+                        default=["predict", "figures", "explorer"])
+    parser.add_argument("--json", default=None, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    model_service.load_all_models()
+    df = data_service.load_dataset(args.data)
+    if df is None:
+        raise SystemExit(f"Could not load {args.data}")
+    print(f"Dataset: {args.data} ({len(df)} rows)")
+
+    cases = []
+    if "predict" in args.only:
+        cases += predict_cases(args.batch_sizes)
+    if "figures" in args.only:
+        cases += figure_cases(len(df))
+    if "explorer" in args.only:
+        cases += explorer_cases(df, args.page_size)
+
+    rows = []
+    for label, n_rows, fn in cases:
+        repeat = args.repeat if n_rows < 100_000 else max(3, args.repeat // 10)
+        stats = summarize(time_calls(fn, repeat=repeat, warmup=1))
+        rows.append((label, {
+            "rows": n_rows,
+            "p50_ms": stats["p50_ms"],
+            "p95_ms": stats["p95_ms"],
+            "p99_ms": stats["p99_ms"],
+            "rows_per_s": n_rows / (stats["p50_ms"] / 1000.0),
+        }))
+
+    print_table(f"Micro-benchmarks ({len(df)}-row dataset)", rows)
+    if args.json:
+        save_results(args.json, "bench_suite", rows, data=args.data, dataset_rows=len(df),
+                     repeat=args.repeat, batch_sizes=args.batch_sizes, page_size=args.page_size,
+                     backend=model_service.INFERENCE_BACKEND)
+
+
+if __name__ == "__main__":
+    main()
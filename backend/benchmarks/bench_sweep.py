@@ -0,0 +1,68 @@
+"""
+What-if sweep latency (POST /api/predict/sweep).
+
+Times run_sweep at the service layer and the full HTTP round trip for a
+few grid shapes, and checks every grid against scoring all of its rows
+with RandomForestClassifier.predict_proba.
+
+Usage (from backend/):
+    python benchmarks/bench_sweep.py [--repeat 20]
+"""
+import argparse
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from _common import load_sample_customers, time_calls, summarize, print_table
+
+import main
+from schemas.customer import CustomerInput, SweepAxis
+from services import model_service
+
+GRIDS = {
+    "tenure x10000": ([SweepAxis(feature="tenure", start=0, stop=72, num=10000)], False),
+    "TotalCharges x10000": ([SweepAxis(feature="TotalCharges", start=0, stop=8700, num=10000)], False),
+    "tenure x MonthlyCharges 100x100 (derived TotalCharges)": (
+        [SweepAxis(feature="tenure", start=0, stop=72, num=100),
+         SweepAxis(feature="MonthlyCharges", start=18, stop=120, num=100)], True),
+    "Contract x tenure 3x1000": (
+        [SweepAxis(feature="Contract"), SweepAxis(feature="tenure", start=0, stop=72, num=1000)], False),
+}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    base = CustomerInput(**load_sample_customers(1).to_dict('records')[0])
+
+    rows = []
+    with TestClient(main.app) as client:
+        classifier = model_service.get_model("classifier")
+        classifier_column = model_service.get_model_metadata().churn_class_index
+
+        for name, (axes, derive) in GRIDS.items():
+            resolved, shape, probabilities = model_service.run_sweep(base, axes, derive)
+            frame = model_service.build_sweep_frame(base, resolved, derive)
+            expected = classifier.predict_proba(model_service.transform_features(frame))[:, classifier_column]
+            max_error = float(np.abs(expected - probabilities).max())
+
+            service = summarize(time_calls(lambda: model_service.run_sweep(base, axes, derive), repeat=args.repeat))
+            body = {"base": base.model_dump(), "axes": [a.model_dump() for a in axes],
+                    "derive_total_charges": derive}
+            http = summarize(time_calls(lambda: client.post("/api/predict/sweep", json=body).raise_for_status(),
+                                        repeat=args.repeat))
+            rows.append((name, {
+                "points": int(np.prod(shape)),
+                "service_p50_ms": service["p50_ms"],
+                "http_p50_ms": http["p50_ms"],
+                "http_p95_ms": http["p95_ms"],
+                "max_abs_err": max_error,
+            }))
+
+    print_table("What-if sweep latency", rows)
+
+
+if __name__ == "__main__":
+    main_cli()
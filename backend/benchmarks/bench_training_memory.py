@@ -0,0 +1,106 @@
+"""
+Training peak memory: the in-memory pipeline vs. --out-of-core.
+
+Runs scripts/train_model.py on each CSV in a fresh process per mode and
+reports the process's peak resident memory (VmHWM), the wall time and
+the published metrics:
+
+  in_memory    - main_pipeline with one worker (every stage in the
+                 measured process), the whole frame loaded
+  out_of_core  - main_out_of_core, streaming --chunk-size rows at a time
+
+Models, plots and stage results go to a temporary directory; the
+repository's registry and reports/visuals are not touched.
+
+Usage (from backend/):
+    python benchmarks/bench_training_memory.py
+    python benchmarks/bench_training_memory.py --data data/scaled/telco_customer_churn_1000000.csv \\
+        --modes out_of_core --chunk-size 50000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from _common import BACKEND_DIR, DATA_PATH, print_table, save_results
+
+MODES = ["in_memory", "out_of_core"]
+
+CHILD_SCRIPT = r"""
+import json, os, sys, time
+sys.path.insert(0, {backend_dir!r})
+sys.path.insert(0, os.path.join({backend_dir!r}, 'scripts'))
+import train_model
+from services import model_registry
+
+
+def peak_rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+
+mode, data_path, chunk_size, sample_rows = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+start = time.perf_counter()
+if mode == 'in_memory':
+    train_model.main_pipeline(data_path, workers=1)
+else:
+    train_model.main_out_of_core(data_path, chunk_size=chunk_size, sample_rows=sample_rows)
+seconds = time.perf_counter() - start
+metrics = model_registry.read_manifest(model_registry.get_current_version())['metrics']
+print(json.dumps({{
+    'peak_rss_mb': peak_rss_mb(),
+    'seconds': seconds,
+    'accuracy': metrics['classifier_accuracy'],
+    'r2': metrics['regressor_r2'],
+    'rows': metrics['training_rows'],
+}}))
+"""
+
+
+def measure(mode, data_path, chunk_size, sample_rows):
+    script = CHILD_SCRIPT.format(backend_dir=BACKEND_DIR)
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(
+            os.environ,
+            CHURN_MODEL_REGISTRY_DIR=os.path.join(scratch, 'registry'),
+            CHURN_VISUALS_DIR=os.path.join(scratch, 'visuals'),
+            CHURN_STAGE_CACHE_DIR=os.path.join(scratch, 'stages'),
+            CHURN_STAGE_CACHE_ENABLED="0",
+            # Parse the CSV every time, instead of memory-mapping a cached copy.
+            CHURN_DATASET_CACHE_ENABLED="0",
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script, mode, os.path.abspath(data_path), str(chunk_size), str(sample_rows)],
+            capture_output=True, text=True, check=True, env=env,
+        ).stdout
+    # The pipeline prints its progress; the measurement is the last line.
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", nargs="+", default=[DATA_PATH], help="Training CSVs.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Rows per chunk (out_of_core).")
+    parser.add_argument("--sample-rows", type=int, default=200000, help="Forest sample size (out_of_core).")
+    parser.add_argument("--json", default=None, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    rows = []
+    for data_path in args.data:
+        for mode in args.modes:
+            result = measure(mode, data_path, args.chunk_size, args.sample_rows)
+            rows.append((f"{os.path.basename(data_path)} {mode}", result))
+
+    print_table(f"Training peak memory (chunk size {args.chunk_size}, forest sample {args.sample_rows})", rows)
+    if args.json:
+        save_results(args.json, "training_memory", rows, data=args.data, chunk_size=args.chunk_size,
+                     sample_rows=args.sample_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares two results files written with --json by bench_suite.py or
+load_test.py (e.g. one from main and one from a branch).
+
+For every row both files have, prints each latency (*_ms) of the
+baseline and the candidate and the change in percent. For throughput
+(*_per_s) higher is better, so its change is shown with the sign
+flipped. Changes worse than --threshold are flagged as regressions,
+and the exit status is 1 if there is any, so the script can gate CI.
+
+The two files should come from the same machine, settings and dataset;
+a mismatch is reported but doesn't stop the comparison.
+
+Usage (from backend/):
+    python benchmarks/compare_results.py BASELINE.json CANDIDATE.json [--threshold 10]
+"""
+import argparse
+import sys
+
+from _common import load_results
+
+
+def compare(baseline, candidate, threshold_pct):
+    """ Returns ([(label, metric, base, new, worse_by_pct, regressed)], number of regressions). """
+    comparisons = []
+    regressions = 0
+    for label, base_values in baseline["results"].items():
+        new_values = candidate["results"].get(label)
+        if new_values is None:
+            continue
+        for metric, base in base_values.items():
+            new = new_values.get(metric)
+            lower_is_better = metric.endswith("_ms")
+            if not (lower_is_better or metric.endswith("_per_s")) or new is None or not base:
+                continue
+            change_pct = (new - base) / base * 100.0
+            worse_by_pct = change_pct if lower_is_better else -change_pct
+            regressed = worse_by_pct > threshold_pct
+            regressions += regressed
+            comparisons.append((label, metric, base, new, worse_by_pct, regressed))
+    return comparisons, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent a metric may get worse before it counts as a regression.")
+    args = parser.parse_args()
+
+    baseline, candidate = load_results(args.baseline), load_results(args.candidate)
+    print(f"baseline:  {baseline['commit']} ({baseline['created_at']})")
+    print(f"candidate: {candidate['commit']} ({candidate['created_at']})")
+    for key in ("suite", "settings", "machine"):
+        if baseline.get(key) != candidate.get(key):
+            print(f"⚠️ The runs differ in '{key}': {baseline.get(key)} vs. {candidate.get(key)}")
+
+    comparisons, regressions = compare(baseline, candidate, args.threshold)
+    label_width = max([len(label) for label, *_ in comparisons] + [5]) + 2
+    print(f"\n{'':{label_width}}{'metric':>16}{'baseline':>14}{'candidate':>14}{'worse_by':>11}")
+    for label, metric, base, new, worse_by_pct, regressed in comparisons:
+        flag = "  ❌ regression" if regressed else ""
+        print(f"{label:{label_width}}{metric:>16}{base:14.3f}{new:14.3f}{worse_by_pct:10.1f}%{flag}")
+
+    print(f"\n{regressions} regression(s) over {args.threshold:g}%.")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Load generator for the API: N concurrent clients send requests to one
+endpoint for a fixed time; reports throughput and latency percentiles.
+
+Targets:
+  (default)     the FastAPI app in this process, through httpx's ASGI
+                transport (startup/shutdown run as in uvicorn). No network,
+                but the clients share the event loop with the app, so the
+                numbers are a lower bound on throughput.
+  --spawn       starts `uvicorn main:app --workers W` on a free local port
+                (serving --data), and stops it afterwards.
+  --url URL     an already running server, e.g. http://127.0.0.1:8000.
+
+Scenarios (one run each, in order):
+  predict            POST /api/predict/ with a random customer
+  predict_batch      POST /api/predict/batch with --batch-size random customers
+  regression         GET /api/figures/regression?format=columns (cached payload)
+  clustering_hexbin  GET /api/figures/clustering?mode=hexbin&max_points=2000
+  kpis               GET /api/explorer/kpis
+  aggregate          GET /api/explorer/aggregate?group_by=Contract
+  rows               GET /api/explorer/rows, a filtered page at a random offset
+
+Customers are real rows with MonthlyCharges re-drawn per request, so the
+prediction cache rarely hits and the model path is what gets measured.
+
+Each scenario gets --warmup seconds of unmeasured load first. Errors
+(connection failures and 4xx/5xx, e.g. 503 from a full inference queue)
+are counted separately and left out of the latency percentiles.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--concurrency 16] [--duration 10] [--scenarios predict kpis]
+    python benchmarks/load_test.py --spawn --workers 4 --data data/scaled/telco_customer_churn_1000000.csv
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --json load.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import httpx
+import numpy as np
+
+from _common import BACKEND_DIR, DATA_PATH, load_sample_customers, print_table, save_results
+
+SCENARIOS = ["predict", "predict_batch", "regression", "clustering_hexbin", "kpis", "aggregate", "rows"]
+
+
+def build_requests(batch_size):
+    """ scenario -> function(rng) returning (method, path, json body or None). """
+    customers = load_sample_customers().to_dict('records')
+
+    def customer(rng):
+        return dict(rng.choice(customers), MonthlyCharges=round(rng.uniform(18.25, 118.75), 2))
+
+    def batch(rng):
+        return "POST", "/api/predict/batch", [customer(rng) for _ in range(batch_size)]
+
+    return {
+        "predict": lambda rng: ("POST", "/api/predict/", customer(rng)),
+        "predict_batch": batch,
+        "regression": lambda rng: ("GET", "/api/figures/regression?format=columns", None),
+        "clustering_hexbin": lambda rng: (
+            "GET", "/api/figures/clustering?mode=hexbin&max_points=2000&format=columns", None),
+        "kpis": lambda rng: ("GET", "/api/explorer/kpis", None),
+        "aggregate": lambda rng: ("GET", "/api/explorer/aggregate?group_by=Contract", None),
+        "rows": lambda rng: (
+            "GET", f"/api/explorer/rows?Contract=Month-to-month&limit=100&offset={rng.randrange(1000)}", None),
+    }
+
+
+# --- Targets ---
+@asynccontextmanager
+async def in_process_client():
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            yield client
+
+
+@asynccontextmanager
+async def remote_client(url, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        yield client
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(workers, data_path, timeout_s=180.0):
+    """ Starts uvicorn on a free port; returns (process, base url) once it answers. """
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(os.environ, CHURN_DATA_PATH=os.path.abspath(data_path)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    while True:
+        if time.perf_counter() - start > timeout_s or server.poll() is not None:
+            server.terminate()
+            raise RuntimeError("The server did not come up.")
+        try:
+            if httpx.get(f"{url}/api/explorer/kpis", timeout=5).status_code == 200:
+                return server, url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+
+
+# --- Load ---
+async def run_load(client, make_request, concurrency, duration_s, seed=0):
+    """ Returns (latencies in seconds of the successful requests, error counts by kind, elapsed seconds). """
+    latencies = []
+    errors = Counter()
+    deadline = time.perf_counter() + duration_s
+
+    async def client_loop(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            method, path, body = make_request(rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+            if response.status_code >= 400:
+                errors[str(response.status_code)] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_scenarios(client, args):
+    requests = build_requests(args.batch_size)
+    rows = []
+    for scenario in args.scenarios:
+        if args.warmup > 0:
+            await run_load(client, requests[scenario], args.concurrency, args.warmup, seed=1)
+        latencies, errors, elapsed = await run_load(client, requests[scenario], args.concurrency, args.duration)
+        ms = np.asarray(latencies or [float("nan")]) * 1000.0
+        rows.append((scenario, {
+            "requests": len(latencies),
+            "errors": sum(errors.values()),
+            "req_per_s": len(latencies) / elapsed,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }))
+        if errors:
+            print(f"⚠️ {scenario}: errors {dict(errors)}")
+    return rows
+
+
+async def run(args, url):
+    if url is None:
+        client_context = in_process_client()
+    else:
+        client_context = remote_client(url, args.concurrency)
+    async with client_context as client:
+        return await run_scenarios(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default=None, help="Load-test a running server instead of the in-process app.")
+    target.add_argument("--spawn", action="store_true", help="Start a local uvicorn for the test.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn.")
+    parser.add_argument("--data", default=DATA_PATH,
+                        help="CSV the app serves (in-process and --spawn; sets CHURN_DATA_PATH).")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Customers per predict_batch request.")
+    parser.add_argument("--json", default=None, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.spawn:
+        server, url = spawn_server(args.workers, args.data)
+    elif url is None:
+        # Read by services/data_service.py when the app is imported.
+        os.environ["CHURN_DATA_PATH"] = os.path.abspath(args.data)
+    try:
+        rows = asyncio.run(run(args, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    target = url if args.url else (f"uvicorn --workers {args.workers}" if args.spawn else "in-process")
+    print_table(f"Load test: {target}, {args.concurrency} concurrent clients, {args.duration:g} s per scenario", rows)
+    if args.json:
+        save_results(args.json, "load_test", rows, target="remote" if args.url else target,
+                     data=None if args.url else args.data, concurrency=args.concurrency,
+                     duration=args.duration, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Grows data/telco_customer_churn.csv into a synthetic dataset of any size
+(1M+ rows), so the API can be benchmarked at production scale.
+
+The output starts with the original rows, unchanged. Every further row is
+a real customer drawn at random (so the service columns stay consistent
+with each other, e.g. "No internet service" everywhere when
+InternetService is "No"), with a new customerID and its numbers jittered:
+
+  tenure          +/- 3 months, kept within 1..72 (new customers with
+                  tenure 0 stay at 0)
+  MonthlyCharges  +/- 5 %, kept within the original min..max
+  TotalCharges    about tenure * MonthlyCharges (+/- 3 %), and blank
+                  when tenure is 0, like in the original file
+
+The same --rows and --seed always give the same file, so results from
+different commits are measured on the same data. Rows are written in
+chunks, so memory stays flat however large the output is.
+
+Serve the file with CHURN_DATA_PATH=<path> (see services/data_service.py).
+
+Usage (from backend/):
+    python benchmarks/scale_dataset.py [--rows 1000000] [--seed 0] [--output PATH]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import BACKEND_DIR, DATA_PATH
+
+SCALED_DIR = os.path.join(BACKEND_DIR, 'data', 'scaled')
+CHUNK_ROWS = 100_000
+
+
+def default_output(n_rows):
+    """ e.g. data/scaled/telco_customer_churn_1000000.csv """
+    stem = os.path.splitext(os.path.basename(DATA_PATH))[0]
+    return os.path.join(SCALED_DIR, f"{stem}_{n_rows}.csv")
+
+
+def synthesize_chunk(raw, start, n_rows, rng):
+    """ 'n_rows' synthetic customers drawn from 'raw', numbered from 'start'. """
+    chunk = raw.iloc[rng.integers(0, len(raw), n_rows)].reset_index(drop=True)
+
+    tenure = chunk['tenure'].to_numpy()
+    tenure = np.where(tenure == 0, 0, np.clip(tenure + rng.integers(-3, 4, n_rows), 1, 72))
+    low, high = raw['MonthlyCharges'].min(), raw['MonthlyCharges'].max()
+    monthly = np.clip(chunk['MonthlyCharges'].to_numpy() * rng.uniform(0.95, 1.05, n_rows), low, high)
+    total = tenure * monthly * rng.uniform(0.97, 1.03, n_rows)
+
+    chunk['customerID'] = [f"{i:07d}-SYNTH" for i in range(start, start + n_rows)]
+    chunk['tenure'] = tenure
+    chunk['MonthlyCharges'] = np.round(monthly, 2)
+    chunk['TotalCharges'] = np.where(tenure == 0, " ", np.char.mod("%.2f", total))
+    return chunk
+
+
+def scale_dataset(n_rows, output, seed=0):
+    """ Writes the scaled CSV to 'output' (atomically) and returns its row count. """
+    raw = pd.read_csv(DATA_PATH, dtype={'TotalCharges': str})
+    rng = np.random.default_rng(seed)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', newline='') as f:
+        original = raw.iloc[:n_rows]
+        original.to_csv(f, index=False)
+        written = len(original)
+        while written < n_rows:
+            size = min(CHUNK_ROWS, n_rows - written)
+            synthesize_chunk(raw, written, size, rng).to_csv(f, index=False, header=False)
+            written += size
+    os.replace(tmp_path, output)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Default: data/scaled/telco_customer_churn_<rows>.csv")
+    args = parser.parse_args()
+
+    output = args.output or default_output(args.rows)
+    start = time.perf_counter()
+    written = scale_dataset(args.rows, output, args.seed)
+    size_mb = os.path.getsize(output) / (1 << 20)
+    print(f"✅ Wrote {written} rows ({size_mb:.1f} MB) to {output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,35 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 # Import your API routes and services
 from api import predict, figures, explorer
 from api import images
-from services import model_service 
+from api import admin
+from api import metrics
+from services import model_service, data_service
+from services.metrics import MetricsMiddleware
 
 # (The 'lifespan' function is unchanged)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("--- 🚀 Application Startup ---")
     model_service.load_all_models()
+    data_service.load_dataset()
+    model_service.start_inference_executors()
+    await figures.warm_figure_cache()
+    registry_watcher = None
+    if admin.MODEL_WATCH_INTERVAL_S > 0:
+        registry_watcher = asyncio.create_task(admin.watch_registry())
     yield
+    if registry_watcher is not None:
+        registry_watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await registry_watcher
+    await predict.risk_profile_batcher.stop()
+    model_service.shutdown_inference_executors()
     print("--- 🔌 Application Shutdown ---")
 
 app = FastAPI(
@@ -35,12 +51,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency and status counts for /api/metrics.
+app.add_middleware(MetricsMiddleware)
 
 # --- Include API Routes ---
 app.include_router(predict.router, prefix="/api/predict", tags=["Predictions"])
 app.include_router(figures.router, prefix="/api/figures", tags=["Model Figures"])
 app.include_router(explorer.router, prefix="/api/explorer", tags=["Explorer"])
 app.include_router(images.router, prefix="/api/images", tags=["Static Images"]) # <--- 2. ADD THIS LINE
+app.include_router(admin.router, prefix="/api/admin/models", tags=["Model Administration"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 # --- Root Health Check ---
 @app.get("/api", tags=["Health Check"])
@@ -42,4 +42,57 @@ class RegressionOutput(BaseModel):
 class ClusterOutput(BaseModel):
     cluster: int
     tenure: float             
-    monthly_charge: float     
\ No newline at end of file
+    monthly_charge: float     
+
+# --- Pydantic Models for Batch Scoring ---
+class BatchPredictionResponse(BaseModel):
+    count: int
+    threshold: float
+    probabilities: list[float]
+    predictions: list[int]
+
+
+# --- Pydantic Models for What-If Sweeps ---
+class SweepAxis(BaseModel):
+    feature: str
+    # Either explicit values (numbers, or categories for text features)...
+    values: list[float | str] | None = None
+    # ...or an evenly spaced numeric range.
+    start: float | None = None
+    stop: float | None = None
+    num: int = 50
+
+class SweepRequest(BaseModel):
+    base: CustomerInput
+    axes: list[SweepAxis]
+    # Recompute TotalCharges as tenure * MonthlyCharges at every grid point.
+    derive_total_charges: bool = False
+
+class SweepAxisOutput(BaseModel):
+    feature: str
+    values: list[float | str]
+
+class SweepResponse(BaseModel):
+    axes: list[SweepAxisOutput]
+    shape: list[int]
+    threshold: float
+    # Row-major over 'shape': the last axis varies fastest.
+    probabilities: list[float]
+
+
+# --- Pydantic Models for Model Administration ---
+class ModelReloadRequest(BaseModel):
+    # A registry version ("v0003"); default: the one named in CURRENT.
+    version: str | None = None
+
+class ModelVersionResponse(BaseModel):
+    version: str
+    fingerprint: str
+    generation: int
+    created_at: str | None = None
+    data_hash: str | None = None
+    metrics: dict
+    # Registry state: the version CURRENT points at, and all published versions.
+    current: str
+    available: list[str]
+    previous: str | None = None
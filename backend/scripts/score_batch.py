@@ -0,0 +1,253 @@
+"""
+Offline bulk scoring: streams a customer file (CSV or Parquet) through the
+published models and writes, per customer, the churn probability and
+flag, the predicted MonthlyCharges and the K-Means cluster.
+
+The input is read in fixed-size chunks and scored on a pool of worker
+processes, each holding one copy of the models. At most --max-pending
+chunks are read ahead of the writer, so memory stays bounded by
+(workers + max pending) chunks whatever the file size. Results are
+written in input order, chunk by chunk, to Parquet or CSV (by the
+output file's extension).
+
+Rows with a missing or invalid numeric value (e.g. the blank
+TotalCharges of brand-new customers) are kept with empty outputs and
+counted as unscored.
+
+Usage (from backend/):
+    python scripts/score_batch.py customers.csv scores.parquet
+    python scripts/score_batch.py data/scaled/telco_customer_churn_1000000.csv scores.csv \\
+        --workers 4 --chunk-size 50000 --version v0003
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional: without it only CSV files can be read and written.
+try:
+    import pyarrow as pa
+    from pyarrow import parquet
+except ImportError:
+    pa = None
+    parquet = None
+
+# ==============================================================================
+# --- 1. Settings ---
+# ==============================================================================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+
+# Scoring processes, rows per chunk, and chunks read ahead of the writer
+# (0 = twice the workers).
+SCORE_WORKERS = int(os.getenv("CHURN_SCORE_WORKERS", str(min(4, os.cpu_count() or 1))))
+SCORE_CHUNK_SIZE = int(os.getenv("CHURN_SCORE_CHUNK_SIZE", "50000"))
+SCORE_MAX_PENDING = int(os.getenv("CHURN_SCORE_MAX_PENDING", "0"))
+
+# Copied from the input to the output when present.
+ID_COLUMN = "customerID"
+
+sys.path.insert(0, BACKEND_DIR)
+from services import model_registry, model_service
+from services.model_service import INPUT_COLUMNS, NUMERIC_INPUT_COLUMNS
+
+# ==============================================================================
+# --- 2. Worker Side ---
+# ==============================================================================
+
+def init_worker(version):
+    """
+    Loads one model version into this worker. Raises (and so breaks the
+    pool) if the version can't be loaded, instead of scoring with nothing.
+    """
+    model_service.activate_bundle(model_service.load_model_bundle(version))
+    # The workers already use every core; a forest that also fans out
+    # over all of them (n_jobs=-1 from training) would oversubscribe them.
+    classifier = model_service.get_model("classifier")
+    if hasattr(classifier, "n_jobs"):
+        classifier.n_jobs = 1
+
+
+def score_chunk(chunk):
+    """
+    Scores one chunk of raw rows. Returns the output frame and the number
+    of rows that could not be scored.
+    """
+    inputs = chunk[INPUT_COLUMNS].copy()
+    for column in NUMERIC_INPUT_COLUMNS:
+        inputs[column] = pd.to_numeric(inputs[column], errors='coerce')
+    valid = ~inputs[NUMERIC_INPUT_COLUMNS].isna().any(axis=1).to_numpy()
+    inputs = inputs[valid]
+
+    probability = np.full(len(chunk), np.nan)
+    charges = np.full(len(chunk), np.nan)
+    cluster = np.zeros(len(chunk), dtype=np.int32)
+    if len(inputs) > 0:
+        features = model_service.transform_features(inputs)
+        probability[valid] = model_service.predict_proba_features(features)
+        charges[valid] = model_service.get_model("regressor").predict(features)
+        cluster[valid] = model_service.get_model("clusterer").predict(inputs[['tenure', 'MonthlyCharges']])
+    threshold = model_service.get_model_metadata().threshold
+
+    output = {}
+    if ID_COLUMN in chunk.columns:
+        output[ID_COLUMN] = chunk[ID_COLUMN].astype(str).to_numpy()
+    output["churn_probability"] = pd.array(probability, dtype="Float64")
+    output["churn"] = pd.arrays.BooleanArray(probability >= threshold, ~valid)
+    output["predicted_monthly_charges"] = pd.array(charges, dtype="Float64")
+    output["cluster"] = pd.arrays.IntegerArray(cluster, ~valid)
+    output = pd.DataFrame(output)
+    return output, int(len(chunk) - valid.sum())
+
+# ==============================================================================
+# --- 3. Reading and Writing ---
+# ==============================================================================
+
+def is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def read_chunks(path, chunk_size):
+    """ Yields the input in frames of 'chunk_size' rows (only the columns the models need, plus the ID). """
+    if is_parquet(path):
+        if parquet is None:
+            raise RuntimeError("Reading Parquet needs pyarrow (pip install pyarrow).")
+        source = parquet.ParquetFile(path)
+        header = source.schema_arrow.names
+    else:
+        header = list(pd.read_csv(path, nrows=0).columns)
+
+    missing = [column for column in INPUT_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"{path} is missing required columns: {', '.join(missing)}")
+    columns = INPUT_COLUMNS + ([ID_COLUMN] if ID_COLUMN in header else [])
+
+    if is_parquet(path):
+        for batch in source.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        # Numbers are parsed in the workers; bad values become NaN there.
+        dtypes = {column: str for column in columns if column not in NUMERIC_INPUT_COLUMNS}
+        yield from pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_size)
+
+
+class ResultWriter:
+    """ Appends scored chunks to a Parquet or CSV file, written under a temporary name until closed. """
+
+    def __init__(self, path):
+        if is_parquet(path) and parquet is None:
+            raise RuntimeError("Writing Parquet needs pyarrow (pip install pyarrow).")
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.parquet_writer = None
+        self.wrote_header = False
+
+    def write(self, frame):
+        if is_parquet(self.path):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = parquet.ParquetWriter(self.tmp_path, table.schema)
+            self.parquet_writer.write_table(table.cast(self.parquet_writer.schema))
+        else:
+            frame.to_csv(self.tmp_path, mode='a' if self.wrote_header else 'w',
+                         header=not self.wrote_header, index=False)
+            self.wrote_header = True
+
+    def close(self, success=True):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if not os.path.exists(self.tmp_path):
+            return
+        if success:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+# ==============================================================================
+# --- 4. Main Loop ---
+# ==============================================================================
+
+def score_file(input_path, output_path, workers=SCORE_WORKERS, chunk_size=SCORE_CHUNK_SIZE,
+               max_pending=SCORE_MAX_PENDING, version=None):
+    """
+    Scores 'input_path' into 'output_path'. Chunks are submitted to the
+    pool as long as fewer than 'max_pending' are unwritten; the oldest
+    one is written (and the next one read) as soon as it is done.
+    Returns a summary dict.
+    """
+    # Resolve the version once, so every worker loads the same one even
+    # if a training run publishes a new version meanwhile.
+    version = model_registry.resolve_version(version)["version"]
+    max_pending = max_pending or 2 * workers
+    print(f"--- 🚀 Scoring {input_path} with model version {version} "
+          f"({workers} workers, {chunk_size} rows per chunk, up to {max_pending} chunks in flight) ---")
+
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    writer = ResultWriter(output_path)
+    rows = unscored = chunks = 0
+    start = time.perf_counter()
+    success = False
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=init_worker, initargs=(version,)) as pool:
+            pending = deque()
+            source = read_chunks(input_path, chunk_size)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_pending:
+                    chunk = next(source, None)
+                    if chunk is None:
+                        exhausted = True
+                    else:
+                        pending.append(pool.submit(score_chunk, chunk))
+                if not pending:
+                    break
+
+                output, chunk_unscored = pending.popleft().result()
+                writer.write(output)
+                rows += len(output)
+                unscored += chunk_unscored
+                chunks += 1
+                elapsed = time.perf_counter() - start
+                print(f"⏳ {rows:,} rows scored ({chunks} chunks) in {elapsed:.1f} s, "
+                      f"{rows / elapsed:,.0f} rows/s")
+        success = True
+    finally:
+        writer.close(success)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "rows": rows,
+        "unscored": unscored,
+        "chunks": chunks,
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(rows / elapsed) if elapsed > 0 else None,
+        "version": version,
+        "output": output_path,
+    }
+    print(f"✅ Wrote {rows:,} rows to {output_path} in {elapsed:.1f} s "
+          f"({summary['rows_per_s']:,} rows/s, {unscored:,} unscored)")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Customer file to score (.csv or .parquet).")
+    parser.add_argument("output", help="Where to write the scores (.csv or .parquet).")
+    parser.add_argument("--workers", type=int, default=SCORE_WORKERS, help="Scoring processes.")
+    parser.add_argument("--chunk-size", type=int, default=SCORE_CHUNK_SIZE, help="Rows per chunk.")
+    parser.add_argument("--max-pending", type=int, default=SCORE_MAX_PENDING,
+                        help="Chunks read ahead of the writer (0 = twice the workers).")
+    parser.add_argument("--version", default=None, help="Model version (default: the registry's current one).")
+    args = parser.parse_args()
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1.")
+
+    score_file(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size,
+               max_pending=args.max_pending, version=args.version)
@@ -3,15 +3,24 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import io
+import gzip
+import sys
+import time
 import joblib
+import argparse
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix, ConfusionMatrixDisplay
+from matplotlib.collections import PathCollection
 
 # ==============================================================================
 # --- 1. Path Definitions ---
@@ -20,30 +29,77 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
 DATA_PATH = os.path.join(BACKEND_DIR, 'data/telco_customer_churn.csv')
 MODEL_DIR = os.path.join(BACKEND_DIR, 'models/')
-VISUALS_DIR = os.path.join(BACKEND_DIR, 'reports/visuals/')
+VISUALS_DIR = os.getenv("CHURN_VISUALS_DIR", os.path.join(BACKEND_DIR, 'reports/visuals/'))
+
+# Processes that run independent stages side by side (1 = everything in
+# this process, one stage after the other), and the cores the forest fit
+# uses (-1 = all of them).
+TRAIN_WORKERS = int(os.getenv("CHURN_TRAIN_WORKERS", str(min(4, os.cpu_count() or 1))))
+TRAIN_N_JOBS = int(os.getenv("CHURN_TRAIN_N_JOBS", "-1"))
+
+# Scatter plots with more points than this always get their points
+# rasterized (an embedded PNG, whose size doesn't grow with the data);
+# smaller ones are saved both ways and the smaller one (gzipped) is kept.
+VECTOR_MAX_POINTS = int(os.getenv("CHURN_VISUALS_VECTOR_MAX_POINTS", "50000"))
+RASTER_DPI = 100
+
+# Out-of-core mode (--out-of-core): rows per chunk read from the CSV, the
+# size of the stratified sample the forest is trained on, and rows per
+# MiniBatchKMeans step.
+TRAIN_CHUNK_SIZE = int(os.getenv("CHURN_TRAIN_CHUNK_SIZE", "100000"))
+TRAIN_SAMPLE_ROWS = int(os.getenv("CHURN_TRAIN_SAMPLE_ROWS", "200000"))
+KMEANS_BATCH_SIZE = 1024
+
+# Share the cleaning step (and the binary dataset cache) with the API.
+sys.path.insert(0, BACKEND_DIR)
+from services.data_service import read_dataset, source_hash
+from services import data_service, model_registry, stage_cache
+from services.static_assets import precompress_directory
 
 # ==============================================================================
 # --- 2. Helper Functions (Our Modular "Splits") ---
 # ==============================================================================
 
 def load_and_clean_data(data_path):
-    """ Loads and cleans the data. """
+    """
+    Loads and cleans the data. If the binary dataset cache that the API
+    memory-maps on startup is missing or stale, it is rebuilt here
+    (see services/data_service.py).
+    """
     print("\n--- [Helper] Loading and Cleaning Data ---\n")
     try:
-        df = pd.read_csv(data_path)
+        df = read_dataset(data_path)
     except FileNotFoundError:
         print(f"Error: Data file not found at {data_path}")
         return None
     
-    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-    df.dropna(inplace=True)
-    df['Churn'] = df['Churn'].map({'Yes': 1, 'No': 0})
-    df_cleaned = df.drop('customerID', axis=1)
+    # The shared frame stores text as 'category'; the models are fitted on plain strings.
+    df_cleaned = df.astype({column: object for column in df.select_dtypes('category').columns})
+    df_cleaned['Churn'] = df_cleaned['Churn'].map({'Yes': 1, 'No': 0})
     print(f"Data cleaned. {df_cleaned.shape[0]} rows remaining.")
     print("\n" + "="*80)
     return df_cleaned
 
-def save_eda_plots(df_cleaned, visuals_dir):
+def save_scatter_figure(path, n_points, vector_max_points=VECTOR_MAX_POINTS, raster_dpi=RASTER_DPI):
+    """
+    Saves the current figure as SVG. Its scatter layers are either kept
+    as vector paths (one element per point) or rasterized, whichever
+    gives the smaller file once gzipped, which is how it is served;
+    axes, labels and legend stay vector either way.
+    """
+    figure = plt.gcf()
+    scatters = [c for ax in figure.axes for c in ax.collections if isinstance(c, PathCollection)]
+    candidates = []
+    for rasterized in ((False, True) if n_points <= vector_max_points else (True,)):
+        for collection in scatters:
+            collection.set_rasterized(rasterized)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='svg', bbox_inches='tight', dpi=raster_dpi)
+        candidates.append(buffer.getvalue())
+    with open(path, 'wb') as f:
+        f.write(min(candidates, key=lambda body: len(gzip.compress(body))))
+
+def save_eda_plots(df_cleaned, visuals_dir=VISUALS_DIR):
     """
     Saves all necessary EDA plots for the frontend dashboard.
     """
@@ -108,13 +164,25 @@ def save_eda_plots(df_cleaned, visuals_dir):
     print("All EDA plots saved.")
     print("\n" + "="*80)
 
-def train_classifier_and_preprocessor(df_cleaned):
-    """ Trains the main preprocessor and the Random Forest classifier. """
-    print("\n--- [Helper] Training Classifier & Preprocessor ---\n")
-    
-    target_classifier = 'Churn'
-    target_regressor = 'MonthlyCharges'
-    features_df = df_cleaned.drop([target_classifier, target_regressor], axis=1, errors='ignore')
+def split_rows(df_cleaned, test_size=0.2, random_state=42):
+    """
+    The stratified 80/20 train/test split of the classifier, as row
+    positions (cheap to hand to other processes, unlike the frames).
+    """
+    positions = np.arange(len(df_cleaned))
+    train_rows, test_rows = train_test_split(
+        positions, test_size=test_size, random_state=random_state, stratify=df_cleaned['Churn']
+    )
+    return train_rows, test_rows
+
+def feature_frame(df_cleaned):
+    """ The model inputs: everything but the two targets. """
+    return df_cleaned.drop(['Churn', 'MonthlyCharges'], axis=1, errors='ignore')
+
+def fit_preprocessor(df_cleaned, split):
+    """ Fits the main preprocessor (scaler + one-hot encoder) on the training rows. """
+    print("\n--- [Helper] Fitting Preprocessor ---\n")
+    features_df = feature_frame(df_cleaned)
     numerical_features = features_df.select_dtypes(include=np.number).columns.tolist()
     categorical_features = features_df.select_dtypes(include='object').columns.tolist()
 
@@ -125,17 +193,24 @@ def train_classifier_and_preprocessor(df_cleaned):
         ],
         remainder='drop'
     )
-    
-    X_c = features_df
-    y_c = df_cleaned[target_classifier]
-    X_train_c, X_test_c, y_train_c, y_test_c = train_test_split(X_c, y_c, test_size=0.2, random_state=42, stratify=y_c)
-    
-    preprocessor.fit(X_train_c)
-    
-    X_train_c_processed = preprocessor.transform(X_train_c)
-    X_test_c_processed = preprocessor.transform(X_test_c)
-    
-    rf_model = RandomForestClassifier(random_state=42, n_estimators=100)
+    train_rows, _ = split
+    preprocessor.fit(features_df.iloc[train_rows])
+    print("Preprocessor fitted.")
+    print("\n" + "="*80)
+    return preprocessor
+
+def train_classifier(df_cleaned, split, preprocessor, n_estimators=100, random_state=42, visuals_dir=VISUALS_DIR):
+    """ Trains the Random Forest classifier (on every core, see TRAIN_N_JOBS). """
+    print("\n--- [Helper] Training Classifier ---\n")
+
+    features_df = feature_frame(df_cleaned)
+    train_rows, test_rows = split
+    X_train_c_processed = preprocessor.transform(features_df.iloc[train_rows])
+    X_test_c_processed = preprocessor.transform(features_df.iloc[test_rows])
+    y_train_c = df_cleaned['Churn'].iloc[train_rows]
+    y_test_c = df_cleaned['Churn'].iloc[test_rows]
+
+    rf_model = RandomForestClassifier(random_state=random_state, n_estimators=n_estimators, n_jobs=TRAIN_N_JOBS)
     rf_model.fit(X_train_c_processed, y_train_c)
     
     y_pred_c = rf_model.predict(X_test_c_processed)
@@ -149,16 +224,22 @@ def train_classifier_and_preprocessor(df_cleaned):
     print("\n--- Overall Model Accuracy ---")
     print(f"Accuracy: {acc * 100:.2f}%\n")
 
+    save_classifier_plots(rf_model, preprocessor.get_feature_names_out(), y_test_c, y_pred_c, visuals_dir)
+    print("\n" + "="*80)
+    
+    return rf_model, acc
+
+def save_classifier_plots(rf_model, feature_names, y_test_c, y_pred_c, visuals_dir=VISUALS_DIR):
+    """ Feature importance and test-set confusion matrix plots of the forest. """
     # Save Feature Importance Plot
     try:
-        feature_names = preprocessor.get_feature_names_out()
         importances = rf_model.feature_importances_
         forest_importances = pd.Series(importances, index=feature_names).sort_values(ascending=False)
         
         plt.figure(figsize=(10, 8))
         sns.barplot(x=forest_importances.head(10), y=forest_importances.head(10).index, palette='viridis', hue=forest_importances.head(10).index, legend=False)
         plt.title('Top 10 Feature Importances (Random Forest)')
-        plt.savefig(os.path.join(VISUALS_DIR, 'feature_importance.svg'), bbox_inches='tight')
+        plt.savefig(os.path.join(visuals_dir, 'feature_importance.svg'), bbox_inches='tight')
         print(f"Saved feature_importance.svg")
     except Exception as e:
         print(f"Error saving feature importance plot: {e}")
@@ -174,95 +255,256 @@ def train_classifier_and_preprocessor(df_cleaned):
         disp.ax_.grid(False)
         
         plt.title('Classifier Confusion Matrix')
-        plt.savefig(os.path.join(VISUALS_DIR, 'confusion_matrix.svg'), bbox_inches='tight')
+        plt.savefig(os.path.join(visuals_dir, 'confusion_matrix.svg'), bbox_inches='tight')
         print(f"Saved confusion_matrix.svg")
     except Exception as e:
         print(f"Error saving confusion matrix plot: {e}")
     plt.close()
-    print("\n" + "="*80)
-    
-    return preprocessor, rf_model
 
-def train_regressor(df_cleaned, preprocessor, visuals_dir):
+def train_regressor(df_cleaned, preprocessor, visuals_dir=VISUALS_DIR,
+                    vector_max_points=VECTOR_MAX_POINTS, raster_dpi=RASTER_DPI):
     """ Trains the Linear Regression model. """
     print("\n--- [Helper] Training Regressor ---\n")
     
-    target_classifier = 'Churn'
-    target_regressor = 'MonthlyCharges'
-    features_df = df_cleaned.drop([target_classifier, target_regressor], axis=1, errors='ignore')
-    y_r = df_cleaned[target_regressor]
+    features_df = feature_frame(df_cleaned)
+    y_r = df_cleaned['MonthlyCharges']
     
     X_r_processed = preprocessor.transform(features_df)
     
     lr_model = LinearRegression()
     lr_model.fit(X_r_processed, y_r)
-    print("Linear Regression model trained.")
+    r2 = lr_model.score(X_r_processed, y_r)
+    print(f"Linear Regression model trained (R^2 = {r2:.4f}).")
+
+    save_regression_plot(y_r, lr_model.predict(X_r_processed), visuals_dir, vector_max_points, raster_dpi)
+    print("\n" + "="*80)
+    
+    return lr_model, r2
 
-    # Save Regression Plot
+def save_regression_plot(y_r, y_pred_r, visuals_dir=VISUALS_DIR,
+                         vector_max_points=VECTOR_MAX_POINTS, raster_dpi=RASTER_DPI):
+    """ Actual vs. predicted monthly charges. """
     try:
-        y_pred_r = lr_model.predict(X_r_processed)
         plt.figure(figsize=(10, 6))
         sns.scatterplot(x=y_r, y=y_pred_r, alpha=0.5)
         plt.plot([y_r.min(), y_r.max()], [y_r.min(), y_r.max()], 'r--', lw=2)
         plt.xlabel('Actual Monthly Charges')
         plt.ylabel('Predicted Monthly Charges')
         plt.title('Regression: Actual vs. Predicted')
-        plt.savefig(os.path.join(VISUALS_DIR, 'regression_actual_vs_pred.svg'), bbox_inches='tight')
+        save_scatter_figure(os.path.join(visuals_dir, 'regression_actual_vs_pred.svg'), len(y_r),
+                            vector_max_points, raster_dpi)
         print("Saved regression_actual_vs_pred.svg")
     except Exception as e:
         print(f"Error saving regression plot: {e}")
     plt.close()
-    print("\n" + "="*80)
-    
-    return lr_model
 
-def train_clusterer(df_cleaned, visuals_dir):
+def train_clusterer(df_cleaned, visuals_dir=VISUALS_DIR, n_clusters=3, n_init=10, random_state=42,
+                    vector_max_points=VECTOR_MAX_POINTS, raster_dpi=RASTER_DPI):
     """ Trains the K-Means clustering pipeline. """
     print("\n--- [Helper] Training Clusterer ---\n")
     cluster_features = df_cleaned[['tenure', 'MonthlyCharges']]
     
     kmeans_pipeline = Pipeline([
         ('scaler', StandardScaler()),
-        ('kmeans', KMeans(n_clusters=3, random_state=42, n_init=10))
+        ('kmeans', KMeans(n_clusters=n_clusters, random_state=random_state, n_init=n_init))
     ])
     
     kmeans_pipeline.fit(cluster_features)
     print("K-Means pipeline (Scaler + Model) trained.")
 
-    # Save Clustering Plot
+    save_cluster_plot(cluster_features, kmeans_pipeline.predict(cluster_features), n_clusters,
+                      visuals_dir, vector_max_points, raster_dpi)
+    print("\n" + "="*80)
+    
+    return kmeans_pipeline, float(kmeans_pipeline.named_steps['kmeans'].inertia_)
+
+def save_cluster_plot(cluster_features, cluster_labels, n_clusters, visuals_dir=VISUALS_DIR,
+                      vector_max_points=VECTOR_MAX_POINTS, raster_dpi=RASTER_DPI):
+    """ The customers by tenure and monthly charges, colored by cluster. """
     try:
-        cluster_labels = kmeans_pipeline.predict(cluster_features)
         plt.figure(figsize=(10, 6))
         sns.scatterplot(x=cluster_features['tenure'], y=cluster_features['MonthlyCharges'], hue=cluster_labels, palette='viridis', s=50, alpha=0.7)
-        plt.title('K-Means Customer Segments (3 Clusters)')
+        plt.title(f'K-Means Customer Segments ({n_clusters} Clusters)')
         plt.xlabel('Tenure (Months)')
         plt.ylabel('Monthly Charges')
         plt.legend(title='Cluster')
-        plt.savefig(os.path.join(VISUALS_DIR, 'kmeans_clusters.svg'), bbox_inches='tight')
+        save_scatter_figure(os.path.join(visuals_dir, 'kmeans_clusters.svg'), len(cluster_features),
+                            vector_max_points, raster_dpi)
         print(f"Saved kmeans_clusters.svg")
     except Exception as e:
         print(f"Error saving clustering plot: {e}")
     plt.close('all')
-    print("\n" + "="*80)
-    
-    return kmeans_pipeline
 
-def save_all_models(models_dict, model_dir):
-    """ Saves all fitted models and the preprocessor. """
+def current_artifacts():
+    """ The stage result hashes the current registry version was published from, if recorded. """
+    try:
+        return model_registry.read_manifest(model_registry.get_current_version()).get("artifacts")
+    except model_registry.RegistryError:
+        return None
+
+def save_all_models(models_dict, metrics, data_path, artifacts=None):
+    """
+    Publishes all fitted models and the preprocessor as a new version in
+    the model registry (models/registry/vNNNN/) and points CURRENT at it.
+    Running API workers pick it up without a restart.
+    'artifacts' (the model stages' result hashes) is recorded in the
+    manifest; if it matches the current version's, nothing is published.
+    """
     print("\n--- [Helper] Saving All Models ---\n")
-    for name, model in models_dict.items():
-        filename = f"{name}.joblib"
-        path = os.path.join(model_dir, filename)
-        joblib.dump(model, path)
-        print(f"Saved {name}.joblib")
+    if artifacts is not None and artifacts == current_artifacts():
+        print(f"Models unchanged, {model_registry.get_current_version()} stays current")
+        return
+    manifest = model_registry.publish_version(models_dict, metrics, data_hash=source_hash(data_path),
+                                              artifacts=artifacts)
+    for name, entry in manifest["files"].items():
+        print(f"Saved {entry['file']} ({name})")
+    print(f"Published model version {manifest['version']} (now current)")
+
+# ==============================================================================
+# --- 3. Stage Graph ---
+# ==============================================================================
+# Every stage gets the cleaned data plus the results of the stages it
+# depends on, as keyword arguments named after them. Stages whose
+# dependencies are done run at the same time, each in its own process:
+#
+#   split ──> preprocessor ──> classifier
+#                          └─> regressor
+#   eda, clusterer (data only)
+#
+# Every stage's result (and the plots it writes) is cached by a
+# fingerprint of its code, parameters, the data hash and the result
+# hashes of its dependencies (services/stage_cache.py), so a stage runs
+# again only when one of them changed, or with --force <stage>.
+Stage = namedtuple("Stage", ["name", "fn", "deps", "params", "files"])
+
+# The module settings a stage reads are passed in as parameters, so they
+# are part of its fingerprint.
+SCATTER_SETTINGS = {"visuals_dir": VISUALS_DIR, "vector_max_points": VECTOR_MAX_POINTS, "raster_dpi": RASTER_DPI}
+
+STAGES = [
+    Stage("split", split_rows, (), {"test_size": 0.2, "random_state": 42}, ()),
+    Stage("preprocessor", fit_preprocessor, ("split",), {}, ()),
+    Stage("classifier", train_classifier, ("split", "preprocessor"),
+          {"n_estimators": 100, "random_state": 42, "visuals_dir": VISUALS_DIR},
+          ("feature_importance.svg", "confusion_matrix.svg")),
+    Stage("regressor", train_regressor, ("preprocessor",), dict(SCATTER_SETTINGS), ("regression_actual_vs_pred.svg",)),
+    Stage("clusterer", train_clusterer, (), {"n_clusters": 3, "n_init": 10, "random_state": 42, **SCATTER_SETTINGS},
+          ("kmeans_clusters.svg",)),
+    Stage("eda", save_eda_plots, (), {"visuals_dir": VISUALS_DIR}, (
+        "tenure_vs_churn.svg", "monthlycharges_vs_churn.svg", "totalcharges_vs_churn.svg",
+        "correlation_heatmap.svg",
+    )),
+]
+MODEL_STAGES = ("preprocessor", "classifier", "regressor", "clusterer")
+
+# The cleaned data of this process, by path. Forked workers inherit the
+# parent's copy; other start methods re-read it in each worker (from the
+# binary dataset cache the parent wrote).
+_training_data = {}
+
+def get_training_data(data_path):
+    if data_path not in _training_data:
+        _training_data[data_path] = load_and_clean_data(data_path)
+    return _training_data[data_path]
+
+def run_stage(stage, data_path, inputs):
+    """
+    Runs one stage and writes its result to a file (stage_cache.dump_result).
+    Returns (result file, result hash, start, end) with wall-clock times.
+    """
+    start = time.time()
+    result = stage.fn(get_training_data(data_path), **inputs, **stage.params)
+    end = time.time()
+    return (*stage_cache.dump_result(stage.name, result), start, end)
+
+def run_stage_graph(stages, data_path, workers, force=()):
+    """
+    Runs 'stages' in dependency order, independent ones side by side on a
+    pool of 'workers' processes (workers=1: one after the other, in this
+    process). A stage whose fingerprint is in the stage cache is restored
+    instead, unless its name is in 'force'.
+    Returns ({name: result}, {name: (start, end)}, {name: result hash}, {names restored}).
+    """
+    data_hash = data_service.dataset_info["hash"]
+    results, timings, hashes, cached = {}, {}, {}, set()
+    fingerprints = {}
+    pending = list(stages)
+
+    def finish(stage, result_path, result_hash, start, end):
+        results[stage.name] = joblib.load(result_path)
+        timings[stage.name], hashes[stage.name] = (start, end), result_hash
+        stage_cache.store(stage.name, fingerprints[stage.name], result_path, result_hash,
+                          VISUALS_DIR, stage.files, end - start)
+
+    def ready():
+        """ Stages whose dependencies are done, minus the ones restored from the cache. """
+        to_run = []
+        while True:
+            now = [stage for stage in pending if all(dep in results for dep in stage.deps)]
+            if not now:
+                return to_run
+            for stage in now:
+                pending.remove(stage)
+                fingerprint = stage_cache.stage_fingerprint(
+                    stage.name, stage.fn, data_hash, stage.params, {dep: hashes[dep] for dep in stage.deps},
+                    data_loader=load_and_clean_data,
+                )
+                fingerprints[stage.name] = fingerprint
+                entry = None if stage.name in force else stage_cache.lookup(stage.name, fingerprint)
+                if entry is None:
+                    to_run.append((stage, {dep: results[dep] for dep in stage.deps}))
+                    continue
+                # Restoring can make further stages ready, hence the loop.
+                start = time.time()
+                results[stage.name] = stage_cache.restore(entry, VISUALS_DIR)
+                timings[stage.name] = (start, time.time())
+                hashes[stage.name] = entry["result_hash"]
+                cached.add(stage.name)
+                print(f"♻️ Restored stage '{stage.name}' from the stage cache")
+
+    if workers <= 1:
+        while True:
+            to_run = ready()
+            if not to_run:
+                break
+            for stage, inputs in to_run:
+                finish(stage, *run_stage(stage, data_path, inputs))
+    else:
+        # Fork where possible, so workers share the loaded data instead of re-reading it.
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            running = {}
+            while True:
+                for stage, inputs in ready():
+                    running[pool.submit(run_stage, stage, data_path, inputs)] = stage
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), *future.result())
+    if pending:
+        raise RuntimeError(f"Unresolvable stage dependencies: {[s.name for s in pending]}")
+    return results, timings, hashes, cached
+
+def print_stage_timings(timings, pipeline_start, cached=()):
+    """ Per-stage start / end (seconds since the pipeline started) and duration. """
+    print("\n--- Stage Timings ---")
+    print(f"{'stage':<14}{'start_s':>10}{'end_s':>10}{'duration_s':>12}  source")
+    for name, (start, end) in sorted(timings.items(), key=lambda item: item[1][0]):
+        source = "cache" if name in cached else "run"
+        print(f"{name:<14}{start - pipeline_start:>10.2f}{end - pipeline_start:>10.2f}{end - start:>12.2f}  {source}")
+    total = sum(end - start for start, end in timings.values())
+    wall = max(end for _, end in timings.values()) - pipeline_start
+    print(f"Sum of stages: {total:.2f} s, wall time: {wall:.2f} s")
 
 # ==============================================================================
-# --- 3. Main Pipeline (The "Conductor") ---
+# --- 4. Main Pipeline (The "Conductor") ---
 # ==============================================================================
 
-def main_pipeline():
+def main_pipeline(data_path=DATA_PATH, workers=TRAIN_WORKERS, force=()):
     """
-    This is the main function that runs the entire pipeline in order.
+    Loads the data, runs the stage graph (restoring unchanged stages from
+    the stage cache, except those in 'force') and publishes the models.
     """
     
     print("\n" + "="*80)
@@ -271,36 +513,294 @@ def main_pipeline():
     
     os.makedirs(MODEL_DIR, exist_ok=True)
     os.makedirs(VISUALS_DIR, exist_ok=True)
+    pipeline_start = time.time()
 
-    # 1. Load Data
-    df_cleaned = load_and_clean_data(DATA_PATH)
+    # 1. Load Data (once, before the workers start)
+    df_cleaned = get_training_data(data_path)
     if df_cleaned is None:
         return
-    
-    # 2. Save EDA Plots
-    save_eda_plots(df_cleaned, VISUALS_DIR) 
-    
-    # 3. Train Classifier & Preprocessor
-    preprocessor, rf_model = train_classifier_and_preprocessor(df_cleaned)
-    
-    # 4. Train Regressor
-    lr_model = train_regressor(df_cleaned, preprocessor, VISUALS_DIR)
-    
-    # 5. Train Clusterer
-    kmeans_pipeline = train_clusterer(df_cleaned, VISUALS_DIR)
-    
-    # 6. Save all models
+    timings = {"load": (pipeline_start, time.time())}
+
+    # 2. Plots, preprocessor, classifier, regressor and clusterer
+    print(f"Running {len(STAGES)} stages on {workers} worker process(es).")
+    results, stage_timings, hashes, cached = run_stage_graph(STAGES, data_path, workers, force)
+    timings.update(stage_timings)
+    rf_model, acc = results["classifier"]
+    lr_model, r2 = results["regressor"]
+    kmeans_pipeline, inertia = results["clusterer"]
+
+    # 3. Save all models
+    save_start = time.time()
+    models_to_save = {
+        "preprocessor": results["preprocessor"],
+        "classifier": rf_model,
+        "regressor": lr_model,
+        "clusterer": kmeans_pipeline
+    }
+    metrics = {
+        "classifier_accuracy": float(acc),
+        "regressor_r2": float(r2),
+        "clusterer_inertia": inertia,
+        "training_rows": int(len(df_cleaned)),
+    }
+    save_all_models(models_to_save, metrics, data_path, {name: hashes[name] for name in MODEL_STAGES})
+    timings["save"] = (save_start, time.time())
+
+    # 4. Precompressed (.br / .gz) copies of the visuals, served by api/images.py
+    compress_start = time.time()
+    print("\n--- [Helper] Precompressing Visuals ---\n")
+    for name, sizes in precompress_directory(VISUALS_DIR).items():
+        print(f"{name}: " + ", ".join(f"{encoding} {size / 1024:.0f} KB" for encoding, size in sizes.items()))
+    timings["precompress"] = (compress_start, time.time())
+
+    print_stage_timings(timings, pipeline_start, cached)
+    print("\n" + "="*80)
+    print("--- [COMPLETE] Pipeline Finished Successfully ---")
+    print("="*80 + "\n")
+
+# ==============================================================================
+# --- 5. Out-of-Core Training (--out-of-core) ---
+# ==============================================================================
+# For CSVs that don't fit in memory: instead of loading the frame and
+# running the stage graph, the file is streamed three times, one chunk in
+# memory at a time. The artifacts have the same types and column layout
+# as the in-memory ones, so model_service serves them unchanged.
+#
+#   pass 1  scaler statistics (partial_fit), one-hot categories and class
+#           counts of the training rows; the clusterer's scaler
+#   pass 2  the regressor's normal equations, MiniBatchKMeans steps, and a
+#           stratified sample of the training rows (forest and plots)
+#   pass 3  test-set predictions, R^2 and inertia
+#
+# Each row goes to the test set with probability test_size, drawn from a
+# seeded stream, so the split is the same in every pass and doesn't
+# depend on the chunk size.
+
+def iter_training_chunks(data_path, chunk_size):
+    """ The CSV in cleaned chunks, like load_and_clean_data's frame (no customerID, Churn as 0/1). """
+    header = pd.read_csv(data_path, nrows=0).columns
+    reader = pd.read_csv(data_path, chunksize=chunk_size,
+                         usecols=[column for column in header if column not in data_service.DROPPED_COLUMNS])
+    for raw in reader:
+        chunk = data_service.clean_dataframe(raw)
+        chunk['Churn'] = chunk['Churn'].map({'Yes': 1, 'No': 0})
+        yield chunk
+
+def iter_split_chunks(data_path, chunk_size, test_size, random_state):
+    """ (chunk, is_test mask) for every chunk; the same masks on every call. """
+    rng = np.random.default_rng(random_state)
+    for chunk in iter_training_chunks(data_path, chunk_size):
+        yield chunk, rng.random(len(chunk)) < test_size
+
+def assemble_preprocessor(numerical_features, categorical_features, scaler, categories, example_df):
+    """
+    The ColumnTransformer fit_preprocessor builds, from statistics gathered
+    over chunks: fitted on a few example rows with the (sorted, like a
+    regular fit) categories given explicitly, then its scaler replaced by
+    the one fitted on every training row.
+    """
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(handle_unknown='ignore',
+                                  categories=[sorted(categories[column]) for column in categorical_features]),
+             categorical_features)
+        ],
+        remainder='drop'
+    )
+    preprocessor.fit(example_df)
+    preprocessor.transformers_[0] = ('num', scaler, numerical_features)
+    return preprocessor
+
+def solve_normal_equations(n_rows, sum_x, sum_y, xtx, xty):
+    """
+    The LinearRegression for accumulated sums: the minimum-norm least-squares
+    solution on centered data, which is what LinearRegression.fit finds
+    (the one-hot columns are collinear, so there is no unique one).
+    """
+    mean_x, mean_y = sum_x / n_rows, sum_y / n_rows
+    gram = xtx / n_rows - np.outer(mean_x, mean_x)
+    cross = xty / n_rows - mean_x * mean_y
+    coef = np.linalg.pinv(gram, rcond=1e-10, hermitian=True) @ cross
+
+    lr_model = LinearRegression()
+    lr_model.coef_ = coef
+    lr_model.intercept_ = float(mean_y - mean_x @ coef)
+    lr_model.n_features_in_ = len(coef)
+    return lr_model
+
+def update_sample(sample, chunk, quotas, rng):
+    """
+    Stratified sampling without replacement over a stream: every row gets
+    a random key and, per class, the 'quotas[class]' rows with the smallest
+    keys so far are kept. 'sample' maps class -> (keys, rows).
+    """
+    for label, quota in quotas.items():
+        rows = chunk[chunk['Churn'] == label]
+        keys = rng.random(len(rows))
+        if label in sample:
+            keys = np.concatenate([sample[label][0], keys])
+            rows = pd.concat([sample[label][1], rows], ignore_index=True)
+        if len(rows) > quota:
+            keep = np.argpartition(keys, quota - 1)[:quota]
+            keys, rows = keys[keep], rows.iloc[keep]
+        # Compact dtypes, so the kept rows cost a few bytes per value.
+        sample[label] = (keys, data_service.compact_dataframe(rows.reset_index(drop=True)))
+
+def main_out_of_core(data_path=DATA_PATH, chunk_size=TRAIN_CHUNK_SIZE, sample_rows=TRAIN_SAMPLE_ROWS,
+                     test_size=0.2, n_estimators=100, n_clusters=3, random_state=42):
+    """
+    Trains the same four models as main_pipeline in three streaming passes
+    over 'data_path' and publishes them. The forest is fitted on a
+    stratified sample of at most 'sample_rows' training rows; the plots are
+    drawn from that sample.
+    """
+    print("\n" + "="*80)
+    print(f"--- [START] DWM Training Pipeline (out-of-core, {chunk_size} rows per chunk) ---")
+    print("="*80)
+    os.makedirs(VISUALS_DIR, exist_ok=True)
+    pipeline_start = time.time()
+    timings = {}
+
+    # Pass 1: preprocessor statistics and the clusterer's scaler
+    print("\n--- [Helper] Pass 1: Preprocessor Statistics ---\n")
+    scaler, cluster_scaler = StandardScaler(), StandardScaler()
+    categories, class_counts = {}, {0: 0, 1: 0}
+    numerical_features = categorical_features = example_df = None
+    n_rows = 0
+    for chunk, is_test in iter_split_chunks(data_path, chunk_size, test_size, random_state):
+        features_df = feature_frame(chunk[~is_test])
+        if example_df is None:
+            numerical_features = features_df.select_dtypes(include=np.number).columns.tolist()
+            categorical_features = features_df.select_dtypes(include='object').columns.tolist()
+            example_df = features_df.head(100)
+        scaler.partial_fit(features_df[numerical_features])
+        for column in categorical_features:
+            categories.setdefault(column, set()).update(features_df[column].unique())
+        for label, count in chunk['Churn'][~is_test].value_counts().items():
+            class_counts[label] += int(count)
+        cluster_scaler.partial_fit(chunk[['tenure', 'MonthlyCharges']])
+        n_rows += len(chunk)
+    if example_df is None:
+        print(f"Error: No rows to train on in {data_path}")
+        return
+    preprocessor = assemble_preprocessor(numerical_features, categorical_features, scaler, categories, example_df)
+    print(f"Preprocessor fitted on {sum(class_counts.values())} training rows ({n_rows} rows in total).")
+    timings["statistics"] = (pipeline_start, time.time())
+
+    # Pass 2: regressor, clusterer and the forest's sample
+    pass_start = time.time()
+    print("\n--- [Helper] Pass 2: Regressor, Clusterer and Forest Sample ---\n")
+    n_train = sum(class_counts.values())
+    quotas = {label: max(1, round(min(sample_rows, n_train) * count / n_train))
+              for label, count in class_counts.items() if count > 0}
+    sample, sample_rng = {}, np.random.default_rng(random_state + 1)
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, batch_size=KMEANS_BATCH_SIZE)
+    n_features = len(preprocessor.get_feature_names_out())
+    sum_x, sum_y, xtx, xty = np.zeros(n_features), 0.0, np.zeros((n_features, n_features)), np.zeros(n_features)
+    for chunk, is_test in iter_split_chunks(data_path, chunk_size, test_size, random_state):
+        X = preprocessor.transform(feature_frame(chunk))
+        y = chunk['MonthlyCharges'].to_numpy(dtype=np.float64)
+        sum_x += X.sum(axis=0)
+        sum_y += y.sum()
+        xtx += X.T @ X
+        xty += X.T @ y
+
+        scaled = cluster_scaler.transform(chunk[['tenure', 'MonthlyCharges']])
+        for start in range(0, len(scaled), KMEANS_BATCH_SIZE):
+            batch = scaled[start:start + KMEANS_BATCH_SIZE]
+            # k-means++ needs at least n_clusters rows for its first step.
+            if len(batch) >= n_clusters or hasattr(kmeans, "cluster_centers_"):
+                kmeans.partial_fit(batch)
+
+        update_sample(sample, chunk[~is_test], quotas, sample_rng)
+    lr_model = solve_normal_equations(n_rows, sum_x, sum_y, xtx, xty)
+    kmeans_pipeline = Pipeline([('scaler', cluster_scaler), ('kmeans', kmeans)])
+    print("Linear Regression solved from the normal equations; MiniBatchKMeans fitted.")
+
+    sample_df = pd.concat([rows for _, rows in sample.values()], ignore_index=True)
+    sample_df = sample_df.astype({column: object for column in sample_df.select_dtypes('category').columns})
+    rf_model = RandomForestClassifier(random_state=random_state, n_estimators=n_estimators, n_jobs=TRAIN_N_JOBS)
+    rf_model.fit(preprocessor.transform(feature_frame(sample_df)), sample_df['Churn'])
+    print(f"Random Forest trained on a stratified sample of {len(sample_df)} training rows.")
+    timings["fit"] = (pass_start, time.time())
+
+    # Pass 3: evaluation
+    pass_start = time.time()
+    print("\n--- [Helper] Pass 3: Evaluation ---\n")
+    y_test_c, y_pred_c = [], []
+    sse = sum_sq = inertia = 0.0
+    for chunk, is_test in iter_split_chunks(data_path, chunk_size, test_size, random_state):
+        X = preprocessor.transform(feature_frame(chunk))
+        y = chunk['MonthlyCharges'].to_numpy(dtype=np.float64)
+        sse += float(((y - lr_model.predict(X)) ** 2).sum())
+        sum_sq += float(((y - sum_y / n_rows) ** 2).sum())
+        inertia -= kmeans_pipeline.score(chunk[['tenure', 'MonthlyCharges']])
+        if is_test.any():
+            y_test_c.append(chunk['Churn'].to_numpy(dtype=np.int8)[is_test])
+            y_pred_c.append(rf_model.predict(X[is_test]).astype(np.int8))
+    y_test_c = np.concatenate(y_test_c) if y_test_c else np.zeros(0, dtype=np.int8)
+    y_pred_c = np.concatenate(y_pred_c) if y_pred_c else np.zeros(0, dtype=np.int8)
+    acc = accuracy_score(y_test_c, y_pred_c) if len(y_test_c) else float('nan')
+    r2 = 1.0 - sse / sum_sq if sum_sq > 0 else float('nan')
+    print("Random Forest Classifier Report:")
+    print(classification_report(y_test_c, y_pred_c, zero_division=0))
+    print(f"Accuracy: {acc * 100:.2f}%, Linear Regression R^2 = {r2:.4f}, K-Means inertia = {inertia:.1f}")
+    timings["evaluate"] = (pass_start, time.time())
+
+    # Plots, from the sample
+    plot_start = time.time()
+    save_eda_plots(sample_df)
+    save_classifier_plots(rf_model, preprocessor.get_feature_names_out(), y_test_c, y_pred_c)
+    save_regression_plot(sample_df['MonthlyCharges'], lr_model.predict(preprocessor.transform(feature_frame(sample_df))))
+    sample_clusters = sample_df[['tenure', 'MonthlyCharges']]
+    save_cluster_plot(sample_clusters, kmeans_pipeline.predict(sample_clusters), n_clusters)
+    timings["plots"] = (plot_start, time.time())
+
+    save_start = time.time()
     models_to_save = {
         "preprocessor": preprocessor,
-        "classifier_rf": rf_model,
-        "regression_linear": lr_model,
-        "cluster_kmeans": kmeans_pipeline
+        "classifier": rf_model,
+        "regressor": lr_model,
+        "clusterer": kmeans_pipeline
     }
-    save_all_models(models_to_save, MODEL_DIR)
-    
+    metrics = {
+        "classifier_accuracy": float(acc),
+        "regressor_r2": float(r2),
+        "clusterer_inertia": float(inertia),
+        "training_rows": int(n_rows),
+        "training_mode": "out_of_core",
+        "forest_sample_rows": int(len(sample_df)),
+    }
+    save_all_models(models_to_save, metrics, data_path)
+    timings["save"] = (save_start, time.time())
+
+    compress_start = time.time()
+    precompress_directory(VISUALS_DIR)
+    timings["precompress"] = (compress_start, time.time())
+
+    print_stage_timings(timings, pipeline_start)
     print("\n" + "="*80)
     print("--- [COMPLETE] Pipeline Finished Successfully ---")
     print("="*80 + "\n")
 
 if __name__ == "__main__":
-    main_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Trains the models and publishes them to the model registry.")
+    parser.add_argument("--data", default=DATA_PATH, help="Training CSV.")
+    parser.add_argument("--workers", type=int, default=TRAIN_WORKERS,
+                        help="Processes for independent stages (1 = run them one after the other).")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        choices=[stage.name for stage in STAGES] + ["all"],
+                        help="Rerun this stage even if it is cached (repeatable; 'all' reruns every stage). "
+                             "Its dependents rerun only if its result changes.")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Stream the CSV in chunks instead of loading it (for data larger than memory).")
+    parser.add_argument("--chunk-size", type=int, default=TRAIN_CHUNK_SIZE, help="Rows per chunk with --out-of-core.")
+    parser.add_argument("--sample-rows", type=int, default=TRAIN_SAMPLE_ROWS,
+                        help="Training rows sampled for the forest with --out-of-core.")
+    args = parser.parse_args()
+    if args.out_of_core:
+        main_out_of_core(args.data, args.chunk_size, args.sample_rows)
+    else:
+        force = {stage.name for stage in STAGES} if "all" in args.force else set(args.force)
+        main_pipeline(args.data, args.workers, force)
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# --- 1. AVAILABLE METRICS ---
+# Each metric is computed per group from a few bincount sums, so a query
+# costs one pass over the group codes no matter how many rows there are.
+NUMERIC_METRICS = {
+    "avg_tenure": "tenure",
+    "avg_monthly_charges": "MonthlyCharges",
+    "avg_total_charges": "TotalCharges",
+}
+METRICS = ["count", "churned", "churn_rate", *NUMERIC_METRICS]
+
+
+class AggregationError(ValueError):
+    """ Raised for an unknown group_by column or metric. """
+
+
+# --- 2. THE ENGINE ---
+class AggregationEngine:
+    """
+    Answers group-by / KPI queries over the cleaned explorer dataset.
+
+    The frame is reduced once to NumPy arrays (churn flag, numeric columns,
+    factorized group codes per column) and every distinct query result is
+    memoized, so repeated dashboard loads only pay a dictionary lookup.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.churned = (df['Churn'].astype(str) == 'Yes').to_numpy(dtype=np.float64)
+        self.numeric = {
+            column: df[column].to_numpy(dtype=np.float64)
+            for column in NUMERIC_METRICS.values()
+        }
+        self.groupable = [
+            column for column in df.columns
+            if column not in ('Churn', 'customerID', *NUMERIC_METRICS.values())
+        ]
+        self._df = df
+        self._codes: Dict[str, Tuple[np.ndarray, list]] = {}
+        self._results: Dict[Any, Any] = {}
+
+    def _group_codes(self, column: str) -> Tuple[np.ndarray, list]:
+        """ Factorizes a column once: (code per row, sorted group values). """
+        if column not in self._codes:
+            codes, uniques = pd.factorize(self._df[column], sort=True)
+            self._codes[column] = (codes, [value.item() if hasattr(value, 'item') else value
+                                           for value in uniques])
+        return self._codes[column]
+
+    def _parse_metrics(self, metrics: Optional[List[str]]) -> Tuple[str, ...]:
+        if not metrics:
+            return tuple(METRICS)
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            raise AggregationError(
+                f"Unknown metric(s): {', '.join(unknown)}. Available: {', '.join(METRICS)}"
+            )
+        return tuple(dict.fromkeys(metrics))
+
+    def aggregate(self, group_by: str, metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Returns one row per distinct value of 'group_by' with the
+        requested metrics, e.g.
+        {"group_by": "Contract", "metrics": [...], "groups": [{"Contract": "One year", "count": 1472, ...}]}
+        """
+        if group_by not in self.groupable:
+            raise AggregationError(
+                f"Cannot group by '{group_by}'. Available: {', '.join(self.groupable)}"
+            )
+        metric_names = self._parse_metrics(metrics)
+
+        cache_key = ("aggregate", group_by, metric_names)
+        if cache_key in self._results:
+            return self._results[cache_key]
+
+        codes, values = self._group_codes(group_by)
+        n_groups = len(values)
+        valid = codes >= 0
+        codes = codes[valid]
+
+        count = np.bincount(codes, minlength=n_groups)
+        safe_count = np.maximum(count, 1)
+        churned = np.bincount(codes, weights=self.churned[valid], minlength=n_groups)
+
+        columns: Dict[str, np.ndarray] = {}
+        for metric in metric_names:
+            if metric == "count":
+                columns[metric] = count
+            elif metric == "churned":
+                columns[metric] = churned.astype(np.int64)
+            elif metric == "churn_rate":
+                columns[metric] = churned / safe_count
+            else:
+                weights = self.numeric[NUMERIC_METRICS[metric]][valid]
+                columns[metric] = np.bincount(codes, weights=weights, minlength=n_groups) / safe_count
+
+        groups = [
+            {group_by: value, **{metric: columns[metric][i].item() for metric in metric_names}}
+            for i, value in enumerate(values)
+        ]
+        result = {"group_by": group_by, "metrics": list(metric_names), "groups": groups}
+        self._results[cache_key] = result
+        return result
+
+    def kpis(self) -> Dict[str, Any]:
+        """ Dataset-wide headline numbers for the home page. """
+        if "kpis" not in self._results:
+            n_rows = max(self.n_rows, 1)
+            churned = int(self.churned.sum())
+            self._results["kpis"] = {
+                "total_customers": self.n_rows,
+                "churned_customers": churned,
+                "churn_rate": churned / n_rows,
+                "avg_tenure": float(self.numeric["tenure"].sum() / n_rows),
+                "avg_monthly_charges": float(self.numeric["MonthlyCharges"].sum() / n_rows),
+                "avg_total_charges": float(self.numeric["TotalCharges"].sum() / n_rows),
+            }
+        return self._results["kpis"]
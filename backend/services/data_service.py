@@ -0,0 +1,235 @@
+import glob
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+
+# pyarrow is optional: without it the dataset is always parsed from the CSV.
+try:
+    from pyarrow import feather
+except ImportError:
+    feather = None
+
+# --- 1. DEFINE DATA PATHS ---
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# CHURN_DATA_PATH serves another copy of the dataset, e.g. one grown by
+# benchmarks/scale_dataset.py for load tests at production size.
+DATA_PATH = os.getenv("CHURN_DATA_PATH", os.path.join(BACKEND_DIR, 'data', 'telco_customer_churn.csv'))
+
+# Text columns of the dataset. They are parsed straight into 'category'
+# so the full object-string copy of the CSV never exists in memory.
+CATEGORICAL_COLUMNS = [
+    'gender', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
+    'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+    'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract',
+    'PaperlessBilling', 'PaymentMethod', 'Churn',
+]
+DROPPED_COLUMNS = ['customerID']
+
+# Binary (Feather / Arrow IPC) copy of the cleaned, compacted dataset,
+# keyed by a hash of the source CSV. Written by scripts/train_model.py
+# (and by the API on a cache miss), memory-mapped on startup.
+CACHE_DIR = os.getenv("CHURN_DATASET_CACHE_DIR", os.path.join(BACKEND_DIR, 'data', 'cache'))
+CACHE_ENABLED = os.getenv("CHURN_DATASET_CACHE_ENABLED", "1") not in ("0", "false", "False")
+
+# Every router gets a view of the same frame. With Copy-on-Write a write
+# through one view copies the touched column instead of changing the
+# shared data (this is already the default from pandas 3.0 on).
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+# --- 2. CLEANING (shared with scripts/train_model.py) ---
+def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The basic cleaning every consumer of the dataset does:
+    TotalCharges to numeric (blank strings become NaN), then drop NaN rows.
+    """
+    df = df.copy()
+    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
+    return df.dropna().reset_index(drop=True)
+
+
+def compact_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores the frame in the smallest dtypes that keep every value exact:
+    text columns as 'category', integers downcast (int8/int16/...), and
+    floats as float32 only when that round-trips (charges with cents,
+    e.g. 29.85, do not, so they stay float64).
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object or pd.api.types.is_string_dtype(series):
+            series = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            series = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            as_float32 = series.astype(np.float32)
+            if np.array_equal(as_float32.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64)):
+                series = as_float32
+        columns[column] = series
+    return pd.DataFrame(columns)
+
+
+def read_csv_dataset(data_path: str = DATA_PATH) -> pd.DataFrame:
+    """
+    Parses the CSV into the cleaned, compacted frame (no customerID).
+    Raises FileNotFoundError if the file is missing.
+    """
+    header = pd.read_csv(data_path, nrows=0).columns
+    raw = pd.read_csv(
+        data_path,
+        # Nobody needs the ID column, and it is the most expensive one.
+        usecols=[column for column in header if column not in DROPPED_COLUMNS],
+        dtype={column: 'category' for column in CATEGORICAL_COLUMNS if column in header},
+    )
+    return compact_dataframe(clean_dataframe(raw))
+
+
+# --- 3. BINARY CACHE ---
+def source_hash(data_path: str) -> str:
+    """ SHA-256 of the source file's bytes, read in 1 MB blocks. """
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path_for(data_path: str, digest: str) -> str:
+    """ e.g. data/cache/telco_customer_churn.<first 16 hex digits>.feather """
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}.{digest[:16]}.feather")
+
+
+def read_dataset_cache(data_path: str, digest: str) -> Optional[pd.DataFrame]:
+    """
+    Memory-maps the cache for this exact CSV content.
+    Returns None if caching is off, pyarrow is missing, or there is no
+    (readable) cache for this hash.
+    """
+    if not CACHE_ENABLED or feather is None:
+        return None
+    path = cache_path_for(data_path, digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        return feather.read_table(path, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable dataset cache {path}: {e}")
+        return None
+
+
+def write_dataset_cache(df: pd.DataFrame, data_path: str, digest: str) -> Optional[str]:
+    """
+    Writes the cache for this CSV content and removes the caches of older
+    versions of the same CSV. The file is written under a temporary name
+    and renamed, so a concurrent reader never sees a half-written cache.
+    Returns the cache path, or None if caching is off or failed.
+    """
+    if not CACHE_ENABLED or feather is None:
+        return None
+    path = cache_path_for(data_path, digest)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Uncompressed, so the columns can be memory-mapped as they are.
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Could not write dataset cache {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    for stale in glob.glob(os.path.join(CACHE_DIR, f"{stem}.*.feather")):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+def read_dataset(data_path: str = DATA_PATH) -> pd.DataFrame:
+    """
+    The cleaned, compacted dataset: from the binary cache when it matches
+    the CSV's current hash, otherwise parsed from the CSV (and the cache
+    rebuilt). Raises FileNotFoundError if the CSV is missing.
+    """
+    start = time.perf_counter()
+    digest = source_hash(data_path)
+
+    df = read_dataset_cache(data_path, digest)
+    source = "cache"
+    if df is None:
+        df = read_csv_dataset(data_path)
+        write_dataset_cache(df, data_path, digest)
+        source = "csv"
+
+    dataset_info.update({
+        "source": source,
+        "hash": digest,
+        "load_ms": round((time.perf_counter() - start) * 1000.0, 2),
+    })
+    return df
+
+
+# --- 4. THE SHARED STORE ---
+_dataset: Optional[pd.DataFrame] = None
+_load_lock = threading.Lock()
+
+# Where the last read_dataset() came from ("cache" or "csv"), and how long it took.
+dataset_info: Dict[str, Any] = {"source": None, "hash": None, "load_ms": None}
+
+
+def load_dataset(data_path: str = DATA_PATH) -> Optional[pd.DataFrame]:
+    """
+    Loads the cleaned, compacted dataset ONCE per process
+    (from the binary cache when it is up to date, see read_dataset).
+    Called on server startup by main.py (and lazily by get_dataset).
+    Returns None if the file is missing or cannot be cleaned.
+    """
+    global _dataset
+
+    with _load_lock:
+        if _dataset is not None:
+            return _dataset
+        try:
+            _dataset = read_dataset(data_path)
+            print(f"✅ Dataset loaded from {dataset_info['source']} in {dataset_info['load_ms']:.0f} ms "
+                  f"({len(_dataset)} rows, {get_memory_footprint()['total_bytes'] / 1024:.0f} KB in memory)")
+        except FileNotFoundError:
+            print(f"❌ ERROR: {data_path} not found.")
+        except Exception as e:
+            print(f"❌ ERROR loading dataset: {e}")
+        return _dataset
+
+
+def get_dataset() -> Optional[pd.DataFrame]:
+    """
+    Returns a view of the shared, cleaned dataset (no customerID).
+    The view shares memory with the store; treat it as read-only.
+    Returns None if the dataset could not be loaded.
+    """
+    df = _dataset if _dataset is not None else load_dataset()
+    return None if df is None else df.copy(deep=False)
+
+
+def get_memory_footprint() -> Dict[str, Any]:
+    """ Source (cache/csv), load time, rows, total bytes and bytes per column of the shared frame. """
+    if _dataset is None:
+        return {"rows": 0, "total_bytes": 0, "columns": {}}
+    usage = _dataset.memory_usage(deep=True, index=True)
+    return {
+        "source": dataset_info["source"],
+        "load_ms": dataset_info["load_ms"],
+        "rows": len(_dataset),
+        "total_bytes": int(usage.sum()),
+        "columns": {
+            str(column): {"dtype": str(_dataset[column].dtype), "bytes": int(usage[column])}
+            for column in _dataset.columns
+        },
+    }
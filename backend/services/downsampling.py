@@ -0,0 +1,163 @@
+import os
+import numpy as np
+from typing import Dict, Literal, Optional, Tuple
+
+# --- 1. SETTINGS ---
+# Used when a figure asks for a mode but not for max_points.
+DEFAULT_MAX_POINTS = int(os.getenv("CHURN_FIGURE_DEFAULT_MAX_POINTS", "2000"))
+# Upper bound for max_points (more than this is not a downsample any more).
+MAX_FIGURE_POINTS = int(os.getenv("CHURN_FIGURE_MAX_POINTS", "100000"))
+# Seed of the sample, so the same request always returns the same points
+# (and the same ETag).
+SAMPLE_SEED = 42
+
+DownsampleMode = Literal["sample", "hexbin", "grid"]
+
+
+# --- 2. SAMPLING ---
+def stratified_sample(n_rows: int, max_points: int, strata: Optional[np.ndarray] = None,
+                      seed: int = SAMPLE_SEED) -> np.ndarray:
+    """
+    Row indices (sorted) of a random sample of at most 'max_points' rows.
+
+    With 'strata' (e.g. cluster labels) every stratum keeps its share of
+    the rows (largest-remainder rounding), so small clusters don't vanish
+    from the chart.
+    """
+    if max_points >= n_rows:
+        return np.arange(n_rows)
+    if strata is None:
+        strata = np.zeros(n_rows, dtype=np.intp)
+
+    codes, sizes = np.unique(strata, return_inverse=True, return_counts=True)[1:]
+    quotas = sizes * (max_points / n_rows)
+    keep = np.floor(quotas).astype(np.intp)
+    # Hand the rows lost to rounding down to the largest remainders.
+    short = max_points - keep.sum()
+    keep[np.argsort(keep - quotas, kind='stable')[:short]] += 1
+
+    # Each stratum keeps the rows with the lowest random priority
+    # (argpartition: linear time, no full sort).
+    priority = np.random.default_rng(seed).random(n_rows)
+    chosen = []
+    for code in np.flatnonzero(keep):
+        members = np.flatnonzero(codes == code)
+        if keep[code] < len(members):
+            members = members[np.argpartition(priority[members], keep[code])[:keep[code]]]
+        chosen.append(members)
+    return np.sort(np.concatenate(chosen))
+
+
+# --- 3. BINNING ---
+def _extent(values: np.ndarray) -> Tuple[float, float]:
+    low, high = float(values.min()), float(values.max())
+    return low, (high - low) or 1.0
+
+
+def grid_bins(x: np.ndarray, y: np.ndarray, max_points: int,
+              groups: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Counts points on a square sqrt(max_points) x sqrt(max_points) grid
+    (per group, if given). Returns the centers and counts of the
+    non-empty cells: {"x", "y", "count"} (+ "group").
+    """
+    n = max(1, int(np.sqrt(max_points)))
+    x_low, x_span = _extent(x)
+    y_low, y_span = _extent(y)
+    ix = np.clip(((x - x_low) / x_span * n).astype(np.intp), 0, n - 1)
+    iy = np.clip(((y - y_low) / y_span * n).astype(np.intp), 0, n - 1)
+
+    cell = ix * n + iy
+    centers_x = x_low + ((np.arange(n * n) // n) + 0.5) * (x_span / n)
+    centers_y = y_low + ((np.arange(n * n) % n) + 0.5) * (y_span / n)
+    return _count_cells(cell, n * n, centers_x, centers_y, groups)
+
+
+def hexbin(x: np.ndarray, y: np.ndarray, max_points: int,
+           groups: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Counts points in hexagonal cells (per group, if given), sized so there
+    are at most about 'max_points' cells. Same layout as matplotlib's
+    hexbin: two offset rectangular lattices, each point goes to the
+    nearer of its two candidate centers. Returns the centers and counts
+    of the non-empty cells: {"x", "y", "count"} (+ "group").
+    """
+    # Lattice 1 has (nx + 1) * (ny + 1) centers, lattice 2 nx * ny,
+    # and ny = nx / sqrt(3) makes the hexagons regular.
+    nx = max(1, int(np.sqrt(max_points * np.sqrt(3) / 2)) - 1)
+    ny = max(1, int(nx / np.sqrt(3)))
+    x_low, x_span = _extent(x)
+    y_low, y_span = _extent(y)
+    sx, sy = x_span / nx, y_span / ny
+
+    px = (x - x_low) / sx
+    py = (y - y_low) / sy
+    ix1, iy1 = np.round(px).astype(np.intp), np.round(py).astype(np.intp)
+    # Points on the top / right edge have no lattice 2 cell above / right of them.
+    ix2 = np.minimum(np.floor(px).astype(np.intp), nx - 1)
+    iy2 = np.minimum(np.floor(py).astype(np.intp), ny - 1)
+    d1 = (px - ix1) ** 2 + 3.0 * (py - iy1) ** 2
+    d2 = (px - ix2 - 0.5) ** 2 + 3.0 * (py - iy2 - 0.5) ** 2
+    on_first = d1 <= d2
+
+    # Lattice 1 cells are numbered first, lattice 2 cells after them.
+    n_first = (nx + 1) * (ny + 1)
+    cell = np.where(on_first, ix1 * (ny + 1) + iy1, n_first + ix2 * ny + iy2)
+
+    first = np.arange(n_first)
+    second = np.arange(nx * ny)
+    centers_x = np.concatenate([x_low + (first // (ny + 1)) * sx, x_low + (second // ny + 0.5) * sx])
+    centers_y = np.concatenate([y_low + (first % (ny + 1)) * sy, y_low + (second % ny + 0.5) * sy])
+    return _count_cells(cell, n_first + nx * ny, centers_x, centers_y, groups)
+
+
+def _count_cells(cell: np.ndarray, n_cells: int, centers_x: np.ndarray, centers_y: np.ndarray,
+                 groups: Optional[np.ndarray]) -> Dict[str, np.ndarray]:
+    """ One bincount over (group, cell); keeps the non-empty cells. """
+    if groups is None:
+        counts = np.bincount(cell, minlength=n_cells)
+        occupied = np.flatnonzero(counts)
+        return {"x": centers_x[occupied], "y": centers_y[occupied], "count": counts[occupied]}
+
+    labels, codes = np.unique(groups, return_inverse=True)
+    counts = np.bincount(codes * n_cells + cell, minlength=len(labels) * n_cells)
+    occupied = np.flatnonzero(counts)
+    cells = occupied % n_cells
+    return {
+        "group": labels[occupied // n_cells],
+        "x": centers_x[cells],
+        "y": centers_y[cells],
+        "count": counts[occupied],
+    }
+
+
+# --- 4. FIGURE COLUMNS ---
+def downsample_columns(columns: Dict[str, np.ndarray], x: str, y: str, group: Optional[str],
+                       mode: DownsampleMode, max_points: int) -> Dict[str, np.ndarray]:
+    """
+    Downsamples a figure given as columns (field name -> array).
+
+    - sample: the same fields for at most 'max_points' rows, stratified
+      by 'group' if given.
+    - hexbin / grid: one row per non-empty cell of the 'x' / 'y' plane
+      (per 'group'): the cell center in place of x and y, plus a 'count'
+      field. Fields other than x, y and group are dropped. The cells are
+      sized so that all groups together have at most ~'max_points' of them.
+    """
+    groups = columns[group] if group is not None else None
+    if mode == "sample":
+        n_rows = len(columns[x])
+        rows = stratified_sample(n_rows, max_points, groups)
+        return {name: values[rows] for name, values in columns.items()}
+
+    n_groups = len(np.unique(groups)) if groups is not None else 1
+    binned = (hexbin if mode == "hexbin" else grid_bins)(
+        columns[x], columns[y], max(1, max_points // n_groups), groups
+    )
+    renamed = {x: binned["x"], y: binned["y"]}
+    if group is not None:
+        renamed[group] = binned["group"]
+    # Keep the figure's field order, then the count.
+    result = {name: renamed[name] for name in columns if name in renamed}
+    result["count"] = binned["count"]
+    return result
@@ -0,0 +1,186 @@
+import asyncio
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services import data_service, model_service
+
+# --- 1. SETTINGS ---
+FIGURE_CACHE_ENABLED = os.getenv("CHURN_FIGURE_CACHE_ENABLED", "1") == "1"
+# Payloads are also written here, so a restarted (or another) worker
+# serves them without recomputing. Set CHURN_FIGURE_CACHE_PERSIST=0 to
+# keep them in memory only.
+FIGURE_CACHE_DIR = os.getenv("CHURN_FIGURE_CACHE_DIR", os.path.join(data_service.CACHE_DIR, 'figures'))
+FIGURE_CACHE_PERSIST = os.getenv("CHURN_FIGURE_CACHE_PERSIST", "1") == "1"
+# Most payloads kept in memory (full figures plus downsampled variants).
+FIGURE_CACHE_SIZE = int(os.getenv("CHURN_FIGURE_CACHE_SIZE", "64"))
+# Build (or load from disk) the figures on startup. Workers that don't
+# serve figures can turn this off, so they never load the regressor and
+# clusterer (see CHURN_PRELOAD_MODELS in model_service).
+FIGURE_CACHE_WARMUP = os.getenv("CHURN_FIGURE_CACHE_WARMUP", "1") == "1"
+
+
+# --- 2. THE CACHE ---
+@dataclass(frozen=True)
+class FigurePayload:
+    body: bytes      # the serialized response (JSON or Arrow)
+    etag: str        # strong ETag: quoted hash of 'body'
+
+
+def make_etag(body: bytes) -> str:
+    """ Strong ETag for a payload: the quoted first 32 hex digits of its SHA-256. """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class FigureCache:
+    """
+    Pre-serialized figure payloads (e.g. /api/figures/regression), one
+    per figure name, valid for one (model fingerprint, data hash) pair.
+
+    A payload only changes when the models or the dataset change, so it
+    is built once, kept in memory and (optionally) on disk, and served as
+    raw bytes with an ETag. When either fingerprint changes, the next
+    request rebuilds it.
+    """
+
+    def __init__(self, cache_dir: str = FIGURE_CACHE_DIR,
+                 persist: bool = FIGURE_CACHE_PERSIST,
+                 enabled: bool = FIGURE_CACHE_ENABLED,
+                 max_entries: int = FIGURE_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.persist = persist
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+
+        # name -> (key, payload), least recently used first; only the
+        # current version of each figure is kept.
+        self._entries: "OrderedDict[str, Tuple[tuple, FigurePayload]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def make_key(self, name: str) -> tuple:
+        """ (name, model fingerprint, data hash) of the currently loaded state. """
+        return (name, model_service.model_fingerprint, data_service.dataset_info["hash"])
+
+    def _disk_path(self, key: tuple) -> str:
+        name, model_hash, data_hash = key
+        return os.path.join(self.cache_dir, f"{name}.{str(model_hash)[:16]}.{str(data_hash)[:16]}.payload")
+
+    def get(self, name: str) -> Optional[FigurePayload]:
+        """ The payload for the current state: from memory, then from disk. """
+        if not self.enabled:
+            return None
+        key = self.make_key(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry[1]
+
+        if not self.persist:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        payload = FigurePayload(body=body, etag=make_etag(body))
+        with self._lock:
+            self._store(name, key, payload)
+            self.disk_hits += 1
+        return payload
+
+    def _store(self, name: str, key: tuple, payload: FigurePayload):
+        """ Caller holds the lock. """
+        self._entries[name] = (key, payload)
+        self._entries.move_to_end(name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, name: str, key: tuple, body: bytes, persist: bool = True) -> FigurePayload:
+        """
+        Stores a freshly built payload under 'key' (the state it was
+        built from) and, if persisting, writes it atomically to disk.
+        """
+        payload = FigurePayload(body=body, etag=make_etag(body))
+        if not self.enabled:
+            return payload
+        with self._lock:
+            self._store(name, key, payload)
+            self.builds += 1
+        if self.persist and persist:
+            self._write(name, key, body)
+        return payload
+
+    def _write(self, name: str, key: tuple, body: bytes):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not persist figure '{name}': {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        # Payloads of older models / data are never served again.
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{name}.*.payload")):
+            if stale != path:
+                os.remove(stale)
+
+    async def get_or_build(self, name: str, build_fn: Callable[[], bytes],
+                           persist: bool = True) -> FigurePayload:
+        """
+        Returns the cached payload, or builds it with 'build_fn' on the
+        heavy inference pool. Concurrent requests for the same figure wait
+        for one build instead of each running their own.
+        'persist=False' keeps the payload in memory only (e.g. for the
+        many possible downsampled variants).
+        """
+        payload = self.get(name)
+        if payload is not None:
+            return payload
+
+        lock = self._build_locks.setdefault(name, asyncio.Lock())
+        try:
+            async with lock:
+                payload = self.get(name)
+                if payload is not None:
+                    return payload
+                key = self.make_key(name)
+                body = await model_service.run_inference(build_fn, heavy=True)
+                return self.put(name, key, body, persist=persist)
+        finally:
+            # Names come from request parameters; don't keep a lock per name forever.
+            if not lock.locked():
+                self._build_locks.pop(name, None)
+
+    def clear(self):
+        """ Drops the in-memory payloads (files on disk are kept). """
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "persist": self.persist,
+                "figures": {name: len(payload.body) for name, (_, payload) in self._entries.items()},
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "builds": self.builds,
+                "evictions": self.evictions,
+            }
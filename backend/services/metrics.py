@@ -0,0 +1,282 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# --- 1. SETTINGS ---
+# Set CHURN_METRICS_ENABLED=0 to turn off the request middleware and the
+# model stage timers (the /api/metrics endpoint then only reports the
+# pulled gauges: queue depth, caches, model version).
+METRICS_ENABLED = os.getenv("CHURN_METRICS_ENABLED", "1") == "1"
+
+# Histogram bucket upper bounds, in seconds (from 0.1 ms to 10 s).
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A sample of a pulled metric: (label values, value).
+Sample = Tuple[Dict[str, str], float]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# --- 2. METRIC TYPES ---
+class Counter:
+    """ A monotonically increasing count per label combination. """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """ A value that goes up and down, per label combination. """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Observations counted into fixed buckets, per label combination.
+    Rendered the Prometheus way: cumulative '_bucket' counts (le="..."),
+    plus '_sum' and '_count', so quantiles can be computed server-side
+    with histogram_quantile().
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+1 for +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+# --- 3. REGISTRY ---
+class MetricsRegistry:
+    """
+    The metrics this process exposes. Counters / histograms are updated
+    as things happen; 'collectors' are called at scrape time for values
+    that already live elsewhere (queue depth, cache counters), so the hot
+    paths don't have to report them twice.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """
+        'collect' returns (name, type, help, samples) tuples, where type is
+        "counter" or "gauge" and samples are (labels dict, value) pairs.
+        """
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        """ Every metric in the Prometheus text exposition format (0.0.4). """
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- 4. THE API'S METRICS ---
+http_requests = registry.counter(
+    "churn_http_requests_total", "HTTP requests handled, by route template and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "churn_http_request_duration_seconds", "Time from receiving a request to sending the end of its response.",
+    ("method", "route"),
+)
+http_requests_in_progress = registry.gauge(
+    "churn_http_requests_in_progress", "HTTP requests being handled right now.",
+)
+stage_duration = registry.histogram(
+    "churn_model_stage_duration_seconds",
+    "Time spent in one model stage call: preprocess (feature transform), inference "
+    "(predict_proba / predict), explain (tree-path contributions) or serialize (response encoding). "
+    "'component' is the model, transform or payload format that did the work.",
+    ("stage", "component"),
+)
+stage_rows = registry.counter(
+    "churn_model_stage_rows_total", "Rows processed by each model stage.", ("stage", "component"),
+)
+
+
+@contextmanager
+def stage_timer(stage: str, component: str = "", rows: Optional[int] = None):
+    """
+    Times the block into churn_model_stage_duration_seconds{stage, component}
+    (and counts 'rows' into churn_model_stage_rows_total).
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage, component)
+        if rows is not None:
+            stage_rows.inc(stage, component, amount=rows)
+
+
+# --- 5. REQUEST MIDDLEWARE ---
+def route_template(scope) -> str:
+    """
+    The route a request matched, as declared ("/api/images/{image_name}"),
+    or "unmatched": the route's path_format behind the root path and the
+    prefix of the router it was included from. FastAPI versions that
+    flatten included routes already have the prefix in path_format and
+    record no included router.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    included_router = scope.get("fastapi", {}).get("included_router")
+    include_context = getattr(included_router, "include_context", None)
+    prefix = getattr(include_context, "prefix", "")
+    return scope.get("root_path", "") + prefix + getattr(route, "path_format", route.path)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware (added in main.py) that records every HTTP request's
+    latency and status under its route template, so path parameters
+    don't explode the number of series. The time runs until the last
+    body chunk is sent, so streamed responses are measured in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec()
+            route = route_template(scope)
+            http_request_duration.observe(time.perf_counter() - start, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status["code"]))
@@ -0,0 +1,157 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from services.model_service import run_inference, InferenceQueueFull, INFERENCE_WORKERS, INFERENCE_MAX_QUEUE
+
+# --- 1. SETTINGS ---
+# Concurrent single predictions are collected for at most MAX_WAIT_MS
+# (or until MAX_BATCH_SIZE requests are waiting) and scored together.
+MICROBATCH_ENABLED = os.getenv("CHURN_MICROBATCH_ENABLED", "1") == "1"
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("CHURN_MICROBATCH_MAX_WAIT_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("CHURN_MICROBATCH_MAX_SIZE", "64"))
+# Requests that may wait to join a batch; beyond that submit raises
+# InferenceQueueFull (a 503 for that one request). Same capacity as the
+# light inference pool has for jobs.
+MICROBATCH_MAX_QUEUE = int(os.getenv("CHURN_MICROBATCH_MAX_QUEUE", str(INFERENCE_WORKERS + INFERENCE_MAX_QUEUE)))
+
+
+# --- 2. THE MICRO-BATCHER ---
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent requests and hands them to
+    'score_fn' as one list, so N requests cost one vectorized model call.
+
+    'score_fn' is a blocking function that takes a list of items and
+    returns one result per item, in order. It runs on the light
+    inference pool (see model_service.run_inference).
+    """
+
+    def __init__(self, score_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = MICROBATCH_MAX_SIZE,
+                 max_wait_ms: float = MICROBATCH_MAX_WAIT_MS,
+                 max_queue: int = MICROBATCH_MAX_QUEUE):
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max(1, max_queue)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatches: set = set()
+
+        self.batch_sizes: Counter = Counter()
+        self.items_scored = 0
+
+    def _ensure_started(self):
+        """ Starts the collector task on the running event loop (first use). """
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and self._loop is loop and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = loop.create_task(self._collect())
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queues one item and waits for its own result.
+        Raises InferenceQueueFull when max_queue items are already waiting.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise InferenceQueueFull(f"The micro-batch queue is full ({self.max_queue} requests).")
+        return await future
+
+    async def stop(self):
+        """
+        Stops the collector. Called on server shutdown by main.py.
+        Items still waiting to join a batch fail, so nobody waits forever.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            self._fail([self._queue.get_nowait()])
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # Give other requests a few milliseconds to join this batch,
+            # unless there are already enough waiting to fill it.
+            if self.max_wait_s > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                try:
+                    await asyncio.sleep(self.max_wait_s)
+                except asyncio.CancelledError:
+                    self._fail(batch)
+                    raise
+
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Score in the background so the next batch can start
+            # collecting while this one is on the inference pool.
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    @staticmethod
+    def _fail(batch):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("The micro-batcher was stopped."))
+
+    async def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        self.batch_sizes[len(batch)] += 1
+        self.items_scored += len(batch)
+
+        try:
+            results = await run_inference(self.score_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ Batch-size distribution and totals, for the stats endpoint. """
+        batches = sum(self.batch_sizes.values())
+        sizes = sorted(self.batch_sizes)
+
+        # Power-of-two buckets: {"1": n, "2": n, "4": n, ...}, each bucket
+        # counting batches with a size up to (and including) its label.
+        histogram: Dict[str, int] = {}
+        upper = 1
+        for size in sizes:
+            while size > upper:
+                upper *= 2
+            histogram[str(upper)] = histogram.get(str(upper), 0) + self.batch_sizes[size]
+
+        return {
+            "enabled": MICROBATCH_ENABLED,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "max_queue": self.max_queue,
+            "batches": batches,
+            "items": self.items_scored,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "mean_batch_size": (self.items_scored / batches) if batches else 0.0,
+            "max_observed_batch_size": sizes[-1] if sizes else 0,
+            "batch_size_histogram": histogram,
+        }
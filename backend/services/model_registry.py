@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+# --- 1. REGISTRY LAYOUT ---
+# models/registry/
+#     CURRENT                 <- name of the version workers should serve
+#     v0001/
+#         manifest.json       <- file hashes, metrics, data hash, created_at,
+#                                feature layout, training stage hashes
+#         preprocessor.joblib
+#         classifier_rf.joblib
+#         ...
+#         classifier_compiled/  <- the forest's node arrays as .npy files,
+#                                  memory-mapped by every worker (shared pages)
+#     v0002/ ...
+#
+# Before the first registry version exists, the flat files directly in
+# models/ (the original layout) are served as the "legacy" version.
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+REGISTRY_DIR = os.getenv("CHURN_MODEL_REGISTRY_DIR", os.path.join(MODEL_DIR, 'registry'))
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+LEGACY_VERSION = "legacy"
+
+# Model name (as used by model_service.get_model) -> file name.
+MODEL_FILES = {
+    "preprocessor": "preprocessor.joblib",
+    "classifier": "classifier_rf.joblib",
+    "regressor": "regression_linear.joblib",
+    "clusterer": "cluster_kmeans.joblib",
+}
+
+# The classifier exported as a CompiledForest (services/tree_engine.py).
+COMPILED_DIR = "classifier_compiled"
+
+_VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+
+class RegistryError(Exception):
+    """ Raised for an unknown version or a version whose files don't match its manifest. """
+
+
+# --- 2. HASHING ---
+def file_sha256(path: str) -> str:
+    """ SHA-256 of a file's bytes, read in 1 MB blocks. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def combined_fingerprint(file_hashes: Dict[str, str]) -> str:
+    """ One hash for a whole version: SHA-256 over its per-file hashes, in name order. """
+    digest = hashlib.sha256()
+    for name in sorted(file_hashes):
+        digest.update(f"{name}:{file_hashes[name]}\n".encode())
+    return digest.hexdigest()
+
+
+# --- 3. READING ---
+def version_dir(version: str) -> str:
+    if version == LEGACY_VERSION:
+        return MODEL_DIR
+    if not _VERSION_PATTERN.match(version):
+        raise RegistryError(f"Invalid model version '{version}'.")
+    return os.path.join(REGISTRY_DIR, version)
+
+
+def list_versions() -> List[str]:
+    """ Registry versions that have a manifest, oldest first. """
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    versions = [
+        name for name in os.listdir(REGISTRY_DIR)
+        if _VERSION_PATTERN.match(name) and os.path.exists(os.path.join(REGISTRY_DIR, name, MANIFEST_FILE))
+    ]
+    return sorted(versions, key=lambda name: int(name[1:]))
+
+
+def get_current_version() -> str:
+    """ The version named in CURRENT, else the newest version, else "legacy". """
+    try:
+        with open(os.path.join(REGISTRY_DIR, CURRENT_FILE)) as f:
+            version = f.read().strip()
+        if version:
+            return version
+    except OSError:
+        pass
+    versions = list_versions()
+    return versions[-1] if versions else LEGACY_VERSION
+
+
+def read_manifest(version: str) -> Dict[str, Any]:
+    """
+    The manifest of 'version'. For "legacy" one is made up from the flat
+    files (hashes only, no metrics).
+    """
+    directory = version_dir(version)
+    if version == LEGACY_VERSION:
+        files = {name: os.path.join(directory, file_name) for name, file_name in MODEL_FILES.items()}
+        missing = [path for path in files.values() if not os.path.exists(path)]
+        if missing:
+            raise RegistryError(f"No registry versions and legacy model files missing: {missing}")
+        hashes = {name: file_sha256(path) for name, path in files.items()}
+        return {
+            "version": LEGACY_VERSION,
+            "files": {name: {"file": MODEL_FILES[name], "sha256": h} for name, h in hashes.items()},
+            "fingerprint": combined_fingerprint(hashes),
+            "metrics": {},
+        }
+
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RegistryError(f"Model version '{version}' not found.")
+
+
+def resolve_version(version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Manifest of 'version' (default: the current one), with every file
+    checked against its recorded hash and an absolute 'path' added (also
+    to the "compiled" section, if the version has one).
+    Raises RegistryError on unknown versions or mismatching files.
+    """
+    version = version or get_current_version()
+    manifest = read_manifest(version)
+    directory = version_dir(version)
+
+    def check(file_name, expected):
+        path = os.path.join(directory, file_name)
+        if not os.path.exists(path):
+            raise RegistryError(f"Model version '{version}' is missing {file_name}.")
+        if version != LEGACY_VERSION and file_sha256(path) != expected:
+            raise RegistryError(f"Model version '{version}': {file_name} does not match its manifest hash.")
+        return path
+
+    for entry in manifest["files"].values():
+        entry["path"] = check(entry["file"], entry["sha256"])
+    compiled = manifest.get("compiled")
+    if compiled is not None:
+        for file_name, h in compiled["files"].items():
+            check(os.path.join(compiled["dir"], file_name), h)
+        compiled["path"] = os.path.join(directory, compiled["dir"])
+    return manifest
+
+
+# --- 4. WRITING ---
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def set_current_version(version: str):
+    """ Points CURRENT at 'version' (workers watching the registry follow it). """
+    if version != LEGACY_VERSION:
+        read_manifest(version)  # raises if unknown
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    _write_atomic(os.path.join(REGISTRY_DIR, CURRENT_FILE), version + "\n")
+
+
+def export_compiled_classifier(classifier, directory: str) -> Dict[str, Any]:
+    """
+    Writes 'classifier' (a fitted forest) as a CompiledForest into
+    'directory', and returns the manifest's "compiled" section: the file
+    hashes plus what the API otherwise reads from the sklearn object
+    (classes, feature importances), so serving never has to unpickle it.
+    """
+    from services.tree_engine import CompiledForest
+
+    classes = [int(c) for c in classifier.classes_]
+    churn_class_index = classes.index(1)
+    forest = CompiledForest.from_sklearn(classifier, churn_class_index)
+    path = os.path.join(directory, COMPILED_DIR)
+    file_names = forest.save(path)
+    return {
+        "dir": COMPILED_DIR,
+        "files": {name: file_sha256(os.path.join(path, name)) for name in file_names},
+        "classes": classes,
+        "churn_class_index": churn_class_index,
+        "feature_importances": [float(v) for v in classifier.feature_importances_],
+    }
+
+
+def publish_version(fitted_models: Dict[str, Any], metrics: Optional[Dict[str, Any]] = None,
+                    data_hash: Optional[str] = None, make_current: bool = True,
+                    artifacts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Saves fitted models (keys of MODEL_FILES) as the next version, with
+    the classifier also exported for memory-mapping: the files are written
+    into a temporary directory that is renamed into place once the
+    manifest is complete, so a half-written version is never visible.
+    'artifacts' (the training stages' result hashes) is recorded as is.
+    Returns the manifest.
+    """
+    import joblib
+
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    versions = list_versions()
+    version = f"v{(int(versions[-1][1:]) + 1) if versions else 1:04d}"
+    tmp_dir = os.path.join(REGISTRY_DIR, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(tmp_dir)
+
+    hashes = {}
+    for name, model in fitted_models.items():
+        path = os.path.join(tmp_dir, MODEL_FILES[name])
+        joblib.dump(model, path)
+        hashes[name] = file_sha256(path)
+    compiled = export_compiled_classifier(fitted_models["classifier"], tmp_dir) if "classifier" in fitted_models else None
+    features = None
+    if "preprocessor" in fitted_models:
+        from services.model_service import describe_features
+        features = describe_features(fitted_models["preprocessor"])
+
+    manifest = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": {name: {"file": MODEL_FILES[name], "sha256": h} for name, h in hashes.items()},
+        "fingerprint": combined_fingerprint(hashes),
+        "data_hash": data_hash,
+        "metrics": metrics or {},
+    }
+    if compiled is not None:
+        manifest["compiled"] = compiled
+    if features is not None:
+        # Lets a worker transform features without unpickling the preprocessor.
+        manifest["features"] = features
+    if artifacts is not None:
+        manifest["artifacts"] = artifacts
+    _write_atomic(os.path.join(tmp_dir, MANIFEST_FILE), json.dumps(manifest, indent=2) + "\n")
+    os.rename(tmp_dir, os.path.join(REGISTRY_DIR, version))
+
+    if make_current:
+        set_current_version(version)
+    return manifest
@@ -1,69 +1,516 @@
-import joblib
+import asyncio
+import dataclasses
+import functools
+import io
 import os
+import threading
+import time
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Any, List, Callable, Optional, Tuple
 
 # Import our Pydantic schema
-from schemas.customer import CustomerInput
+from schemas.customer import CustomerInput, FeatureImportance
+from services.tree_engine import CompiledForest
+from services import model_registry
+from services.model_registry import RegistryError
+from services.metrics import stage_timer
 
 # --- 1. DEFINE MODEL PATHS ---
-MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
-PREPROCESSOR_PATH = os.path.join(MODEL_DIR, "preprocessor.joblib")
-CLASSIFIER_PATH = os.path.join(MODEL_DIR, "classifier_rf.joblib")
-REGRESSOR_PATH = os.path.join(MODEL_DIR, "regression_linear.joblib")
-CLUSTER_PATH = os.path.join(MODEL_DIR, "cluster_kmeans.joblib")
+# Model files are versioned in models/registry/ (see services/model_registry.py);
+# the flat files in models/ are served until the first version is published.
+MODEL_DIR = model_registry.MODEL_DIR
+
+# Registry versions ship the forest as .npy node arrays. With this on,
+# they are memory-mapped (all workers share one copy through the page
+# cache) and the sklearn forest is only unpickled by a worker that
+# actually calls it (the sklearn inference backend or large batches).
+# Off: every model is unpickled and the forest compiled in each process.
+MODEL_MMAP = os.getenv("CHURN_MODEL_MMAP", "1") == "1"
+
+# Which models load_all_models loads (and warms up) before the API takes
+# traffic; the others are loaded by get_model on first use.
+#   "auto" - all of them, except the sklearn forest when the version ships
+#            a mapped forest and the compiled backend is used
+#   "all"  - all of them
+#   "none" - none: every model loads on first use
+#   or a comma-separated list of MODEL_NAMES.
+# A worker that only serves /api/predict with the compiled backend needs
+# just "classifier_compiled", and then never imports sklearn.
+MODEL_NAMES = ("preprocessor", "classifier", "classifier_compiled", "regressor", "clusterer")
+PRELOAD_MODELS = os.getenv("CHURN_PRELOAD_MODELS", "auto")
+# Run a dummy customer through the preloaded models before going live
+# (initializes sklearn/NumPy internals and catches broken versions).
+MODEL_WARMUP = os.getenv("CHURN_MODEL_WARMUP", "1") == "1"
+
+# Probability above which a customer is flagged as a churner.
+CHURN_THRESHOLD = float(os.getenv("CHURN_DECISION_THRESHOLD", "0.35"))
+
+# Which engine scores the classifier: "sklearn" (RandomForestClassifier.predict_proba)
+# or "compiled" (the flattened node arrays in services/tree_engine.py, same
+# probabilities without sklearn's per-call validation and joblib dispatch).
+INFERENCE_BACKEND = os.getenv("CHURN_INFERENCE_BACKEND", "sklearn")
+# sklearn's Cython traversal wins on large matrices; above this many rows
+# the compiled backend hands the call back to sklearn.
+COMPILED_BACKEND_MAX_ROWS = int(os.getenv("CHURN_COMPILED_BACKEND_MAX_ROWS", "512"))
+
+# How many risk factors /api/predict reports, and how they are computed:
+# "tree_path" = per-customer contributions from the compiled forest,
+# "global"    = the forest's global feature_importances_.
+TOP_RISK_FACTORS = 3
+EXPLANATION_MODE = os.getenv("CHURN_EXPLANATION_MODE", "tree_path")
+# Per-customer latency budget for tree_path explanations (milliseconds).
+EXPLANATION_BUDGET_MS = float(os.getenv("CHURN_EXPLANATION_BUDGET_MS", "3"))
+
+# Batch scoring: rows per preprocess/predict_proba pass, and the hard
+# cap on how many customers a single batch request may contain.
+BATCH_CHUNK_SIZE = int(os.getenv("CHURN_BATCH_CHUNK_SIZE", "10000"))
+MAX_BATCH_SIZE = int(os.getenv("CHURN_MAX_BATCH_SIZE", "100000"))
+
+# What-if sweeps: at most two varying features and this many grid points.
+MAX_SWEEP_AXES = 2
+MAX_SWEEP_POINTS = int(os.getenv("CHURN_MAX_SWEEP_POINTS", "50000"))
+
+# The raw input columns, in the order the API schema declares them.
+INPUT_COLUMNS: List[str] = list(CustomerInput.model_fields.keys())
+NUMERIC_INPUT_COLUMNS = ["SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges"]
+
+# Inference executors (see section 6). Single predictions run on the
+# "light" thread pool; batch scoring and whole-dataset figures run on the
+# "heavy" pool, which can be switched to a process pool.
+INFERENCE_WORKERS = int(os.getenv("CHURN_INFERENCE_WORKERS", "4"))
+HEAVY_INFERENCE_WORKERS = int(os.getenv("CHURN_HEAVY_INFERENCE_WORKERS", "2"))
+HEAVY_INFERENCE_EXECUTOR = os.getenv("CHURN_HEAVY_INFERENCE_EXECUTOR", "thread")  # "thread" or "process"
+INFERENCE_MAX_QUEUE = int(os.getenv("CHURN_INFERENCE_MAX_QUEUE", "64"))
 
 
 # --- 2. CREATE A "CACHE" FOR MODELS ---
+@dataclass(frozen=True)
+class FeatureLayout:
+    """
+    The preprocessor's output column layout, flattened into arrays so a
+    frame can be transformed with plain NumPy (see fast_transform).
+    Only built for the StandardScaler + OneHotEncoder ColumnTransformer
+    that scripts/train_model.py produces.
+    """
+    n_features: int
+    numeric_columns: Tuple[str, ...]
+    numeric_mean: np.ndarray
+    numeric_scale: np.ndarray
+    categorical_columns: Tuple[str, ...]
+    categorical_lookups: Tuple[Dict[Any, int], ...]   # category -> output column index
+
+
+@dataclass(frozen=True)
+class ModelMetadata:
+    """
+    Everything the predict path needs that does not depend on the
+    customer. Built once per model version, then only read.
+    """
+    feature_names: Tuple[str, ...]                 # preprocessor output columns, in order
+    importances: Tuple[Tuple[str, float], ...]     # (feature, importance), highest first
+    top_risk_factors: Tuple[FeatureImportance, ...]
+    threshold: float
+    input_columns: Tuple[str, ...]                 # raw columns the preprocessor expects
+    churn_class_index: int                         # predict_proba column for class 1 (Churn)
+    layout: Optional[FeatureLayout]                # None -> always use preprocessor.transform
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    One loaded model version: the fitted models, the metadata derived
+    from them and the registry manifest. A bundle is never modified; a
+    reload builds a new one next to the active one and swaps it in with
+    a single assignment (see activate_bundle).
+    """
+    version: str
+    models: Dict[str, Any]                         # preprocessor, classifier, regressor, clusterer, classifier_compiled
+    metadata: ModelMetadata
+    fingerprint: str                               # registry hash over the model files
+    manifest: Dict[str, Any]
+    generation: int = 0                            # set when the bundle is activated
+    # Models not loaded yet: name -> loader, called on first get_model
+    # (under that model's lock, so concurrent first calls load it once).
+    deferred: Dict[str, Callable[[], Any]] = dataclasses.field(default_factory=dict)
+    load_locks: Dict[str, threading.Lock] = dataclasses.field(default_factory=dict)
+
+
+# The bundle serving requests, and the one it replaced (kept loaded so a
+# rollback is instant).
+_active: Optional[ModelBundle] = None
+_previous: Optional[ModelBundle] = None
+_swap_lock = threading.Lock()
+
+# Inference jobs pin the bundle that was active when they were submitted
+# (see run_inference), so one request never mixes two model versions.
+_pinned: ContextVar[Optional[ModelBundle]] = ContextVar("pinned_model_bundle", default=None)
+
+# Mirrors of the active bundle for code that reads the module globals.
 models: Dict[str, Any] = {
     "preprocessor": None,
     "classifier": None,
     "regressor": None,
-    "clusterer": None
+    "clusterer": None,
+    "classifier_compiled": None
 }
+model_metadata: Optional[ModelMetadata] = None
+model_version: Optional[str] = None
+
+# Bumped every time a bundle is activated (load, reload or rollback), so
+# in-process caches of model outputs can tell that the models changed.
+model_generation: int = 0
+
+# The registry fingerprint of the active version. Unlike the generation
+# counter it is the same in every process (and across restarts), so it
+# can key caches that are persisted to disk.
+model_fingerprint: Optional[str] = None
 
 
 # --- 3. MODEL LOADING FUNCTION ---
-def load_all_models():
+def load_all_models(version: Optional[str] = None):
     """
-    Loads all ML models from disk into the 'models' dictionary.
-    This is called ONCE on server startup by main.py.
+    Loads a model version (default: the registry's current one) and makes
+    it active. This is called on server startup by main.py.
+    Errors are printed, not raised, so the API still starts without models.
     """
     print("--- 🚀 Loading ML models into memory... ---")
     try:
-        models["preprocessor"] = joblib.load(PREPROCESSOR_PATH)
-        print(f"✅ Loaded preprocessor")
-        
-        models["classifier"] = joblib.load(CLASSIFIER_PATH)
-        print(f"✅ Loaded classifier (Random Forest)")
-        
-        models["regressor"] = joblib.load(REGRESSOR_PATH)
-        print(f"✅ Loaded regressor (Linear)")
-        
-        models["clusterer"] = joblib.load(CLUSTER_PATH)
-        print(f"✅ Loaded clusterer (K-Means)")
-        
-        print("--- ✨ All models loaded successfully! ---")
-        
-    except FileNotFoundError as e:
-        print(f"❌ MODEL LOADING ERROR: File not found. {e}")
-        print("Please make sure your models are in the 'backend/models/' folder.")
+        bundle = activate_bundle(load_model_bundle(version))
+        print(f"--- ✨ All models loaded successfully! (version {bundle.version}) ---")
+
+    except (FileNotFoundError, RegistryError) as e:
+        print(f"❌ MODEL LOADING ERROR: {e}")
+        print("Please make sure your models are in the 'backend/models/' folder "
+              "(or run scripts/train_model.py).")
     except Exception as e:
         print(f"❌ An unknown error occurred during model loading: {e}")
 
 
+def load_model_bundle(version: Optional[str] = None) -> ModelBundle:
+    """
+    Loads one model version without activating it: checks the files
+    against the manifest, builds the metadata, loads the PRELOAD_MODELS
+    and warms them up with a dummy prediction. The other models are
+    only loaded when get_model first asks for them.
+    Raises RegistryError (or the loading error) if anything is wrong.
+    """
+    manifest = model_registry.resolve_version(version)
+    compiled = manifest.get("compiled") if MODEL_MMAP else None
+    loaders = {
+        name: functools.partial(_unpickle, entry.pop("path"))
+        for name, entry in manifest["files"].items()
+    }
+    loaded = {}
+
+    # The metadata comes from the manifest when the version exported it,
+    # otherwise from the preprocessor and the sklearn forest themselves.
+    features = manifest.get("features")
+    if features is None:
+        loaded["preprocessor"] = _timed_load("preprocessor", loaders["preprocessor"], manifest["version"])
+        features = describe_features(loaded["preprocessor"])
+    if compiled is not None:
+        importances, classes = compiled["feature_importances"], compiled["classes"]
+        loaders["classifier_compiled"] = functools.partial(CompiledForest.load, compiled.pop("path"), mmap_mode='r')
+    else:
+        loaded["classifier"] = _timed_load("classifier", loaders["classifier"], manifest["version"])
+        importances, classes = loaded["classifier"].feature_importances_, loaded["classifier"].classes_
+        loaders["classifier_compiled"] = lambda: CompiledForest.from_sklearn(
+            get_model("classifier"), get_model_metadata().churn_class_index
+        )
+    metadata = build_model_metadata(features, importances, classes)
+
+    deferred = {name: loader for name, loader in loaders.items() if name not in loaded}
+    bundle = ModelBundle(
+        version=manifest["version"],
+        models=loaded,
+        metadata=metadata,
+        fingerprint=manifest["fingerprint"],
+        manifest=manifest,
+        deferred=deferred,
+        load_locks={name: threading.Lock() for name in deferred},
+    )
+    for name in preload_names(mapped_forest=compiled is not None):
+        if name not in bundle.models:
+            _load_deferred(bundle, name, first_use=False)
+    print(f"✅ Built model metadata ({len(bundle.models)} of {len(MODEL_NAMES)} models loaded, "
+          f"inference backend: {INFERENCE_BACKEND})")
+
+    if MODEL_WARMUP:
+        warm_up_bundle(bundle)
+        print(f"✅ Warmed up model version {bundle.version}")
+    return bundle
+
+
+def preload_names(mapped_forest: bool) -> List[str]:
+    """ The models to load up front, from PRELOAD_MODELS. """
+    setting = PRELOAD_MODELS.strip().lower()
+    if setting == "all":
+        return list(MODEL_NAMES)
+    if setting in ("none", ""):
+        return []
+    if setting == "auto":
+        skip_forest = mapped_forest and INFERENCE_BACKEND == "compiled"
+        return [name for name in MODEL_NAMES if not (skip_forest and name == "classifier")]
+    names = [name.strip() for name in setting.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(MODEL_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown model(s) in CHURN_PRELOAD_MODELS: {', '.join(unknown)}. "
+                         f"Available: {', '.join(MODEL_NAMES)}")
+    return names
+
+
+def _unpickle(path: str) -> Any:
+    # joblib (and the sklearn modules a pickle needs) are imported only
+    # when a model is actually loaded.
+    import joblib
+    return joblib.load(path)
+
+
+def _timed_load(name: str, loader: Callable[[], Any], version: str, note: str = "") -> Any:
+    start = time.perf_counter()
+    model = loader()
+    print(f"✅ Loaded {name} ({version}){note} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return model
+
+
+def activate_bundle(bundle: ModelBundle) -> ModelBundle:
+    """
+    Atomically makes 'bundle' the one serving requests. Jobs already
+    running finish on the bundle they pinned. Returns the activated bundle.
+    """
+    global _active, _previous, models, model_metadata, model_version, model_generation, model_fingerprint
+
+    with _swap_lock:
+        model_generation += 1
+        bundle = dataclasses.replace(bundle, generation=model_generation)
+        if _active is not None and _active.version != bundle.version:
+            _previous = _active
+        _active = bundle
+        models = bundle.models
+        model_metadata = bundle.metadata
+        model_version = bundle.version
+        model_fingerprint = bundle.fingerprint
+    return bundle
+
+
+def swap_in_bundle(bundle: ModelBundle) -> ModelBundle:
+    """
+    activate_bundle for the serving process (reload and rollback): with
+    the process heavy executor, its workers hold their own copy of the
+    models, so they are replaced by workers that load the new version.
+    """
+    bundle = activate_bundle(bundle)
+    if HEAVY_INFERENCE_EXECUTOR == "process" and "heavy" in _executors:
+        old_pool = _executors["heavy"]
+        _executors["heavy"] = _new_process_pool(bundle.version)
+        old_pool.shutdown(wait=False)
+    return bundle
+
+
+def rollback_models() -> ModelBundle:
+    """
+    Swaps the previously active version back in (it is still loaded).
+    Raises RegistryError if there is nothing to roll back to.
+    """
+    if _previous is None:
+        raise RegistryError("No previous model version to roll back to.")
+    return swap_in_bundle(_previous)
+
+
+def warm_up_bundle(bundle: ModelBundle):
+    """
+    Runs one dummy customer through every model 'bundle' has loaded
+    (with the bundle pinned), so lazy sklearn/NumPy state is initialized
+    before the bundle takes traffic, and a broken version fails here
+    instead of on a request. Models that are not loaded yet are not
+    touched. Raises on any error or a non-finite prediction.
+    """
+    loaded = dict(bundle.models)
+    layout = bundle.metadata.layout
+    if layout is None and "preprocessor" not in loaded:
+        return
+
+    token = _pinned.set(bundle)
+    try:
+        row = {column: 0.0 for column in NUMERIC_INPUT_COLUMNS}
+        if layout is not None:
+            for column, lookup in zip(layout.categorical_columns, layout.categorical_lookups):
+                row[column] = next(iter(lookup))
+        else:
+            for name, transformer, columns in loaded["preprocessor"].transformers_:
+                for column, categories in zip(columns, getattr(transformer, "categories_", [])):
+                    row[column] = categories[0]
+        frame = pd.DataFrame([row])
+
+        features = transform_features(frame)
+        probabilities = []
+        if "classifier" in loaded:
+            probabilities.append(loaded["classifier"].predict_proba(features)[:, bundle.metadata.churn_class_index])
+        if "classifier_compiled" in loaded:
+            probabilities.append(loaded["classifier_compiled"].predict_proba(features))
+            explain_features(features)
+        if "regressor" in loaded:
+            loaded["regressor"].predict(features)
+        if "clusterer" in loaded:
+            loaded["clusterer"].predict(frame[['tenure', 'MonthlyCharges']])
+        if probabilities and not np.all(np.isfinite(np.concatenate(probabilities))):
+            raise RegistryError(f"Model version '{bundle.version}' returned a non-finite probability.")
+    finally:
+        _pinned.reset(token)
+
+
+def describe_features(preprocessor) -> Dict[str, Any]:
+    """
+    The preprocessor's input columns, output columns and (if it has one)
+    FeatureLayout as plain JSON values. Stored in registry manifests, so
+    a worker can transform features without unpickling the preprocessor.
+    """
+    layout = build_feature_layout(preprocessor)
+    plain = lambda value: value.item() if isinstance(value, np.generic) else value
+    return {
+        "feature_names": [str(name) for name in preprocessor.get_feature_names_out()],
+        "input_columns": [str(c) for c in getattr(preprocessor, "feature_names_in_", INPUT_COLUMNS)],
+        "layout": None if layout is None else {
+            "numeric_columns": list(layout.numeric_columns),
+            "numeric_mean": layout.numeric_mean.tolist(),
+            "numeric_scale": layout.numeric_scale.tolist(),
+            "categorical_columns": list(layout.categorical_columns),
+            "categories": [[plain(category) for category in lookup] for lookup in layout.categorical_lookups],
+        },
+    }
+
+
+def feature_layout_from_dict(layout: Dict[str, Any]) -> FeatureLayout:
+    """ Rebuilds the FeatureLayout that describe_features stored. """
+    lookups = []
+    offset = len(layout["numeric_columns"])
+    for categories in layout["categories"]:
+        lookups.append({category: offset + i for i, category in enumerate(categories)})
+        offset += len(categories)
+    return FeatureLayout(
+        n_features=offset,
+        numeric_columns=tuple(layout["numeric_columns"]),
+        numeric_mean=np.asarray(layout["numeric_mean"], dtype=np.float64),
+        numeric_scale=np.asarray(layout["numeric_scale"], dtype=np.float64),
+        categorical_columns=tuple(layout["categorical_columns"]),
+        categorical_lookups=tuple(lookups),
+    )
+
+
+def build_model_metadata(features: Dict[str, Any], feature_importances, classes) -> ModelMetadata:
+    """
+    Precomputes feature names, sorted importances and the output layout
+    from the preprocessor's describe_features() and the classifier's
+    feature_importances_ and classes_.
+    """
+    feature_names = tuple(features["feature_names"])
+    importances = np.asarray(feature_importances, dtype=float)
+    order = np.argsort(-importances, kind="stable")
+    sorted_importances = tuple((feature_names[i], float(importances[i])) for i in order)
+
+    return ModelMetadata(
+        feature_names=feature_names,
+        importances=sorted_importances,
+        top_risk_factors=tuple(
+            FeatureImportance(feature=name, importance=importance)
+            for name, importance in sorted_importances[:TOP_RISK_FACTORS]
+        ),
+        threshold=CHURN_THRESHOLD,
+        input_columns=tuple(features["input_columns"]),
+        churn_class_index=int(list(classes).index(1)),
+        layout=feature_layout_from_dict(features["layout"]) if features["layout"] is not None else None,
+    )
+
+
+def build_feature_layout(preprocessor) -> Optional[FeatureLayout]:
+    """
+    Reads the fitted scaler statistics and one-hot categories out of the
+    preprocessor. Returns None for any other preprocessor structure, in
+    which case transform_features falls back to preprocessor.transform.
+    """
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+    fitted = [(name, t, cols) for name, t, cols in preprocessor.transformers_ if name != "remainder"]
+    remainder = [t for name, t, _ in preprocessor.transformers_ if name == "remainder"]
+    if (len(fitted) != 2 or (remainder and remainder[0] != "drop")
+            or not isinstance(fitted[0][1], StandardScaler)
+            or not isinstance(fitted[1][1], OneHotEncoder)):
+        return None
+
+    _, scaler, numeric_columns = fitted[0]
+    _, encoder, categorical_columns = fitted[1]
+    if (encoder.handle_unknown != "ignore" or encoder.drop is not None
+            or getattr(encoder, "min_frequency", None) is not None
+            or getattr(encoder, "max_categories", None) is not None):
+        return None
+
+    n_numeric = len(numeric_columns)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_numeric)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_numeric)
+
+    lookups = []
+    offset = n_numeric
+    for categories in encoder.categories_:
+        lookups.append({category: offset + i for i, category in enumerate(categories)})
+        offset += len(categories)
+
+    layout = FeatureLayout(
+        n_features=offset,
+        numeric_columns=tuple(numeric_columns),
+        numeric_mean=np.asarray(mean, dtype=np.float64),
+        numeric_scale=np.asarray(scale, dtype=np.float64),
+        categorical_columns=tuple(categorical_columns),
+        categorical_lookups=tuple(lookups),
+    )
+    if layout.n_features != len(preprocessor.get_feature_names_out()):
+        return None
+    return layout
+
+
 # --- 4. HELPER FUNCTIONS ---
 
+def current_bundle() -> Optional[ModelBundle]:
+    """ The bundle pinned by the running inference job, else the active one. """
+    return _pinned.get() or _active
+
+def get_model_metadata() -> ModelMetadata:
+    """ Returns the metadata built at load time. """
+    bundle = current_bundle()
+    if bundle is None:
+        raise RuntimeError("Model metadata is not available (models not loaded).")
+    return bundle.metadata
+
 def get_model(name: str) -> Any:
     """
     A simple helper to safely get a loaded model from the cache.
     """
-    model = models.get(name)
+    bundle = current_bundle()
+    model = bundle.models.get(name) if bundle is not None else None
+    if model is None and bundle is not None and name in bundle.deferred:
+        model = _load_deferred(bundle, name)
     if model is None:
         print(f"Error: Model '{name}' is not loaded.")
         raise RuntimeError(f"Model '{name}' is not loaded.")
     return model
 
+def _load_deferred(bundle: ModelBundle, name: str, first_use: bool = True) -> Any:
+    """ Loads a model the bundle has not loaded yet (once per process). """
+    with bundle.load_locks[name]:
+        model = bundle.models.get(name)
+        if model is None:
+            token = _pinned.set(bundle)
+            try:
+                model = _timed_load(name, bundle.deferred[name], bundle.version,
+                                    " on first use" if first_use else "")
+            finally:
+                _pinned.reset(token)
+            bundle.models[name] = model
+    return model
+
 def preprocess_input(input_data: CustomerInput) -> pd.DataFrame:
     """
     Takes raw CustomerInput data from the API, converts it to a DataFrame,
@@ -82,4 +529,391 @@ def preprocess_input(input_data: CustomerInput) -> pd.DataFrame:
 
     processed_df = pd.DataFrame(processed_data, columns=feature_names)
     
-    return processed_df
\ No newline at end of file
+    return processed_df
+
+
+# --- 5. BATCH SCORING HELPERS ---
+
+def customers_to_frame(customers: List[CustomerInput]) -> pd.DataFrame:
+    """
+    Builds one DataFrame for a list of CustomerInput objects.
+    The frame is built column by column, which is much cheaper than
+    creating one dict (and one DataFrame row) per customer.
+    """
+    columns = {
+        column: [getattr(customer, column) for customer in customers]
+        for column in INPUT_COLUMNS
+    }
+    return pd.DataFrame(columns, columns=INPUT_COLUMNS)
+
+
+def read_customers_csv(raw: bytes) -> pd.DataFrame:
+    """
+    Parses an uploaded CSV file into a DataFrame of model inputs.
+    Extra columns (customerID, Churn, ...) are ignored.
+    Raises ValueError if a required column is missing or a numeric value is invalid.
+    """
+    df = pd.read_csv(io.BytesIO(raw))
+
+    missing = [column for column in INPUT_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    df = df[INPUT_COLUMNS].copy()
+    for column in NUMERIC_INPUT_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    bad_rows = np.flatnonzero(df[NUMERIC_INPUT_COLUMNS].isna().any(axis=1).to_numpy())
+    if len(bad_rows) > 0:
+        preview = ", ".join(str(row + 1) for row in bad_rows[:10])
+        raise ValueError(f"CSV has {len(bad_rows)} row(s) with invalid numeric values (rows: {preview})")
+
+    return df
+
+
+def fast_transform(input_df: pd.DataFrame, layout: FeatureLayout,
+                   base_row: Optional[np.ndarray] = None,
+                   columns: Optional[List[str]] = None) -> np.ndarray:
+    """
+    NumPy equivalent of preprocessor.transform for the standard layout:
+    scale the numeric columns, then set one 1.0 per categorical column
+    (unknown categories stay all-zero, like handle_unknown='ignore').
+    Skips ColumnTransformer's per-call validation, which dominates the
+    cost of transforming a single row.
+
+    With 'base_row' (one already-transformed row) and 'columns', every
+    row starts as a copy of 'base_row' and only 'columns' are transformed;
+    used for what-if grids, where all other columns are constant.
+    """
+    n_rows = len(input_df)
+    if base_row is None:
+        out = np.zeros((n_rows, layout.n_features), dtype=np.float64)
+        columns = None
+    else:
+        out = np.repeat(np.asarray(base_row, dtype=np.float64).reshape(1, -1), n_rows, axis=0)
+
+    numeric_idx = [i for i, column in enumerate(layout.numeric_columns)
+                   if columns is None or column in columns]
+    if numeric_idx:
+        numeric = input_df[[layout.numeric_columns[i] for i in numeric_idx]].to_numpy(dtype=np.float64)
+        out[:, numeric_idx] = (numeric - layout.numeric_mean[numeric_idx]) / layout.numeric_scale[numeric_idx]
+
+    rows = np.arange(n_rows)
+    for column, lookup in zip(layout.categorical_columns, layout.categorical_lookups):
+        if columns is not None:
+            if column not in columns:
+                continue
+            out[:, list(lookup.values())] = 0.0
+        get = lookup.get
+        codes = np.fromiter((get(value, -1) for value in input_df[column].to_numpy()),
+                            dtype=np.intp, count=n_rows)
+        known = codes >= 0
+        out[rows[known], codes[known]] = 1.0
+
+    return out
+
+
+def transform_features(input_df: pd.DataFrame) -> np.ndarray:
+    """
+    Runs the preprocessor over a whole frame and returns a dense
+    feature matrix that can be passed straight to the classifier.
+    """
+    bundle = current_bundle()
+    if bundle is not None and bundle.metadata.layout is not None:
+        with stage_timer("preprocess", "layout", rows=len(input_df)):
+            return fast_transform(input_df, bundle.metadata.layout)
+
+    preprocessor = get_model("preprocessor")
+    with stage_timer("preprocess", "preprocessor", rows=len(input_df)):
+        processed = preprocessor.transform(input_df)
+        if hasattr(processed, "toarray"):
+            processed = processed.toarray()
+        return np.asarray(processed)
+
+
+def predict_proba_features(features: np.ndarray) -> np.ndarray:
+    """
+    Churn probability (class 1) for each row of a transformed feature matrix,
+    using the engine selected by INFERENCE_BACKEND.
+    """
+    if INFERENCE_BACKEND == "compiled" and len(features) <= COMPILED_BACKEND_MAX_ROWS:
+        compiled = get_model("classifier_compiled")
+        with stage_timer("inference", "classifier_compiled", rows=len(features)):
+            return compiled.predict_proba(features)
+
+    classifier = get_model("classifier")
+    with stage_timer("inference", "classifier", rows=len(features)):
+        return classifier.predict_proba(features)[:, get_model_metadata().churn_class_index]
+
+
+def predict_proba_batch(input_df: pd.DataFrame, chunk_size: int = BATCH_CHUNK_SIZE) -> np.ndarray:
+    """
+    Scores every row of 'input_df' and returns the churn probability
+    (class 1) for each one.
+    Each chunk costs one preprocessor.transform and one predict_proba call.
+    """
+    probabilities = np.empty(len(input_df), dtype=np.float64)
+    for start in range(0, len(input_df), chunk_size):
+        chunk = input_df.iloc[start:start + chunk_size]
+        probabilities[start:start + len(chunk)] = predict_proba_features(transform_features(chunk))
+
+    return probabilities
+
+
+# --- 5b. WHAT-IF SWEEPS ---
+
+def resolve_sweep_values(feature: str, values=None, start=None, stop=None, num: int = 50) -> list:
+    """
+    Turns one sweep axis into its list of values.
+    Numeric features take explicit values or a start/stop/num range;
+    text features take a list of categories, defaulting to every category
+    the preprocessor was fitted on.
+    Raises ValueError for anything that cannot be swept.
+    """
+    if feature not in INPUT_COLUMNS:
+        raise ValueError(f"Unknown feature '{feature}'.")
+
+    if feature in NUMERIC_INPUT_COLUMNS:
+        if values is not None:
+            try:
+                return [float(v) for v in values]
+            except (TypeError, ValueError):
+                raise ValueError(f"'{feature}' is numeric; all sweep values must be numbers.")
+        if start is None or stop is None:
+            raise ValueError(f"'{feature}' needs either 'values' or 'start' and 'stop'.")
+        if num < 1:
+            raise ValueError("'num' must be at least 1.")
+        return np.linspace(start, stop, num).tolist()
+
+    if values is not None:
+        return [str(v) for v in values]
+
+    layout = get_model_metadata().layout
+    if layout is None or feature not in layout.categorical_columns:
+        raise ValueError(f"'{feature}' needs an explicit list of categories.")
+    lookup = layout.categorical_lookups[layout.categorical_columns.index(feature)]
+    return [str(category) for category in lookup]
+
+
+def build_sweep_frame(base: CustomerInput, axes: List[Tuple[str, list]],
+                      derive_total_charges: bool = False) -> pd.DataFrame:
+    """
+    Builds the full grid (every combination of the axis values, last
+    axis varying fastest) as one DataFrame, with every other column
+    fixed to the base customer's value.
+    """
+    grids = np.meshgrid(*[np.asarray(values, dtype=object) for _, values in axes], indexing='ij')
+    n_points = grids[0].size
+
+    frame = pd.DataFrame(base.model_dump(), index=pd.RangeIndex(n_points), columns=INPUT_COLUMNS)
+    for (feature, _), grid in zip(axes, grids):
+        column = grid.ravel()
+        frame[feature] = column.astype(np.float64) if feature in NUMERIC_INPUT_COLUMNS else column
+
+    if derive_total_charges:
+        frame["TotalCharges"] = frame["tenure"] * frame["MonthlyCharges"]
+    return frame
+
+
+def predict_proba_grid(input_df: pd.DataFrame, varying_columns: List[str]) -> np.ndarray:
+    """
+    Scores a what-if grid. Grid rows only differ in 'varying_columns':
+    the base row is transformed once and only those columns are
+    transformed per row. Many rows also fall between the same pair of
+    split thresholds in every tree; only one row per distinct set of
+    split intervals is actually scored, and its probability is copied
+    to the others.
+    """
+    layout = get_model_metadata().layout
+    if layout is not None:
+        base_row = fast_transform(input_df.iloc[:1], layout)[0]
+        features = fast_transform(input_df, layout, base_row=base_row, columns=varying_columns)
+    else:
+        features = transform_features(input_df)
+    codes = get_model("classifier_compiled").split_codes(features)
+    if codes.shape[1] == 0:
+        return np.repeat(predict_proba_features(features[:1]), len(features))
+
+    _, first_rows, inverse = np.unique(codes, axis=0, return_index=True, return_inverse=True)
+    return predict_proba_features(features[first_rows])[inverse.ravel()]
+
+
+def run_sweep(base: CustomerInput, axis_specs: list, derive_total_charges: bool = False):
+    """
+    Resolves the axes, builds the grid and scores it in one vectorized pass.
+    'axis_specs' are SweepAxis-like objects (feature, values, start, stop, num).
+    Returns ([(feature, values), ...], shape, probabilities).
+    """
+    if not 1 <= len(axis_specs) <= MAX_SWEEP_AXES:
+        raise ValueError(f"A sweep needs 1 to {MAX_SWEEP_AXES} axes.")
+    features = [spec.feature for spec in axis_specs]
+    if len(set(features)) != len(features):
+        raise ValueError("Each feature can only be swept once.")
+
+    axes = [
+        (spec.feature, resolve_sweep_values(spec.feature, spec.values, spec.start, spec.stop, spec.num))
+        for spec in axis_specs
+    ]
+    shape = [len(values) for _, values in axes]
+    if any(size == 0 for size in shape):
+        raise ValueError("Every axis needs at least one value.")
+    if int(np.prod(shape)) > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep grid too large: {int(np.prod(shape))} points (max {MAX_SWEEP_POINTS}).")
+
+    frame = build_sweep_frame(base, axes, derive_total_charges)
+    varying_columns = features + (["TotalCharges"] if derive_total_charges else [])
+    return axes, shape, predict_proba_grid(frame, varying_columns)
+
+
+# --- 5c. PER-CUSTOMER EXPLANATIONS ---
+
+explanation_stats: Dict[str, float] = {
+    "batches": 0,
+    "customers": 0,
+    "over_budget_batches": 0,
+    "max_ms_per_customer": 0.0,
+}
+
+
+def explain_features(features: np.ndarray, top_k: int = TOP_RISK_FACTORS) -> List[List[FeatureImportance]]:
+    """
+    Returns, for each row of a transformed feature matrix, the 'top_k'
+    features that pushed its churn probability up the most, with their
+    tree-path contribution (in probability points) as the importance.
+    Falls back to the global importances when EXPLANATION_MODE is "global".
+    """
+    metadata = get_model_metadata()
+    if EXPLANATION_MODE != "tree_path":
+        return [list(metadata.top_risk_factors)] * len(features)
+
+    compiled = get_model("classifier_compiled")
+    start = time.perf_counter()
+    with stage_timer("explain", "classifier_compiled", rows=len(features)):
+        _, contributions = compiled.contributions(features)
+
+    k = min(top_k, contributions.shape[1])
+    top = np.argpartition(-contributions, k - 1, axis=1)[:, :k]
+    top_values = np.take_along_axis(contributions, top, axis=1)
+    order = np.argsort(-top_values, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_values = np.take_along_axis(top_values, order, axis=1)
+
+    names = metadata.feature_names
+    explanations = [
+        [FeatureImportance(feature=names[i], importance=float(v)) for i, v in zip(row_idx, row_val)]
+        for row_idx, row_val in zip(top.tolist(), top_values.tolist())
+    ]
+
+    ms_per_customer = (time.perf_counter() - start) * 1000.0 / max(len(features), 1)
+    explanation_stats["batches"] += 1
+    explanation_stats["customers"] += len(features)
+    explanation_stats["max_ms_per_customer"] = max(explanation_stats["max_ms_per_customer"], ms_per_customer)
+    if ms_per_customer > EXPLANATION_BUDGET_MS:
+        explanation_stats["over_budget_batches"] += 1
+
+    return explanations
+
+
+
+# --- 6. INFERENCE EXECUTOR ---
+
+class InferenceQueueFull(Exception):
+    """ Raised when an inference pool already has too much work queued. """
+
+
+_executors: Dict[str, Executor] = {}
+_executor_workers: Dict[str, int] = {}
+_in_flight: Dict[str, int] = {"light": 0, "heavy": 0}
+
+
+def start_inference_executors():
+    """
+    Creates the light and heavy inference pools.
+    Called on server startup by main.py (and lazily by run_inference).
+    """
+    if _executors:
+        return
+
+    _executors["light"] = ThreadPoolExecutor(
+        max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+    )
+    _executor_workers["light"] = INFERENCE_WORKERS
+
+    if HEAVY_INFERENCE_EXECUTOR == "process":
+        # Each worker process loads its own copy of the models.
+        _executors["heavy"] = _new_process_pool(model_version)
+    else:
+        _executors["heavy"] = ThreadPoolExecutor(
+            max_workers=HEAVY_INFERENCE_WORKERS, thread_name_prefix="inference-heavy"
+        )
+    _executor_workers["heavy"] = HEAVY_INFERENCE_WORKERS
+    print(f"✅ Inference executors ready (light: {INFERENCE_WORKERS} threads, "
+          f"heavy: {HEAVY_INFERENCE_WORKERS} {HEAVY_INFERENCE_EXECUTOR} workers)")
+
+
+def _new_process_pool(version: Optional[str]) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=HEAVY_INFERENCE_WORKERS, initializer=_init_process_worker, initargs=(version,)
+    )
+
+
+def _init_process_worker(version: Optional[str]):
+    """
+    Initializer of the heavy process workers. A forked worker inherits the
+    parent's executors (and their queue counts); they belong to the
+    parent, so they are dropped before the models are loaded.
+    """
+    _executors.clear()
+    _executor_workers.clear()
+    for pool in _in_flight:
+        _in_flight[pool] = 0
+    load_all_models(version)
+
+
+def shutdown_inference_executors():
+    """ Stops the inference pools. Called on server shutdown by main.py. """
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
+    _executor_workers.clear()
+
+
+def get_queue_depth(pool: str = "light") -> int:
+    """ Number of jobs submitted to 'pool' that have not finished yet. """
+    return _in_flight[pool]
+
+
+async def run_inference(fn: Callable, *args, heavy: bool = False) -> Any:
+    """
+    Runs a blocking model call on an inference pool and awaits its result,
+    so the event loop stays free for other requests.
+    Raises InferenceQueueFull when the pool's queue is already full.
+    With the process pool, 'fn' and its arguments must be picklable.
+    """
+    if not _executors:
+        start_inference_executors()
+
+    pool = "heavy" if heavy else "light"
+    capacity = _executor_workers[pool] + INFERENCE_MAX_QUEUE
+    if _in_flight[pool] >= capacity:
+        raise InferenceQueueFull(f"The {pool} inference queue is full ({capacity} jobs).")
+
+    call = functools.partial(fn, *args)
+    if not (heavy and HEAVY_INFERENCE_EXECUTOR == "process"):
+        # Threads share the bundles: pin the one active right now for the whole job.
+        call = functools.partial(_run_pinned, current_bundle(), call)
+
+    _in_flight[pool] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executors[pool], call)
+    finally:
+        _in_flight[pool] -= 1
+
+
+def _run_pinned(bundle: Optional[ModelBundle], call: Callable) -> Any:
+    token = _pinned.set(bundle)
+    try:
+        return call()
+    finally:
+        _pinned.reset(token)
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from services import model_service
+
+# --- 1. SETTINGS ---
+PREDICTION_CACHE_ENABLED = os.getenv("CHURN_PREDICTION_CACHE_ENABLED", "1") == "1"
+PREDICTION_CACHE_SIZE = int(os.getenv("CHURN_PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL_S = float(os.getenv("CHURN_PREDICTION_CACHE_TTL_S", "600"))
+# Float inputs (tenure, charges) are rounded to this many decimals before
+# keying, so slider values that only differ by float noise share an entry.
+PREDICTION_CACHE_FLOAT_DECIMALS = int(os.getenv("CHURN_PREDICTION_CACHE_FLOAT_DECIMALS", "2"))
+
+
+# --- 2. THE CACHE ---
+class PredictionCache:
+    """
+    A bounded LRU cache with a per-entry TTL for risk-profile responses.
+
+    Entries belong to one model generation: as soon as
+    model_service.load_all_models() loads new models, the whole cache is
+    dropped on the next access.
+    """
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE,
+                 ttl_s: float = PREDICTION_CACHE_TTL_S,
+                 float_decimals: int = PREDICTION_CACHE_FLOAT_DECIMALS):
+        self.max_size = max(0, max_size)
+        self.ttl_s = ttl_s
+        self.float_decimals = float_decimals
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = model_service.model_generation
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, input_data) -> tuple:
+        """ Canonical, hashable form of a CustomerInput (floats quantized). """
+        key = []
+        for name, value in input_data:
+            if isinstance(value, float):
+                value = round(value, self.float_decimals) + 0.0  # + 0.0 folds -0.0 into 0.0
+            key.append((name, value))
+        return tuple(key)
+
+    def _check_generation(self):
+        if self._generation != model_service.model_generation:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._generation = model_service.model_generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """ Returns the cached value for 'key', or None on a miss. """
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        Stores 'value' under 'key', evicting the least recently used entries.
+        'generation' is the model generation the value was computed with;
+        values computed by models that have since been replaced are dropped.
+        """
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": PREDICTION_CACHE_ENABLED,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_s": self.ttl_s,
+            "float_decimals": self.float_decimals,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
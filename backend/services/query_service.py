@@ -0,0 +1,193 @@
+import base64
+import re
+from collections import OrderedDict
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote_plus
+
+import numpy as np
+import pandas as pd
+
+from services.serialization import json_column
+
+# --- 1. SETTINGS ---
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+NDJSON_CHUNK_ROWS = 5000
+FILTER_CACHE_SIZE = 64
+
+# Query parameters that control paging/output rather than filter rows.
+RESERVED_PARAMS = {"offset", "limit", "cursor", "fields", "format"}
+
+# format=rows|columns returns one page; ndjson|arrow export every match.
+OUTPUT_FORMATS = ("rows", "columns", "ndjson", "arrow")
+
+# 'tenure<12', 'tenure<=12', 'Contract=Month-to-month', 'gender!=Male', ...
+_FILTER_PATTERN = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)\s*(<=|>=|!=|<|>|=)(.*)$")
+
+
+class QueryError(ValueError):
+    """ Raised for a malformed filter, unknown column or bad cursor. """
+
+
+class RowFilter(NamedTuple):
+    column: str
+    op: str
+    value: str
+
+
+# --- 2. PARSING ---
+def parse_query_string(query: str) -> Tuple[dict, Tuple[RowFilter, ...]]:
+    """
+    Splits a raw query string into paging/output parameters and filter
+    predicates. The raw string is needed because 'tenure<12' is not a
+    key=value pair and would be lost by normal query parsing.
+    """
+    params, filters = {}, []
+    for part in query.split("&"):
+        if not part:
+            continue
+        decoded = unquote_plus(part)
+        key = decoded.split("=", 1)[0]
+        if key in RESERVED_PARAMS and "=" in decoded:
+            params[key] = decoded.split("=", 1)[1]
+            continue
+        match = _FILTER_PATTERN.match(decoded)
+        if match is None:
+            raise QueryError(f"Could not parse filter '{decoded}'.")
+        column, op, value = match.groups()
+        filters.append(RowFilter(column, op, value.strip()))
+    return params, tuple(filters)
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise QueryError("Invalid cursor.")
+
+
+# --- 3. THE ENGINE ---
+class RowQueryEngine:
+    """
+    Filters, pages and projects rows of the cleaned explorer frame.
+
+    Filters become vectorized boolean masks over whole columns; the row
+    positions matching each distinct filter set are memoized (LRU), so
+    paging through a result only slices an index array.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df.reset_index(drop=True)
+        self.columns = list(self.df.columns)
+        self._positions: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+    def resolve_fields(self, fields: Optional[str]) -> List[str]:
+        if not fields:
+            return self.columns
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in self.columns]
+        if unknown:
+            raise QueryError(f"Unknown field(s): {', '.join(unknown)}")
+        return selected
+
+    def _mask(self, row_filter: RowFilter) -> np.ndarray:
+        column, op, raw = row_filter
+        if column not in self.columns:
+            raise QueryError(f"Unknown filter column '{column}'.")
+        series = self.df[column]
+
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy()
+            try:
+                targets = [float(v) for v in raw.split(",")]
+            except ValueError:
+                raise QueryError(f"'{column}' is numeric; '{raw}' is not a number.")
+            if op in ("=", "!="):
+                mask = np.isin(values, targets)
+                return mask if op == "=" else ~mask
+            if len(targets) != 1:
+                raise QueryError(f"'{op}' takes a single value.")
+            target = targets[0]
+            return {
+                "<": values < target, "<=": values <= target,
+                ">": values > target, ">=": values >= target,
+            }[op]
+
+        if op not in ("=", "!="):
+            raise QueryError(f"'{column}' is a text column; only = and != are supported.")
+        mask = series.isin(raw.split(",")).to_numpy()
+        return mask if op == "=" else ~mask
+
+    def matching_positions(self, filters: Tuple[RowFilter, ...]) -> np.ndarray:
+        """ Row positions that satisfy every filter (memoized per filter set). """
+        key = tuple(sorted(filters))
+        positions = self._positions.get(key)
+        if positions is not None:
+            self._positions.move_to_end(key)
+            return positions
+
+        mask = np.ones(len(self.df), dtype=bool)
+        for row_filter in filters:
+            mask &= self._mask(row_filter)
+        positions = np.flatnonzero(mask)
+
+        self._positions[key] = positions
+        while len(self._positions) > FILTER_CACHE_SIZE:
+            self._positions.popitem(last=False)
+        return positions
+
+    def page(self, filters, fields: List[str], offset: int, limit: int,
+             layout: str = "rows") -> dict:
+        """
+        One page of matching rows, with the cursor of the next page.
+        layout="columns" returns {"columns": {field: [...]}} instead of
+        {"rows": [{...}, ...]}; numeric columns stay NumPy arrays, for
+        serialization.dumps.
+        """
+        positions = self.matching_positions(filters)
+        window = positions[offset:offset + limit]
+        next_offset = offset + len(window)
+        result = {
+            "total": int(len(positions)),
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": encode_cursor(next_offset) if next_offset < len(positions) else None,
+            "fields": fields,
+        }
+        frame = self.df.iloc[window][fields]
+        if layout == "columns":
+            result["columns"] = {field: json_column(frame[field]) for field in fields}
+        else:
+            result["rows"] = frame.to_dict('records')
+        return result
+
+    def select(self, filters, fields: List[str], offset: int = 0,
+               limit: Optional[int] = None) -> pd.DataFrame:
+        """ Every matching row from 'offset' on (at most 'limit'), projected to 'fields'. """
+        positions = self.matching_positions(filters)[offset:]
+        if limit is not None:
+            positions = positions[:limit]
+        return self.df.iloc[positions][fields]
+
+    def iter_ndjson(self, positions: np.ndarray, fields: List[str], offset: int = 0,
+                    limit: Optional[int] = None) -> Iterator[str]:
+        """
+        Yields the rows at 'positions' (from matching_positions) as
+        newline-delimited JSON, a chunk of rows at a time, so an export
+        never exists as one big array in memory.
+
+        Takes the positions instead of the filters: StreamingResponse runs
+        this generator on a threadpool thread, and the filter cache is only
+        used from the event loop.
+        """
+        positions = positions[offset:]
+        if limit is not None:
+            positions = positions[:limit]
+        for start in range(0, len(positions), NDJSON_CHUNK_ROWS):
+            chunk = self.df.iloc[positions[start:start + NDJSON_CHUNK_ROWS]][fields]
+            yield chunk.to_json(orient='records', lines=True).rstrip("\n") + "\n"
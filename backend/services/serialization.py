@@ -0,0 +1,86 @@
+import json
+import numpy as np
+import pandas as pd
+from typing import Any, Literal, Mapping
+
+# orjson and pyarrow are optional. Without orjson, columnar JSON falls
+# back to the standard library; without pyarrow, the Arrow format is
+# unavailable (see arrow_available).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# --- 1. MEDIA TYPES ---
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Response layouts the figure / explorer endpoints accept in ?format=...
+#   rows    - a list of objects, one per point (the original schema)
+#   columns - one JSON array per field: {"tenure": [...], "cluster": [...]}
+#   arrow   - the same columns as an Arrow IPC stream (binary)
+ResponseFormat = Literal["rows", "columns", "arrow"]
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+# --- 2. JSON ---
+def json_column(values: Any):
+    """
+    A column in the form the encoder takes fastest: numeric NumPy arrays
+    as they are (orjson serializes them natively), everything else
+    (text, categories) as a plain list.
+    """
+    if isinstance(values, pd.Series):
+        if pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            values = values.to_numpy()
+        else:
+            return values.tolist()
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        return np.ascontiguousarray(array)
+    return array.tolist()
+
+
+def _default(value: Any):
+    """ json.dumps fallback for NumPy values (used when orjson is missing). """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """ JSON-encodes 'obj' (which may contain NumPy arrays) to UTF-8 bytes. """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, ensure_ascii=False,
+                      allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def columns_to_json(columns: Mapping[str, Any]) -> bytes:
+    """ {"field": [...], ...} from a mapping of field name -> array / Series. """
+    return dumps({name: json_column(values) for name, values in columns.items()})
+
+
+# --- 3. ARROW ---
+def columns_to_arrow(columns: Mapping[str, Any]) -> bytes:
+    """
+    The columns as one Arrow IPC stream (record batch). Categorical
+    columns are sent dictionary-encoded. Requires pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError("The Arrow format requires pyarrow.")
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
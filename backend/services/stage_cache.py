@@ -0,0 +1,194 @@
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from services import data_service
+
+# --- 1. SETTINGS ---
+# Results of the training stages in scripts/train_model.py, keyed by a
+# fingerprint of everything that went into them:
+#
+#   data/cache/stages/
+#       clusterer-<first 16 hex digits of the fingerprint>/
+#           entry.json        <- fingerprint, inputs, result hash, duration
+#           result.joblib     <- what the stage returned
+#           kmeans_clusters.svg   <- files the stage wrote (restored on a hit)
+STAGE_CACHE_DIR = os.getenv("CHURN_STAGE_CACHE_DIR", os.path.join(data_service.CACHE_DIR, 'stages'))
+STAGE_CACHE_ENABLED = os.getenv("CHURN_STAGE_CACHE_ENABLED", "1") == "1"
+# Entries kept per stage (the most recently used ones).
+STAGE_CACHE_KEEP = int(os.getenv("CHURN_STAGE_CACHE_KEEP", "5"))
+
+# Libraries whose version can change a stage's result (or make an older
+# cached pickle load wrongly); part of every fingerprint.
+FINGERPRINT_LIBRARIES = ("numpy", "pandas", "scikit-learn", "joblib", "matplotlib", "seaborn")
+
+ENTRY_FILE = "entry.json"
+RESULT_FILE = "result.joblib"
+
+
+# --- 2. FINGERPRINTS ---
+def code_fingerprint(fn: Callable) -> str:
+    """
+    SHA-256 of the source of 'fn' and of every function of the same
+    module it calls (recursively), so editing a stage, or a helper it
+    uses, invalidates its cached result.
+    """
+    sources: Dict[str, str] = {}
+
+    def visit(f):
+        if f.__name__ in sources:
+            return
+        sources[f.__name__] = inspect.getsource(f)
+        for name in f.__code__.co_names:
+            callee = f.__globals__.get(name)
+            if inspect.isfunction(callee) and callee.__module__ == f.__module__:
+                visit(callee)
+
+    visit(fn)
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(f"{name}\n{sources[name]}\n".encode())
+    return digest.hexdigest()
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    versions = {}
+    for library in FINGERPRINT_LIBRARIES:
+        try:
+            versions[library] = importlib.metadata.version(library)
+        except importlib.metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+
+def stage_fingerprint(name: str, fn: Callable, data_hash: str, params: Dict[str, Any],
+                      upstream: Dict[str, str], data_loader: Optional[Callable] = None) -> str:
+    """
+    The cache key of one stage run: its name and code, the data hash and
+    the code that turns the data file into the frame the stage gets
+    (data_service's reading and cleaning, plus 'data_loader'), its
+    parameters, the result hashes of the stages it depends on, and the
+    versions of the FINGERPRINT_LIBRARIES.
+    """
+    inputs = {
+        "stage": name,
+        "code": code_fingerprint(fn),
+        "data": data_hash,
+        "data_code": [code_fingerprint(f) for f in (data_service.read_dataset, data_loader) if f is not None],
+        "params": params,
+        "upstream": upstream,
+        "libraries": library_versions(),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# --- 3. ENTRIES ---
+def entry_dir(name: str, fingerprint: str) -> str:
+    return os.path.join(STAGE_CACHE_DIR, f"{name}-{fingerprint[:16]}")
+
+
+def lookup(name: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """ The cache entry for this exact fingerprint, or None. """
+    if not STAGE_CACHE_ENABLED:
+        return None
+    path = os.path.join(entry_dir(name, fingerprint), ENTRY_FILE)
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("fingerprint") == fingerprint else None
+
+
+def restore(entry: Dict[str, Any], files_dir: str) -> Any:
+    """
+    Copies the entry's files back into 'files_dir' and returns the
+    stage's result.
+    """
+    import joblib
+
+    directory = entry_dir(entry["stage"], entry["fingerprint"])
+    for file_name in entry["files"]:
+        shutil.copyfile(os.path.join(directory, file_name), os.path.join(files_dir, file_name))
+    os.utime(directory)  # most recently used, for pruning
+    return joblib.load(os.path.join(directory, RESULT_FILE))
+
+
+def dump_result(name: str, result: Any) -> Tuple[str, str]:
+    """
+    Writes a stage's result to a temporary file in the cache directory
+    and returns (path, content hash). Called in the process that ran the
+    stage, so the parent loads the result from the file instead of
+    receiving it through the pool's pipe.
+
+    The hash is joblib.hash, not a hash of the file: pickled bytes depend
+    on which equal strings happen to be the same object, which differs
+    between processes, so refitting an identical model would otherwise
+    invalidate every stage after it.
+    """
+    import joblib
+
+    os.makedirs(STAGE_CACHE_DIR, exist_ok=True)
+    path = os.path.join(STAGE_CACHE_DIR, f".{name}.{os.getpid()}.{time.time_ns()}.tmp")
+    joblib.dump(result, path)
+    return path, joblib.hash(result)
+
+
+def store(name: str, fingerprint: str, result_path: str, result_hash: str, files_dir: str,
+          files: Iterable[str], duration_s: float):
+    """
+    Moves a result written by dump_result into the cache, with the
+    'files' the stage wrote into 'files_dir'. The entry is assembled
+    under a temporary name and renamed, like the model registry's
+    versions. With the cache off, the result file is just removed.
+    """
+    if not STAGE_CACHE_ENABLED:
+        os.remove(result_path)
+        return
+
+    directory = entry_dir(name, fingerprint)
+    tmp_dir = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        os.replace(result_path, os.path.join(tmp_dir, RESULT_FILE))
+        stored_files = []
+        for file_name in files:
+            source = os.path.join(files_dir, file_name)
+            if os.path.exists(source):
+                shutil.copyfile(source, os.path.join(tmp_dir, file_name))
+                stored_files.append(file_name)
+        entry = {
+            "stage": name,
+            "fingerprint": fingerprint,
+            "result_hash": result_hash,
+            "files": stored_files,
+            "duration_s": round(duration_s, 3),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with open(os.path.join(tmp_dir, ENTRY_FILE), 'w') as f:
+            json.dump(entry, f, indent=2)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.rename(tmp_dir, directory)
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+    prune(name)
+
+
+def prune(name: str, keep: int = STAGE_CACHE_KEEP):
+    """ Removes all but the 'keep' most recently used entries of a stage. """
+    if not os.path.isdir(STAGE_CACHE_DIR):
+        return
+    entries = [
+        os.path.join(STAGE_CACHE_DIR, d) for d in os.listdir(STAGE_CACHE_DIR)
+        if d.startswith(f"{name}-") and not d.endswith(".tmp")
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for stale in entries[max(1, keep):]:
+        shutil.rmtree(stale, ignore_errors=True)
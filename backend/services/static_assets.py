@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# brotli is optional: without it only gzip variants are written and served.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- 1. SETTINGS ---
+# Precompressed variants live next to the file: kmeans_clusters.svg.br,
+# kmeans_clusters.svg.gz. Written by scripts/train_model.py; files
+# without (fresh) variants are compressed on first request instead.
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# Preferred first when the client accepts several equally.
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+# Below this size compression doesn't pay for its headers.
+MIN_COMPRESS_BYTES = 1024
+# A variant is only kept (and served) when it is at most this fraction of
+# the original; already-compressed formats (PNG, WebP) rarely qualify,
+# and clients would pay the decompression for nothing.
+MAX_VARIANT_RATIO = 0.9
+
+
+def available_encodings() -> List[str]:
+    return [encoding for encoding in ENCODING_PREFERENCE if encoding != "br" or brotli is not None]
+
+
+# --- 2. COMPRESSION ---
+def compress(data: bytes, encoding: str) -> bytes:
+    """ Best-ratio compression; gzip with a zero mtime, so the output only depends on 'data'. """
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"Unsupported encoding '{encoding}'.")
+
+
+def _variant_is_fresh(path: str, variant_path: str) -> bool:
+    return os.path.exists(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(path)
+
+
+def worth_keeping(original_size: int, variant_size: int) -> bool:
+    return variant_size <= original_size * MAX_VARIANT_RATIO
+
+
+def precompress_file(path: str) -> Dict[str, int]:
+    """
+    Writes the .br / .gz variants of 'path' (if missing or older than it),
+    and removes variants that aren't worth keeping (see MAX_VARIANT_RATIO).
+    Returns encoding -> size in bytes of every variant it has.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {"identity": len(data)}
+    if len(data) < MIN_COMPRESS_BYTES:
+        return sizes
+    for encoding in available_encodings():
+        if encoding == "identity":
+            continue
+        variant_path = path + VARIANT_SUFFIXES[encoding]
+        if not _variant_is_fresh(path, variant_path):
+            compressed = compress(data, encoding)
+            if not worth_keeping(len(data), len(compressed)):
+                if os.path.exists(variant_path):
+                    os.remove(variant_path)
+                continue
+            tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, variant_path)
+        sizes[encoding] = os.path.getsize(variant_path)
+    return sizes
+
+
+def precompress_directory(directory: str, extensions: Tuple[str, ...] = (".svg", ".png", ".webp")) -> Dict[str, Dict[str, int]]:
+    """ precompress_file for every matching file in 'directory'; file name -> sizes. """
+    return {
+        name: precompress_file(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if name.endswith(extensions)
+    }
+
+
+# --- 3. SERVING ---
+@dataclass(frozen=True)
+class StaticAsset:
+    media_type: str
+    version: str                # first 16 hex digits of the content's SHA-256
+    bodies: Dict[str, bytes]    # encoding -> bytes ("identity" always present)
+
+    def etag(self, encoding: str) -> str:
+        """ Strong ETag per representation: each encoding has different bytes. """
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.version}{suffix}"'
+
+    def etags(self) -> List[str]:
+        return [self.etag(encoding) for encoding in self.bodies]
+
+
+_assets: Dict[str, Tuple[Tuple[int, int], StaticAsset]] = {}
+_assets_lock = threading.Lock()
+
+
+def load_asset(path: str) -> StaticAsset:
+    """
+    The file and its compressed variants, kept in memory until the file
+    changes (size or mtime). Precompressed variants are read from disk
+    when they are fresh, otherwise compressed here once; either way only
+    those worth keeping are served.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _assets_lock:
+        cached = _assets.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    bodies = {"identity": data}
+    if len(data) >= MIN_COMPRESS_BYTES:
+        for encoding in available_encodings():
+            if encoding == "identity":
+                continue
+            variant_path = path + VARIANT_SUFFIXES[encoding]
+            if _variant_is_fresh(path, variant_path):
+                with open(variant_path, 'rb') as f:
+                    body = f.read()
+            else:
+                body = compress(data, encoding)
+            if worth_keeping(len(data), len(body)):
+                bodies[encoding] = body
+
+    asset = StaticAsset(
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        version=hashlib.sha256(data).hexdigest()[:16],
+        bodies=bodies,
+    )
+    with _assets_lock:
+        _assets[path] = (key, asset)
+    return asset
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: List[str]) -> str:
+    """
+    The content coding to send for an Accept-Encoding header: the highest
+    q-value among 'available', ties broken by ENCODING_PREFERENCE.
+    "identity" is acceptable unless the header excludes it.
+    """
+    if not accept_encoding:
+        return "identity"
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    def weight(encoding):
+        if encoding in weights:
+            return weights[encoding]
+        if "*" in weights:
+            return weights["*"]
+        return 1.0 if encoding == "identity" else 0.0
+
+    candidates = [encoding for encoding in ENCODING_PREFERENCE if encoding in available and weight(encoding) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=lambda encoding: (weight(encoding), -ENCODING_PREFERENCE.index(encoding)))
@@ -0,0 +1,208 @@
+import json
+import os
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+# --- COMPILED TREE ENSEMBLE ---
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous NumPy arrays.
+
+    All trees share one set of node arrays; 'roots' holds the index of
+    each tree's root node. Leaves point to themselves with an infinite
+    threshold, so every row can be walked through every tree at once,
+    one depth level per step, with no per-tree or per-row Python loop.
+
+    'value' is the churn-class probability at each node (the fraction of
+    training samples of that class), which is what a leaf contributes to
+    predict_proba and what the path decomposition in 'contributions'
+    is measured in.
+    """
+
+    # The node arrays save() writes (one .npy file each) and load() maps.
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "is_leaf", "children")
+    INFO_FILE = "forest.json"
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, n_features: int,
+                 is_leaf: Optional[np.ndarray] = None, children: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.n_trees = len(roots)
+        self.is_leaf = left == np.arange(len(left)) if is_leaf is None else is_leaf
+        # children[2 * node] is the left child, children[2 * node + 1] the right one.
+        self.children = np.stack([left, right], axis=1).ravel() if children is None else children
+
+        # The expected prediction before looking at any feature.
+        self.bias = float(value[roots].mean())
+
+        self._split_points = {}
+
+    @classmethod
+    def from_sklearn(cls, forest, class_index: int) -> "CompiledForest":
+        """ Flattens every estimator of a fitted sklearn forest. """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            own = np.arange(n_nodes)
+            leaf = tree.children_left == -1
+
+            counts = tree.value[:, 0, :]
+            fractions = counts[:, class_index] / counts.sum(axis=1)
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, own, tree.children_left) + offset)
+            rights.append(np.where(leaf, own, tree.children_right) + offset)
+            values.append(fractions)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=int(max_depth),
+            n_features=int(forest.n_features_in_),
+        )
+
+    def save(self, directory: str) -> List[str]:
+        """
+        Writes the node arrays as uncompressed .npy files (plus a small
+        forest.json), the layout load() can memory-map. Returns the file
+        names written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        names = []
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name), allow_pickle=False)
+            names.append(f"{name}.npy")
+        with open(os.path.join(directory, self.INFO_FILE), 'w') as f:
+            json.dump({"max_depth": self.max_depth, "n_features": self.n_features}, f)
+        names.append(self.INFO_FILE)
+        return names
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> "CompiledForest":
+        """
+        Opens a forest written by save(). With mmap_mode='r' the arrays
+        are read-only views of the files: every process that loads the
+        same files shares one copy of the nodes in the OS page cache, and
+        loading costs no reads until the nodes are used.
+        """
+        with open(os.path.join(directory, cls.INFO_FILE)) as f:
+            info = json.load(f)
+        # np.asarray drops the np.memmap subclass (and its per-operation
+        # overhead) but keeps the mapping.
+        arrays = {
+            name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False))
+            for name in cls.ARRAYS
+        }
+        return cls(max_depth=int(info["max_depth"]), n_features=int(info["n_features"]), **arrays)
+
+    def split_points(self, feature: int) -> np.ndarray:
+        """ Sorted, unique thresholds of every split on 'feature' (cached). """
+        points = self._split_points.get(feature)
+        if points is None:
+            internal = ~self.is_leaf & (self.feature == feature)
+            points = np.unique(self.threshold[internal])
+            self._split_points[feature] = points
+        return points
+
+    def split_codes(self, X: np.ndarray) -> np.ndarray:
+        """
+        For every row, which interval between consecutive split thresholds
+        each varying feature falls into. Rows with equal codes take the
+        same path through every tree, so they get the same prediction.
+        Returns an (n_rows, n_varying_features) integer array.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        varying = np.flatnonzero((X != X[:1]).any(axis=0))
+        codes = np.empty((X.shape[0], len(varying)), dtype=np.intp)
+        for j, feature in enumerate(varying):
+            # Number of thresholds strictly below x: a row goes left at a
+            # split exactly when x <= threshold, so equal counts mean
+            # equal decisions at every split on this feature.
+            codes[:, j] = np.searchsorted(self.split_points(feature), X[:, feature], side='left')
+        return codes
+
+    def _walk(self, X: np.ndarray, track_path: bool):
+        """
+        Sends every row down every tree, one depth level per step. Only
+        the (row, tree) pairs that have not reached a leaf yet are
+        advanced, so deep trees do not slow down rows that stop early.
+
+        Returns the leaf reached for each (row, tree), shape (n_rows, n_trees),
+        and, if 'track_path', the flat (row * n_features + feature) index and
+        the change in node value of every split taken.
+        """
+        # sklearn compares float32 feature values against the thresholds.
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        X_flat = np.ascontiguousarray(X).ravel()
+
+        nodes = np.tile(self.roots, n_rows)
+        # Offset of each (row, tree) pair's row in X_flat.
+        row_start = np.repeat(np.arange(n_rows) * self.n_features, self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+
+        path_index, path_delta = [], []
+        while active.size:
+            current = nodes[active]
+            cell = row_start[active] + self.feature[current]
+            go_right = X_flat[cell] > self.threshold[current]
+            following = self.children[2 * current + go_right]
+            if track_path:
+                path_index.append(cell)
+                path_delta.append(self.value[following] - self.value[current])
+            nodes[active] = following
+            active = active[~self.is_leaf[following]]
+
+        return nodes.reshape(n_rows, self.n_trees), path_index, path_delta
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Churn-class probability for each row: the mean of the leaf values
+        reached in every tree (same as sklearn's predict_proba column).
+        """
+        leaves, _, _ = self._walk(X, track_path=False)
+        return self.value[leaves].mean(axis=1)
+
+    def contributions(self, X: np.ndarray) -> Tuple[float, np.ndarray]:
+        """
+        Saabas-style decomposition of the churn probability.
+
+        For every split on a row's path, the change in node value is
+        credited to the split's feature; contributions are averaged over
+        the trees. For each row, bias + contributions.sum() equals the
+        forest's predicted churn probability.
+
+        Returns (bias, contributions) with contributions of shape
+        (n_rows, n_features).
+        """
+        n_rows = np.asarray(X).shape[0]
+        _, path_index, path_delta = self._walk(X, track_path=True)
+
+        totals = np.zeros(n_rows * self.n_features, dtype=np.float64)
+        if path_index:
+            totals = np.bincount(np.concatenate(path_index), weights=np.concatenate(path_delta),
+                                 minlength=n_rows * self.n_features)
+
+        return self.bias, totals.reshape(n_rows, self.n_features) / self.n_trees
@@ -1,8 +1,8 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { Customer } from "@/lib/types";
-import { getExplorerData } from "@/lib/api";
+import { AggregateResponse } from "@/lib/types";
+import { getExplorerAggregate } from "@/lib/api";
 import Image from "next/image";
 import DynamicParameterChart from "@/components/DynamicParameterChart";
 
@@ -53,18 +53,22 @@ const StaticChartCard = ({
 );
 
 export default function ExplorerPage() {
-  const [allData, setAllData] = useState<Customer[]>([]);
+  const [aggregate, setAggregate] = useState<AggregateResponse | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [selectedParameter, setSelectedParameter] = useState(
     categoricalParameters[0].value
   );
 
+  // Fetch the per-category churn counts for the selected parameter
   useEffect(() => {
     async function fetchData() {
       try {
-        const data = await getExplorerData();
-        setAllData(data);
+        const data = await getExplorerAggregate(selectedParameter, [
+          "count",
+          "churned",
+        ]);
+        setAggregate(data);
       } catch (err) {
         setError("Failed to fetch explorer data.");
         console.error(err);
@@ -73,7 +77,7 @@ export default function ExplorerPage() {
       }
     }
     fetchData();
-  }, []);
+  }, [selectedParameter]);
 
   if (isLoading) {
     return (
@@ -133,10 +137,7 @@ export default function ExplorerPage() {
         </div>
 
         <div className="h-96">
-          <DynamicParameterChart
-            data={allData}
-            parameter={selectedParameter as keyof Customer}
-          />
+          <DynamicParameterChart data={aggregate} />
         </div>
       </div>
 
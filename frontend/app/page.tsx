@@ -1,13 +1,13 @@
 "use client";
 
 import { useState, useEffect, useMemo } from "react";
-import { getExplorerData } from "@/lib/api";
-import { Customer } from "@/lib/types";
+import { getExplorerKpis } from "@/lib/api";
+import { ExplorerKpis } from "@/lib/types";
 import KpiCard from "@/components/ui/KpiCard";
 // --- End of Component ---
 
 export default function HomePage() {
-  const [data, setData] = useState<Customer[]>([]);
+  const [data, setData] = useState<ExplorerKpis | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -15,7 +15,7 @@ export default function HomePage() {
   useEffect(() => {
     async function fetchData() {
       try {
-        const result = await getExplorerData();
+        const result = await getExplorerKpis();
         setData(result);
       } catch (err) {
         setError("Failed to fetch data.");
@@ -27,9 +27,9 @@ export default function HomePage() {
     fetchData();
   }, []);
 
-  // Calculate KPIs
+  // Format the KPIs computed by the server
   const kpis = useMemo(() => {
-    if (!data || data.length === 0) {
+    if (!data || data.total_customers === 0) {
       return {
         totalCustomers: 0,
         churnRate: 0,
@@ -38,22 +38,11 @@ export default function HomePage() {
       };
     }
 
-    const totalCustomers = data.length;
-    const churnedCustomers = data.filter((c) => c.Churn === "Yes").length;
-    const churnRate = (churnedCustomers / totalCustomers) * 100;
-    const totalTenure = data.reduce((sum, c) => sum + c.tenure, 0);
-    const avgTenure = totalTenure / totalCustomers;
-    const totalMonthlyCharge = data.reduce(
-      (sum, c) => sum + c.MonthlyCharges,
-      0
-    );
-    const avgMonthlyCharge = totalMonthlyCharge / totalCustomers;
-
     return {
-      totalCustomers,
-      churnRate: churnRate.toFixed(1) + "%",
-      avgTenure: avgTenure.toFixed(0),
-      avgMonthlyCharge: "$" + avgMonthlyCharge.toFixed(2),
+      totalCustomers: data.total_customers,
+      churnRate: (data.churn_rate * 100).toFixed(1) + "%",
+      avgTenure: data.avg_tenure.toFixed(0),
+      avgMonthlyCharge: "$" + data.avg_monthly_charges.toFixed(2),
     };
   }, [data]);
 
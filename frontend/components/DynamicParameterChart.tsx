@@ -11,39 +11,33 @@ import {
   ResponsiveContainer,
   CartesianGrid,
 } from "recharts";
-import { Customer } from "@/lib/types";
+import { AggregateResponse } from "@/lib/types";
 
 interface ChartProps {
-  data: Customer[];
-  parameter: keyof Customer; // The name of the parameter to group by
+  // Per-category counts from /api/explorer/aggregate (metrics: count, churned)
+  data: AggregateResponse | null;
 }
 
-export default function DynamicParameterChart({ data, parameter }: ChartProps) {
+export default function DynamicParameterChart({ data }: ChartProps) {
   const chartData = useMemo(() => {
-    // 1. Group customers by the selected parameter
-    const groups = data.reduce((acc, customer) => {
-      const key = String(customer[parameter]); // e.g., "Month-to-month"
+    if (!data) {
+      return [];
+    }
 
-      if (!acc[key]) {
-        acc[key] = { total: 0, churnYes: 0 };
-      }
-
-      acc[key].total += 1;
-      if (customer.Churn === "Yes") {
-        acc[key].churnYes += 1;
-      }
-      return acc;
-    }, {} as Record<string, { total: number; churnYes: number }>);
-
-    // 2. Format for the chart, calculating 'Stayed (No)'
-    return Object.entries(groups)
-      .map(([name, { total, churnYes }]) => ({
-        name: name === "0" ? "No" : name === "1" ? "Yes" : name, // Fix for SeniorCitizen
-        "Churn (Yes)": churnYes,
-        "Stayed (No)": total - churnYes,
-      }))
+    // Format for the chart, calculating 'Stayed (No)'
+    return data.groups
+      .map((group) => {
+        const name = String(group[data.group_by]); // e.g., "Month-to-month"
+        const total = Number(group.count);
+        const churnYes = Number(group.churned);
+        return {
+          name: name === "0" ? "No" : name === "1" ? "Yes" : name, // Fix for SeniorCitizen
+          "Churn (Yes)": churnYes,
+          "Stayed (No)": total - churnYes,
+        };
+      })
       .sort((a, b) => b["Churn (Yes)"] - a["Churn (Yes)"]); // Sort by highest churn count
-  }, [data, parameter]); // Re-calculate when data or parameter changes
+  }, [data]); // Re-calculate when the aggregate changes
 
   return (
     <ResponsiveContainer width="100%" height="100%">
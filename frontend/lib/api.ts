@@ -4,6 +4,10 @@ import {
   RiskProfileResponse,
   RegressionDataPoint,
   ClusterDataPoint,
+  ColumnarPayload,
+  SweepResponse,
+  ExplorerKpis,
+  AggregateResponse,
 } from "./types";
 
 // Define the base URL for your FastAPI backend
@@ -20,21 +24,72 @@ export const getExplorerData = async (): Promise<Customer[]> => {
 };
 
 /**
- * Fetches the K-Means clustering results.
+ * Fetches the dataset-wide KPIs (computed on the server).
  */
-export const getClusteringData = async (): Promise<ClusterDataPoint[]> => {
-  const response = await apiClient.get("/figures/clustering");
+export const getExplorerKpis = async (): Promise<ExplorerKpis> => {
+  const response = await apiClient.get("/explorer/kpis");
   return response.data;
 };
 
 /**
- * Fetches the Linear Regression results.
+ * Fetches per-category aggregates, e.g. churn counts per Contract type.
  */
-export const getRegressionData = async (): Promise<RegressionDataPoint[]> => {
-  const response = await apiClient.get("/figures/regression");
+export const getExplorerAggregate = async (
+  groupBy: string,
+  metrics: string[]
+): Promise<AggregateResponse> => {
+  const response = await apiClient.get("/explorer/aggregate", {
+    params: { group_by: groupBy, metrics: metrics.join(",") },
+  });
   return response.data;
 };
 
+/**
+ * Turns a columnar payload ({ field: [...] }) back into one object per point.
+ */
+const columnsToRows = <T>(columns: ColumnarPayload<T>): T[] => {
+  const fields = Object.keys(columns) as (keyof T)[];
+  const length = fields.length ? columns[fields[0]].length : 0;
+  const rows = new Array<T>(length);
+  for (let i = 0; i < length; i++) {
+    const row = {} as T;
+    for (const field of fields) {
+      row[field] = columns[field][i];
+    }
+    rows[i] = row;
+  }
+  return rows;
+};
+
+/**
+ * Fetches the K-Means clustering results.
+ * Requested column-wise (about 4x smaller than one object per point),
+ * as a sample of at most 'maxPoints' customers stratified by cluster,
+ * so the chart stays fast however many customers there are.
+ */
+export const getClusteringData = async (
+  maxPoints: number = 3000
+): Promise<ClusterDataPoint[]> => {
+  const response = await apiClient.get("/figures/clustering", {
+    params: { format: "columns", mode: "sample", max_points: maxPoints },
+  });
+  return columnsToRows<ClusterDataPoint>(response.data);
+};
+
+/**
+ * Fetches the Linear Regression results.
+ * Requested column-wise (about 3x smaller than one object per point),
+ * as a random sample of at most 'maxPoints' customers.
+ */
+export const getRegressionData = async (
+  maxPoints: number = 3000
+): Promise<RegressionDataPoint[]> => {
+  const response = await apiClient.get("/figures/regression", {
+    params: { format: "columns", mode: "sample", max_points: maxPoints },
+  });
+  return columnsToRows<RegressionDataPoint>(response.data);
+};
+
 /**
  * Posts customer data and gets a churn risk profile.
  * 'CustomerInput' is the data shape your backend's Pydantic model expects.
@@ -45,3 +100,28 @@ export const getRiskProfile = async (
   const response = await apiClient.post("/predict", customerData);
   return response.data;
 };
+
+/**
+ * Varies one or two features of a base customer and gets the churn
+ * probability at every grid point in one call.
+ * Each axis is either { feature, values } or { feature, start, stop, num };
+ * text features default to every known category.
+ */
+export const getChurnSweep = async (
+  base: any,
+  axes: {
+    feature: string;
+    values?: (number | string)[];
+    start?: number;
+    stop?: number;
+    num?: number;
+  }[],
+  deriveTotalCharges = false
+): Promise<SweepResponse> => {
+  const response = await apiClient.post("/predict/sweep", {
+    base,
+    axes,
+    derive_total_charges: deriveTotalCharges,
+  });
+  return response.data;
+};
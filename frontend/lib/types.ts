@@ -84,3 +84,49 @@ export interface ClusterDataPoint {
   monthly_charge: number;
   cluster: number;
 }
+
+/**
+ * A figure requested with ?format=columns: one array per field
+ * instead of one object per point.
+ */
+export type ColumnarPayload<T> = { [K in keyof T]: T[K][] };
+
+/**
+ * This type defines the shape of the data
+ * coming from your /api/predict/sweep endpoint.
+ * 'probabilities' is flat and row-major over 'shape'
+ * (the last axis varies fastest).
+ */
+export interface SweepResponse {
+  axes: {
+    feature: string;
+    values: (number | string)[];
+  }[];
+  shape: number[];
+  threshold: number;
+  probabilities: number[];
+}
+
+/**
+ * This type defines the shape of the data
+ * coming from your /api/explorer/kpis endpoint.
+ */
+export interface ExplorerKpis {
+  total_customers: number;
+  churned_customers: number;
+  churn_rate: number;
+  avg_tenure: number;
+  avg_monthly_charges: number;
+  avg_total_charges: number;
+}
+
+/**
+ * This type defines the shape of the data
+ * coming from your /api/explorer/aggregate endpoint.
+ * Each group has the 'group_by' column's value plus one key per metric.
+ */
+export interface AggregateResponse {
+  group_by: string;
+  metrics: string[];
+  groups: Record<string, string | number>[];
+}